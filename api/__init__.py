@@ -1,2 +0,0 @@
-from api.schemas import UserSchema, ProductSchema
-from generate_embeddings import model, courses_col
\ No newline at end of file
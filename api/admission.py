@@ -0,0 +1,101 @@
+"""
+Load-aware admission control for the recommendation endpoints.
+
+Every ``/recommend/*`` request is counted from the moment it reaches the
+server (before it waits for a worker thread). When it finally runs, the
+request is assigned a service level based on how deep the queue was and how
+long it already waited:
+
+    full          semantic search + AI insights (normal path)
+    no_insights   skip generate_ai_insights
+    non_semantic  skip model.encode / semantic search too (neutral
+                  semantic_score, same as the no-model fallback)
+
+Beyond ``ADMISSION_HARD_CAPACITY`` concurrent requests, new ones are shed
+immediately with 503 + Retry-After.
+"""
+
+import os
+import threading
+import time
+
+from api import metrics
+
+
+FULL = "full"
+NO_INSIGHTS = "no_insights"
+NON_SEMANTIC = "non_semantic"
+SHED = "shed"
+
+SOFT_QUEUE_DEPTH = int(os.environ.get("ADMISSION_SOFT_DEPTH", "8"))
+DEGRADE_QUEUE_DEPTH = int(os.environ.get("ADMISSION_DEGRADE_DEPTH", "16"))
+HARD_CAPACITY = int(os.environ.get("ADMISSION_HARD_CAPACITY", "32"))
+REQUEST_DEADLINE_MS = float(os.environ.get("ADMISSION_DEADLINE_MS", "2000"))
+RETRY_AFTER_SECONDS = int(os.environ.get("ADMISSION_RETRY_AFTER", "2"))
+
+
+class Ticket:
+    """One admitted request: when it arrived and how deep the queue was."""
+
+    def __init__(self, arrived_at, depth):
+        self.arrived_at = arrived_at
+        self.depth = depth
+        self.level = None
+
+    def waited_ms(self):
+        return (time.perf_counter() - self.arrived_at) * 1000
+
+
+class AdmissionController:
+
+    def __init__(self, soft_depth=SOFT_QUEUE_DEPTH, degrade_depth=DEGRADE_QUEUE_DEPTH,
+                 hard_capacity=HARD_CAPACITY, deadline_ms=REQUEST_DEADLINE_MS):
+        self.soft_depth = soft_depth
+        self.degrade_depth = degrade_depth
+        self.hard_capacity = hard_capacity
+        self.deadline_ms = deadline_ms
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def try_enter(self):
+        """Count a new request in, or return None if it must be shed."""
+        with self._lock:
+            if self._in_flight >= self.hard_capacity:
+                metrics.incr(f"admission.{SHED}")
+                return None
+            self._in_flight += 1
+            depth = self._in_flight
+        metrics.set_gauge("admission.in_flight", depth)
+        return Ticket(time.perf_counter(), depth)
+
+    def leave(self, ticket):
+        with self._lock:
+            self._in_flight -= 1
+            depth = self._in_flight
+        metrics.set_gauge("admission.in_flight", depth)
+
+    def service_level(self, ticket):
+        """Decide (once) how much work this request may do, and count it."""
+        if ticket.level is not None:
+            return ticket.level
+
+        waited = ticket.waited_ms()
+        depth = max(ticket.depth, self._in_flight)
+
+        if depth >= self.degrade_depth or waited >= self.deadline_ms:
+            level = NON_SEMANTIC
+        elif depth >= self.soft_depth or waited >= self.deadline_ms / 2:
+            level = NO_INSIGHTS
+        else:
+            level = FULL
+
+        ticket.level = level
+        metrics.incr(f"admission.{level}")
+        return level
+
+
+controller = AdmissionController()
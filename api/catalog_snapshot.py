@@ -0,0 +1,394 @@
+"""
+On-disk catalog snapshots for the recommender.
+
+A snapshot is a directory of typed columnar ``.npy`` arrays (one file per
+column) plus a ``manifest.json``. Every column is opened with
+``mmap_mode="r"``, so the API can open a snapshot in milliseconds at startup
+and keep serving recommendations while MongoDB is unavailable.
+
+Layout::
+
+    snapshots/
+        CURRENT                 <- name of the active version directory
+        <version>/
+            manifest.json
+            course_name.npy     source_url.npy   institution.npy
+            level_tag.npy       field_tag.npy
+            requires_al.npy     english_required.npy   math_required.npy
+            min_al_passes.npy   has_embedding.npy
+            embeddings.npy      embedding_norms.npy
+
+The version is a hash of the column contents, so exporting the same catalog
+twice yields the same version (handy for reproducible benchmarks).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from api.embedding_spaces import get_active_space, stored_vector, vector_field
+
+
+SNAPSHOT_FORMAT = 1
+DEFAULT_SNAPSHOT_DIR = os.environ.get("CATALOG_SNAPSHOT_DIR", "snapshots")
+
+STRING_COLUMNS = ("course_name", "source_url", "institution", "level_tag", "field_tag")
+FLAG_COLUMNS = ("requires_al", "english_required", "math_required")
+
+
+# =====================================================
+# Column derivation
+# =====================================================
+# First matching pattern wins, so more specific levels come first.
+LEVEL_TAGS = [
+    ("doctorate", r"\bPhD\b|\bDoctor\b|\bDoctorate\b"),
+    ("masters", r"\bMSc\b|\bMA\b|\bMBA\b|\bMaster|\bLLM\b|Postgraduate|Post Graduate"),
+    ("bachelors", r"\bBachelor|\bBSc\b|\bBA\b|\bBBA\b|\bBEng\b|\bBTech\b|\bLLB\b|Undergraduate|Degree Program|Top-up|Top Up"),
+    ("hnd", r"\bHND\b|Higher\s+National\s+Diploma|Higher\s+Diploma|Advanced\s+Diploma"),
+    ("diploma", r"Diploma"),
+    ("certificate", r"Certificate|Foundation|\bNVQ\b|Vocational|Pre-University"),
+]
+
+FIELD_TAGS = [
+    ("computing", r"Computing|Computer|Software|\bIT\b|Information Technology|Cyber|Data|Network|\bAI\b|Artificial Intelligence|Machine Learning"),
+    ("engineering", r"Engineering|Architecture|Construction|Civil|Mechanical|Electrical|Electronic|Quantity Survey"),
+    ("health", r"Health|Medicine|Medical|Nursing|Pharmacy|Biomedical|Clinical|Physiotherapy|Biotechnology"),
+    ("business", r"Business|Management|Accounting|Finance|Banking|Economics|Marketing|Commerce|\bBBA\b|\bMBA\b|Entrepreneurship|Human Resource"),
+    ("law", r"\bLaw\b|Legal|\bLLB\b|\bLLM\b|Justice"),
+    ("psychology", r"Psychology|Counseling|Counselling"),
+    ("education", r"Education|Teaching|TESOL|Pedagogy"),
+    ("media", r"Media|Communication|Journalism|Film|Multimedia"),
+    ("arts", r"Arts|Design|Creative|Fashion|Interior|Animation|Humanities"),
+    ("marine", r"Marine|Maritime|Nautical|Naval|Shipping"),
+    ("hospitality", r"Hospitality|Hotel|Tourism|Culinary|Events"),
+]
+
+_LEVEL_PATTERNS = [(tag, re.compile(p, re.IGNORECASE)) for tag, p in LEVEL_TAGS]
+_FIELD_PATTERNS = [(tag, re.compile(p, re.IGNORECASE)) for tag, p in FIELD_TAGS]
+
+
+def _first_tag(patterns, text):
+    for tag, pattern in patterns:
+        if pattern.search(text):
+            return tag
+    return "other"
+
+
+def level_tag(course_name):
+    return _first_tag(_LEVEL_PATTERNS, course_name or "")
+
+
+def field_tag(course_name):
+    return _first_tag(_FIELD_PATTERNS, course_name or "")
+
+
+def extract_institution(url):
+    """Institution short name from a course URL (e.g. "anc" for www.anc.edu.lk)."""
+    if not isinstance(url, str) or "." not in url:
+        return "Unknown"
+    try:
+        # Get the domain part (e.g., "www.anc.edu.lk" from "https://www.anc.edu.lk/path")
+        domain = url.split("/")[2] if "/" in url else url
+        domain_parts = domain.split(".")
+
+        # Remove 'www' if it's the first part
+        if domain_parts[0].lower() == "www" and len(domain_parts) > 1:
+            domain_parts = domain_parts[1:]
+
+        # Return the first part (institution name)
+        return domain_parts[0] if domain_parts else "Unknown"
+    except Exception:
+        return "Unknown"
+
+
+def _string_array(values):
+    # Fixed-width unicode keeps the column mmap-able (object arrays are not)
+    width = max([len(v) for v in values] + [1])
+    return np.array(values, dtype=f"<U{width}")
+
+
+def _build_columns(courses, space=None):
+    names, urls, institutions, levels, fields = [], [], [], [], []
+    flags = {name: [] for name in FLAG_COLUMNS}
+    min_passes = []
+    vectors = []
+
+    for course in courses:
+        name = course.get("course_name") or ""
+        url = course.get("source_url") or ""
+        names.append(name)
+        urls.append(url)
+        institutions.append(extract_institution(url))
+        levels.append(level_tag(name))
+        fields.append(field_tag(name))
+
+        eligibility = course.get("eligibility")
+        if not isinstance(eligibility, dict):
+            eligibility = {}
+        for flag in FLAG_COLUMNS:
+            flags[flag].append(bool(eligibility.get(flag)))
+        passes = eligibility.get("min_al_passes")
+        min_passes.append(passes if isinstance(passes, int) else -1)
+
+        vectors.append(stored_vector(course, space))
+
+    columns = {
+        "course_name": _string_array(names),
+        "source_url": _string_array(urls),
+        "institution": _string_array(institutions),
+        "level_tag": _string_array(levels),
+        "field_tag": _string_array(fields),
+        "min_al_passes": np.array(min_passes, dtype=np.int8),
+    }
+    for flag in FLAG_COLUMNS:
+        columns[flag] = np.array(flags[flag], dtype=np.bool_)
+
+    # Embedding matrix: rows without a (well-formed) embedding stay zero
+    dim = next((len(v) for v in vectors if isinstance(v, list) and v), 0)
+    embeddings = np.zeros((len(vectors), dim), dtype=np.float32)
+    has_embedding = np.zeros(len(vectors), dtype=np.bool_)
+    for i, vec in enumerate(vectors):
+        if isinstance(vec, list) and len(vec) == dim and dim:
+            embeddings[i] = vec
+            has_embedding[i] = True
+
+    columns["has_embedding"] = has_embedding
+    columns["embeddings"] = embeddings
+    columns["embedding_norms"] = np.linalg.norm(embeddings, axis=1).astype(np.float32)
+    return columns
+
+
+def _content_version(columns, model_name):
+    digest = hashlib.sha256()
+    digest.update(f"format={SNAPSHOT_FORMAT};model={model_name}".encode("utf-8"))
+    for name in sorted(columns):
+        arr = np.ascontiguousarray(columns[name])
+        digest.update(name.encode("utf-8"))
+        digest.update(str(arr.dtype).encode("utf-8"))
+        digest.update(str(arr.shape).encode("utf-8"))
+        digest.update(arr.tobytes())
+    return digest.hexdigest()[:16]
+
+
+# =====================================================
+# Export
+# =====================================================
+def export_snapshot(courses, out_dir=DEFAULT_SNAPSHOT_DIR, model_name=None, space=None,
+                    make_current=True):
+    """
+    Write ``courses`` (an iterable of course documents) as a new snapshot
+    version under ``out_dir`` and return the version directory path. Vectors
+    are read from embedding ``space`` (None = legacy ``embedding`` field).
+    """
+    columns = _build_columns(courses, space)
+    version = _content_version(columns, model_name)
+    version_dir = os.path.join(out_dir, version)
+
+    if not os.path.exists(version_dir):
+        # Build in a temp dir and rename, so readers never see a partial snapshot
+        tmp_dir = os.path.join(out_dir, f".tmp-{version}-{os.getpid()}")
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            for name, arr in columns.items():
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), arr)
+
+            manifest = {
+                "format": SNAPSHOT_FORMAT,
+                "version": version,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "count": int(len(columns["course_name"])),
+                "embedding_model": model_name,
+                "embedding_dim": int(columns["embeddings"].shape[1]),
+                "embedded_count": int(columns["has_embedding"].sum()),
+                "columns": sorted(columns),
+            }
+            with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+            os.replace(tmp_dir, version_dir)
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if make_current:
+        tmp_pointer = os.path.join(out_dir, f".CURRENT-{os.getpid()}")
+        with open(tmp_pointer, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_pointer, os.path.join(out_dir, "CURRENT"))
+
+    return version_dir
+
+
+# =====================================================
+# Load
+# =====================================================
+class CatalogSnapshot:
+    """Read-only, memory-mapped view of one snapshot version."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+
+        if self.manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(
+                f"Unsupported snapshot format {self.manifest.get('format')} in {path}"
+            )
+
+        self.path = path
+        self.columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in self.manifest["columns"]
+        }
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    @property
+    def embedding_model(self):
+        return self.manifest.get("embedding_model")
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    def records(self, indices=None):
+        """Course dicts shaped like the MongoDB documents the recommender expects."""
+        if indices is None:
+            indices = range(len(self))
+
+        cols = self.columns
+        records = []
+        for i in indices:
+            min_passes = int(cols["min_al_passes"][i])
+            records.append({
+                "course_name": str(cols["course_name"][i]),
+                "source_url": str(cols["source_url"][i]),
+                "institution": str(cols["institution"][i]),
+                "level_tag": str(cols["level_tag"][i]),
+                "field_tag": str(cols["field_tag"][i]),
+                "eligibility": {
+                    "requires_al": bool(cols["requires_al"][i]),
+                    "english_required": bool(cols["english_required"][i]),
+                    "math_required": bool(cols["math_required"][i]),
+                    "min_al_passes": min_passes if min_passes >= 0 else None,
+                },
+            })
+        return records
+
+    def semantic_search(self, query_embedding, top_k=100):
+        """
+        Cosine similarity of ``query_embedding`` against every embedded course.
+        Returns the ``top_k`` course records with ``semantic_score`` set.
+        """
+        mask = self.columns["has_embedding"]
+        if not mask.any():
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return []
+
+        norms = self.columns["embedding_norms"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = (self.columns["embeddings"] @ query) / (norms * query_norm)
+        scores = np.where(mask & (norms > 0), scores, -np.inf)
+
+        candidates = np.flatnonzero(np.isfinite(scores))
+        if len(candidates) > top_k:
+            top = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        else:
+            top = candidates
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results = self.records(top)
+        for record, idx in zip(results, top):
+            record["semantic_score"] = float(scores[idx])
+        return results
+
+
+def resolve_snapshot_path(path):
+    """Accept either a version directory or a snapshot root containing CURRENT."""
+    pointer = os.path.join(path, "CURRENT")
+    if os.path.exists(pointer):
+        with open(pointer, encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    return path
+
+
+def open_snapshot(path):
+    """
+    Open a snapshot, returning None (with a warning) if it is missing or broken
+    so the API can still start against MongoDB.
+    """
+    if not path:
+        return None
+    try:
+        start = time.perf_counter()
+        snapshot = CatalogSnapshot(resolve_snapshot_path(path))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(
+            f"📦 Catalog snapshot {snapshot.version} opened "
+            f"({len(snapshot)} courses, {elapsed_ms:.1f} ms)"
+        )
+        return snapshot
+    except Exception as e:
+        print(f"⚠️ Failed to open catalog snapshot at {path}: {e}")
+        return None
+
+
+# =====================================================
+# CLI
+# =====================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or inspect catalog snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export", help="Export the courses collection to a snapshot")
+    export_cmd.add_argument("--out", default=DEFAULT_SNAPSHOT_DIR)
+    export_cmd.add_argument("--no-current", action="store_true",
+                            help="Do not point CURRENT at the new version")
+
+    info_cmd = sub.add_parser("info", help="Print a snapshot manifest")
+    info_cmd.add_argument("path", nargs="?", default=DEFAULT_SNAPSHOT_DIR)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        from db.client import get_collection, projection
+
+        active = get_active_space()
+        space = active["space"] if active else None
+        model_name = active["model"] if active else os.environ.get("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+        fields = {**projection("snapshot_export"), vector_field(space) if space else "embedding": 1}
+        courses = get_collection("courses").find({}, fields).sort("_id", 1)
+
+        start = time.perf_counter()
+        version_dir = export_snapshot(
+            courses,
+            out_dir=args.out,
+            model_name=model_name,
+            space=space,
+            make_current=not args.no_current,
+        )
+        snapshot = CatalogSnapshot(version_dir)
+        print(
+            f"✅ Exported {len(snapshot)} courses "
+            f"({snapshot.manifest['embedded_count']} with embeddings) "
+            f"to {version_dir} in {time.perf_counter() - start:.1f}s"
+        )
+
+    elif args.command == "info":
+        snapshot = CatalogSnapshot(resolve_snapshot_path(args.path))
+        print(json.dumps(snapshot.manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Embed-on-ingest: encode courses as the crawler saves them.
+
+``main.py`` submits every saved course; a background thread collects them into
+batches (up to EMBED_QUEUE_BATCH_SIZE courses, or whatever arrived within
+EMBED_QUEUE_MAX_WAIT seconds), skips courses whose text hash is unchanged in
+the target embedding space, encodes the rest in one ``model.encode`` call and
+writes them with one unordered bulk write. New courses become searchable
+seconds after they are scraped, without a full ``generate_embeddings`` pass.
+
+Configuration (environment):
+    EMBED_ON_INGEST          default 1 (set 0 to embed later with generate_embeddings)
+    EMBED_QUEUE_BATCH_SIZE   default 32
+    EMBED_QUEUE_MAX_WAIT     default 2.0 seconds
+    EMBED_QUEUE_MAX_SIZE     default 1000 (submit blocks when the encoder falls behind)
+"""
+
+import os
+import queue
+import threading
+import time
+
+from api.embedding_spaces import activate_if_complete, get_active_space, hash_field, register_space
+from api.generate_embeddings import (
+    build_updates, course_text, embedding_model_id, flush_updates, load_model, text_hash,
+)
+from db.client import get_collection, with_retry
+
+
+ENABLED = os.environ.get("EMBED_ON_INGEST", "1") == "1"
+BATCH_SIZE = int(os.environ.get("EMBED_QUEUE_BATCH_SIZE", "32"))
+MAX_WAIT = float(os.environ.get("EMBED_QUEUE_MAX_WAIT", "2.0"))
+MAX_SIZE = int(os.environ.get("EMBED_QUEUE_MAX_SIZE", "1000"))
+
+_STOP = object()
+
+
+def target_space():
+    """
+    ``(space, model_id)`` new vectors go to: the active space, or the default
+    model's space while none has been activated yet.
+    """
+    active = get_active_space()
+    if active:
+        return active["space"], active["model"]
+    model_id = embedding_model_id()
+    return register_space(model_id), model_id
+
+
+class EmbeddingQueue:
+    """Batching consumer thread that embeds courses shortly after they are saved."""
+
+    def __init__(self, courses_col=None, batch_size=BATCH_SIZE, max_wait=MAX_WAIT, max_size=MAX_SIZE):
+        self.courses_col = courses_col if courses_col is not None else get_collection("courses")
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.queue = queue.Queue(maxsize=max_size)
+        self.stats = {"submitted": 0, "encoded": 0, "unchanged": 0, "failed": 0}
+        self.model = None
+        self.space = None
+        self.disabled = False
+        self.thread = threading.Thread(target=self._run, name="embedding-queue", daemon=True)
+        self.thread.start()
+
+    def submit(self, course):
+        """Queue a saved course (needs ``source_url`` and its text fields)."""
+        if self.disabled:
+            return
+        text = course_text(course)
+        self.queue.put((course["source_url"], text, text_hash(text)))
+        self.stats["submitted"] += 1
+
+    def close(self):
+        """Flush everything still queued and stop the consumer."""
+        self.queue.put(_STOP)
+        self.thread.join()
+        if self.space is not None and not self.disabled:
+            activate_if_complete(self.space, only_if_unset=True)
+        print(
+            f"Embedding queue: {self.stats['encoded']} encoded, {self.stats['unchanged']} unchanged, "
+            f"{self.stats['failed']} failed"
+        )
+
+    # -------------------------------------------------
+    # Consumer
+    # -------------------------------------------------
+    def _start(self):
+        """Load the model off the crawl's critical path; disable the queue if that fails."""
+        try:
+            self.space, model_id = target_space()
+            self.model = load_model(model_id)
+        except Exception as e:
+            print(f"⚠️ Embed-on-ingest disabled ({e}); run api/generate_embeddings.py after the crawl.")
+            self.disabled = True
+
+    def _next_batch(self):
+        """Block for one item, then gather more until the batch is full or MAX_WAIT passes."""
+        first = self.queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        self._start()
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch and not self.disabled:
+                try:
+                    self._process(batch)
+                except Exception as e:
+                    self.stats["failed"] += len(batch)
+                    print(f"⚠️ Failed to embed {len(batch)} courses: {e}")
+
+    def _process(self, batch):
+        # Latest submission wins if a URL was saved twice in one batch
+        latest = {source_url: (text, content_hash) for source_url, text, content_hash in batch}
+
+        stored = with_retry(lambda: list(self.courses_col.find(
+            {"source_url": {"$in": list(latest)}},
+            {"source_url": 1, hash_field(self.space): 1},
+        )))
+
+        pending = []
+        for course in stored:
+            text, content_hash = latest[course["source_url"]]
+            stored_hash = course.get("embeddings", {}).get(self.space, {}).get("hash")
+            if stored_hash == content_hash:
+                self.stats["unchanged"] += 1
+            else:
+                pending.append((course["_id"], text, content_hash))
+
+        if not pending:
+            return
+        vectors = self.model.encode(
+            [text for _, text, _ in pending], batch_size=self.batch_size, show_progress_bar=False
+        )
+        with_retry(flush_updates, self.courses_col, build_updates(pending, vectors, self.space))
+        self.stats["encoded"] += len(pending)
+
+
+def start_embedding_queue():
+    """An EmbeddingQueue, or None when EMBED_ON_INGEST=0."""
+    if not ENABLED:
+        return None
+    return EmbeddingQueue()
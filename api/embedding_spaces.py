@@ -0,0 +1,266 @@
+"""
+Versioned embedding spaces.
+
+Every embedding model gets its own "space": vectors live under
+``courses.embeddings.<space>`` as ``{"vector", "hash", "embedded_at"}``. This
+lets a new model be built in the background while the API keeps serving from
+the old space.
+
+``embedding_spaces`` holds one registry doc per space
+(status: building -> active -> retired). The space the API serves is a single
+pointer doc in ``settings`` (``_id: "embedding_space"``), so switching spaces
+is one atomic write. Before any space is activated the API keeps reading the
+legacy top-level ``embedding`` field.
+
+    python -m api.embedding_spaces status
+    python -m api.embedding_spaces build --model all-mpnet-base-v2 [--workers 4]
+    python -m api.embedding_spaces activate all-mpnet-base-v2
+    python -m api.embedding_spaces migrate-legacy
+    python -m api.embedding_spaces gc [--grace-minutes 60] [--legacy]
+"""
+
+import argparse
+import re
+from datetime import datetime, timedelta
+
+from db.client import get_collection
+
+
+BUILDING = "building"
+ACTIVE = "active"
+RETIRED = "retired"
+
+POINTER_ID = "embedding_space"
+LEGACY_FIELDS = ("embedding", "embedding_hash", "embedding_model", "embedded_at")
+
+
+def space_id(model_id):
+    """Mongo-safe field name for a model identifier (no dots or slashes)."""
+    return re.sub(r"[^A-Za-z0-9_-]", "_", model_id)
+
+
+def vector_field(space):
+    return f"embeddings.{space}.vector"
+
+
+def hash_field(space):
+    return f"embeddings.{space}.hash"
+
+
+def stored_vector(course, space):
+    """A course document's vector in ``space`` (None = legacy ``embedding`` field)."""
+    if space is None:
+        return course.get("embedding")
+    return course.get("embeddings", {}).get(space, {}).get("vector")
+
+
+def _spaces():
+    return get_collection("embedding_spaces")
+
+
+def _settings():
+    return get_collection("settings")
+
+
+def get_active_space():
+    """``{"space", "model", "activated_at"}`` of the served space, or None (legacy field)."""
+    return _settings().find_one({"_id": POINTER_ID}, {"_id": 0})
+
+
+def register_space(model_id):
+    """Record that vectors for ``model_id`` are being built; returns the space id."""
+    space = space_id(model_id)
+    _spaces().update_one(
+        {"_id": space},
+        {
+            "$setOnInsert": {"model": model_id, "status": BUILDING, "created_at": datetime.utcnow()},
+        },
+        upsert=True,
+    )
+    return space
+
+
+def coverage(space):
+    """``(embedded, total)`` course counts for a space."""
+    courses = get_collection("courses")
+    total = courses.count_documents({})
+    embedded = courses.count_documents({vector_field(space): {"$exists": True}})
+    return embedded, total
+
+
+def activate(space, force=False):
+    """
+    Atomically point the API at ``space``. Refuses unless every course has a
+    vector in it (``force`` skips the check). The previously active space is
+    marked retired, ready for gc.
+    """
+    registry = _spaces().find_one({"_id": space})
+    if registry is None:
+        raise ValueError(f"Unknown embedding space: {space}")
+
+    embedded, total = coverage(space)
+    if embedded < total and not force:
+        raise RuntimeError(f"Space {space} covers {embedded}/{total} courses; not activating")
+
+    previous = get_active_space()
+    now = datetime.utcnow()
+    # Single-document write: the switch itself is atomic
+    _settings().update_one(
+        {"_id": POINTER_ID},
+        {"$set": {"space": space, "model": registry["model"], "activated_at": now}},
+        upsert=True,
+    )
+    _spaces().update_one({"_id": space}, {"$set": {"status": ACTIVE, "activated_at": now}})
+    if previous and previous["space"] != space:
+        _spaces().update_one(
+            {"_id": previous["space"]}, {"$set": {"status": RETIRED, "retired_at": now}}
+        )
+    print(f"✅ Active embedding space is now {space} ({registry['model']}, {embedded}/{total} courses)")
+    return registry["model"]
+
+
+def activate_if_complete(space, only_if_unset=False):
+    """Activate ``space`` once it covers every course. Returns True if it is active."""
+    active = get_active_space()
+    if active and active["space"] == space:
+        return True
+    if only_if_unset and active:
+        return False
+
+    embedded, total = coverage(space)
+    if embedded < total:
+        print(f"Space {space} covers {embedded}/{total} courses; keeping current space")
+        return False
+    activate(space)
+    return True
+
+
+def build(model_id, max_passes=3, **generate_kwargs):
+    """
+    Build (or top up) the space for ``model_id`` while the API keeps serving
+    the current one, then switch to it once coverage reaches 100%. Courses
+    added during a pass are picked up by the next incremental pass.
+    """
+    from api.generate_embeddings import generate_embeddings, load_model
+
+    space = register_space(model_id)
+    workers = generate_kwargs.get("workers", 1)
+    model = load_model(model_id) if workers <= 1 else None
+
+    for attempt in range(1, max_passes + 1):
+        print(f"Building embedding space {space} (pass {attempt}/{max_passes})")
+        generate_embeddings(model, get_collection("courses"), model_id=model_id, **generate_kwargs)
+        if activate_if_complete(space):
+            return True
+    return False
+
+
+def gc(grace_minutes=60, legacy=False):
+    """
+    Drop vectors of retired spaces (retired longer than ``grace_minutes`` ago,
+    so every API process has picked up the new pointer). ``legacy`` also
+    removes the pre-versioning top-level embedding fields.
+    """
+    courses = get_collection("courses")
+    cutoff = datetime.utcnow() - timedelta(minutes=grace_minutes)
+
+    for registry in _spaces().find({"status": RETIRED, "retired_at": {"$lte": cutoff}}):
+        space = registry["_id"]
+        result = courses.update_many(
+            {f"embeddings.{space}": {"$exists": True}},
+            {"$unset": {f"embeddings.{space}": ""}},
+        )
+        _spaces().delete_one({"_id": space})
+        print(f"🗑️ Removed retired space {space} from {result.modified_count} courses")
+
+    if legacy:
+        if get_active_space() is None:
+            raise RuntimeError("No active embedding space; refusing to drop legacy embeddings")
+        result = courses.update_many(
+            {"embedding": {"$exists": True}},
+            {"$unset": {field: "" for field in LEGACY_FIELDS}},
+        )
+        print(f"🗑️ Removed legacy embedding fields from {result.modified_count} courses")
+
+
+def migrate_legacy(default_model_id):
+    """
+    Copy pre-versioning ``embedding`` fields into the space of the model that
+    produced them (server-side), then activate that space if it is complete.
+    """
+    courses = get_collection("courses")
+    legacy = {"embedding": {"$exists": True}}
+    model_ids = {m for m in courses.distinct("embedding_model", legacy) if m}
+    # Embeddings written before models were recorded belong to the default model
+    if courses.count_documents({**legacy, "embedding_model": {"$in": [None]}}):
+        model_ids.add(default_model_id)
+
+    for model_id in sorted(model_ids):
+        space = register_space(model_id)
+        match = {"embedding": {"$exists": True}}
+        if model_id == default_model_id:
+            match["embedding_model"] = {"$in": [model_id, None]}
+        else:
+            match["embedding_model"] = model_id
+
+        result = courses.update_many(match, [{"$set": {
+            f"embeddings.{space}": {
+                "vector": "$embedding",
+                "hash": "$embedding_hash",
+                "embedded_at": "$embedded_at",
+            },
+        }}])
+        print(f"Copied {result.modified_count} legacy embeddings into space {space}")
+
+    if default_model_id in model_ids:
+        activate_if_complete(space_id(default_model_id), only_if_unset=True)
+
+
+def status():
+    active = get_active_space()
+    print(f"Active: {active['space'] + ' (' + active['model'] + ')' if active else 'legacy embedding field'}")
+    for registry in _spaces().find().sort("created_at", 1):
+        embedded, total = coverage(registry["_id"])
+        print(f"  {registry['_id']:<40} {registry['status']:<9} {embedded}/{total} courses")
+
+
+def main(argv=None):
+    from api.generate_embeddings import DEFAULT_BATCH_SIZE, embedding_model_id
+
+    parser = argparse.ArgumentParser(description="Manage versioned embedding spaces")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("status", help="List spaces and their coverage")
+
+    build_cmd = sub.add_parser("build", help="Build a space in the background and switch to it when complete")
+    build_cmd.add_argument("--model", default=embedding_model_id())
+    build_cmd.add_argument("--workers", type=int, default=1)
+    build_cmd.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    build_cmd.add_argument("--max-passes", type=int, default=3)
+
+    activate_cmd = sub.add_parser("activate", help="Switch the API to a space")
+    activate_cmd.add_argument("model")
+    activate_cmd.add_argument("--force", action="store_true", help="activate even if coverage < 100%%")
+
+    sub.add_parser("migrate-legacy", help="Move top-level embedding fields into a versioned space")
+
+    gc_cmd = sub.add_parser("gc", help="Delete vectors of retired spaces")
+    gc_cmd.add_argument("--grace-minutes", type=int, default=60)
+    gc_cmd.add_argument("--legacy", action="store_true", help="also drop legacy top-level embedding fields")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        status()
+    elif args.command == "build":
+        build(args.model, max_passes=args.max_passes, workers=args.workers, batch_size=args.batch_size)
+    elif args.command == "activate":
+        activate(space_id(args.model), force=args.force)
+    elif args.command == "migrate-legacy":
+        migrate_legacy(embedding_model_id())
+    elif args.command == "gc":
+        gc(grace_minutes=args.grace_minutes, legacy=args.legacy)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,420 @@
-from sentence_transformers import SentenceTransformer
-from pymongo import MongoClient
-import numpy as np
+import sys
 import os
+import argparse
+import hashlib
+import json
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
 
-# Load model (from local path if set, otherwise try to download)
-model = None
-model_name = os.environ.get("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
-local_path = os.environ.get("EMBEDDING_MODEL_PATH")
-try:
-    if local_path:
-        print(f"Loading Sentence-BERT model from local path: {local_path}")
-        model = SentenceTransformer(local_path)
-    else:
-        print(f"Loading Sentence-BERT model: {model_name}")
-        model = SentenceTransformer(model_name)  # Fast, lightweight model
-    print("AI model loaded successfully!")
-except Exception as e:
-    print(f"⚠️ Failed to load embedding model ({model_name}): {e}")
-    print("If you're offline, set EMBEDDING_MODEL_PATH to a local model directory, or run this script where internet access is available to download the model.")
-    raise
+# add project root to PYTHONPATH (script is run as `python api/generate_embeddings.py`)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from sentence_transformers import SentenceTransformer
+from pymongo import UpdateOne
+
+from api.embedding_spaces import activate_if_complete, hash_field, register_space, space_id
+from db.client import get_collection, projection, with_retry
+
+
+# Courses encoded per model.encode call / update operations per bulk_write
+DEFAULT_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "64"))
+DEFAULT_WRITE_BATCH_SIZE = int(os.environ.get("EMBEDDING_WRITE_BATCH_SIZE", "500"))
+
+# Progress file for resuming an interrupted refresh
+DEFAULT_CHECKPOINT_PATH = os.environ.get("EMBEDDING_CHECKPOINT", ".embedding_checkpoint.json")
+CHECKPOINT_EVERY = 1000  # scanned courses between checkpoints when nothing needs encoding
+
+
+def embedding_model_id():
+    """
+    Default model identifier (its embedding space is named after it).
+    EMBEDDING_MODEL_PATH only says where to load the model from, so
+    EMBEDDING_MODEL_NAME should name the model that directory contains.
+    """
+    return os.environ.get("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
 
-# Connect to MongoDB
-client = MongoClient("mongodb://localhost:27017")
-db = client["ugc_scraper"]
-courses_col = db["courses"]
 
-print("Generating embeddings for all courses...")
-courses = list(courses_col.find())
+def load_model(model_name=None):
+    """Load a Sentence-BERT model (from local path if set, otherwise try to download)."""
+    model_name = model_name or embedding_model_id()
+    # EMBEDDING_MODEL_PATH holds the default model only
+    local_path = os.environ.get("EMBEDDING_MODEL_PATH") if model_name == embedding_model_id() else None
+    try:
+        if local_path:
+            print(f"Loading Sentence-BERT model from local path: {local_path}")
+            model = SentenceTransformer(local_path)
+        else:
+            print(f"Loading Sentence-BERT model: {model_name}")
+            model = SentenceTransformer(model_name)  # Fast, lightweight model
+        print("AI model loaded successfully!")
+        return model
+    except Exception as e:
+        print(f"⚠️ Failed to load embedding model ({model_name}): {e}")
+        print("If you're offline, set EMBEDDING_MODEL_PATH to a local model directory, or run this script where internet access is available to download the model.")
+        raise
 
-print(f"Found {len(courses)} courses to process")
 
-for i, course in enumerate(courses):
+def course_text(course):
     # Combine course name and description for better matching
-    text = f"{course.get('course_name', '')} {course.get('description', '')} {course.get('keywords', '')}"
-    
-    # Generate embedding
-    embedding = model.encode(text)
-    
-    # Update course with embedding
-    courses_col.update_one(
-        {"_id": course["_id"]},
-        {"$set": {"embedding": embedding.tolist()}}
+    return f"{course.get('course_name', '')} {course.get('description', '')} {course.get('keywords', '')}"
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def needs_embedding(course, content_hash, space):
+    """True if the course has no vector in ``space`` yet, or its text changed."""
+    stored = course.get("embeddings", {}).get(space, {})
+    return stored.get("hash") != content_hash
+
+
+# =====================================================
+# Checkpointing
+# =====================================================
+def load_checkpoint(path, model_id):
+    """Last fully-flushed course _id for ``model_id``, or None."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if checkpoint.get("model") != model_id:
+        print(f"Ignoring checkpoint for a different model ({checkpoint.get('model')})")
+        return None
+    return ObjectId(checkpoint["last_id"])
+
+
+def save_checkpoint(path, model_id, last_id, stats):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"model": model_id, "last_id": str(last_id), **stats}, f)
+    os.replace(tmp_path, path)
+
+
+def clear_checkpoint(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+# =====================================================
+# Encoding / writing
+# =====================================================
+def flush_updates(courses_col, ops):
+    """Write pending embedding updates in one unordered bulk_write."""
+    if not ops:
+        return 0
+    result = courses_col.bulk_write(ops, ordered=False)
+    return result.modified_count
+
+
+def build_updates(pending, vectors, space):
+    """UpdateOne operations for ``pending`` (course_id, text, hash) tuples and their vectors."""
+    embedded_at = datetime.utcnow()
+    return [
+        UpdateOne(
+            {"_id": course_id},
+            {"$set": {
+                f"embeddings.{space}": {
+                    "vector": vector.tolist(),
+                    "hash": content_hash,
+                    "embedded_at": embedded_at,
+                },
+            }},
+        )
+        for (course_id, _, content_hash), vector in zip(pending, vectors)
+    ]
+
+
+def scan_batches(cursor, space, batch_size, full, stats):
+    """
+    Yield ``(pending, last_scanned_id)`` for every ``batch_size`` courses that
+    need (re-)encoding. Long runs of unchanged courses yield empty batches
+    every CHECKPOINT_EVERY courses so progress can still be checkpointed.
+    """
+    pending = []
+    last_scanned = None
+    for course in cursor:
+        last_scanned = course["_id"]
+        stats["scanned"] += 1
+
+        text = course_text(course)
+        content_hash = text_hash(text)
+        if full or needs_embedding(course, content_hash, space):
+            pending.append((course["_id"], text, content_hash))
+        else:
+            stats["skipped"] += 1
+
+        if len(pending) >= batch_size:
+            yield pending, last_scanned
+            pending = []
+        elif not pending and stats["scanned"] % CHECKPOINT_EVERY == 0:
+            yield [], last_scanned
+
+    if pending or last_scanned is not None:
+        yield pending, last_scanned
+
+
+class EmbeddingWriter:
+    """
+    Single writer for encoded batches. Batches may complete out of order (in
+    parallel mode), so the checkpoint only advances past the longest prefix of
+    batches whose updates have all been flushed.
+    """
+
+    def __init__(self, courses_col, model_id, write_batch_size, checkpoint_path, stats):
+        self.courses_col = courses_col
+        self.model_id = model_id
+        self.write_batch_size = write_batch_size
+        self.checkpoint_path = checkpoint_path
+        self.stats = stats
+        self.ops = []
+        self.completed = {}  # batch seq -> last scanned _id
+        self.next_seq = 0
+
+    def add(self, seq, last_id, updates):
+        self.ops.extend(updates)
+        self.stats["encoded"] += len(updates)
+        self.completed[seq] = last_id
+        if len(self.ops) >= self.write_batch_size:
+            self.flush()
+        elif not self.ops:
+            self._advance_checkpoint()
+
+    def flush(self):
+        with_retry(flush_updates, self.courses_col, self.ops)
+        self.ops = []
+        self._advance_checkpoint()
+
+    def _advance_checkpoint(self):
+        last_id = None
+        while self.next_seq in self.completed:
+            last_id = self.completed.pop(self.next_seq)
+            self.next_seq += 1
+        if last_id is not None:
+            save_checkpoint(self.checkpoint_path, self.model_id, last_id, self.stats)
+
+
+# =====================================================
+# Parallel (multi-process) encoding
+# =====================================================
+_worker_model = None
+_worker_batch_size = DEFAULT_BATCH_SIZE
+
+
+def _init_worker(threads, batch_size, model_name):
+    """Load the model once per worker process and pin its intra-op threads."""
+    global _worker_model, _worker_batch_size
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already initialised in this process
+    _worker_batch_size = batch_size
+    _worker_model = load_model(model_name)
+
+
+def _encode_in_worker(texts):
+    return _worker_model.encode(texts, batch_size=_worker_batch_size, show_progress_bar=False)
+
+
+def default_threads_per_worker(workers):
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def parallel_encode(batches, workers, threads_per_worker=None, batch_size=DEFAULT_BATCH_SIZE,
+                    max_in_flight=None, model_name=None):
+    """
+    Encode ``(key, texts)`` batches across ``workers`` processes and yield
+    ``(key, vectors)`` as each one finishes (not necessarily in order). At most
+    ``max_in_flight`` batches are outstanding, so the input is consumed lazily.
+    """
+    threads_per_worker = threads_per_worker or default_threads_per_worker(workers)
+    max_in_flight = max_in_flight or workers * 2
+
+    # Spawned workers inherit the environment, so BLAS/OpenMP pools are sized
+    # before torch is imported there.
+    thread_vars = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+    saved_env = {name: os.environ.get(name) for name in thread_vars}
+    for name in thread_vars:
+        os.environ[name] = str(threads_per_worker)
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads_per_worker, batch_size, model_name),
+        ) as pool:
+            in_flight = {}
+            batches = iter(batches)
+            exhausted = False
+            while True:
+                while not exhausted and len(in_flight) < max_in_flight:
+                    try:
+                        key, texts = next(batches)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if texts:
+                        in_flight[pool.submit(_encode_in_worker, texts)] = key
+                    else:
+                        yield key, []
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield in_flight.pop(future), future.result()
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def generate_embeddings(model, courses_col, model_id=None, batch_size=DEFAULT_BATCH_SIZE,
+                        write_batch_size=DEFAULT_WRITE_BATCH_SIZE, full=False,
+                        checkpoint_path=DEFAULT_CHECKPOINT_PATH, resume=True,
+                        workers=1, threads_per_worker=None):
+    """
+    Stream courses in _id order and encode only those whose text hash changed
+    (or that have no vector in ``model_id``'s embedding space yet),
+    ``batch_size`` at a time. Vectors are flushed with unordered bulk writes, and after each flush the last
+    scanned _id is checkpointed so an interrupted run resumes from there.
+    ``full=True`` re-embeds every course regardless of its stored hash.
+
+    With ``workers > 1`` batches are encoded in that many processes (each
+    loading its own model, so ``model`` may be None) while this process stays
+    the single Mongo writer. Returns a dict of run statistics.
+    """
+    model_id = model_id or embedding_model_id()
+    space = space_id(model_id)
+
+    query = {}
+    resume_from = load_checkpoint(checkpoint_path, model_id) if resume else None
+    if resume_from is not None:
+        query["_id"] = {"$gt": resume_from}
+        print(f"Resuming after course {resume_from}")
+
+    total = courses_col.estimated_document_count()
+    mode = "full re-embed" if full else "incremental refresh"
+    print(
+        f"Scanning ~{total} courses ({mode}, model {model_id}, batch size {batch_size}, "
+        f"{workers} worker{'s' if workers != 1 else ''})"
     )
-    
-    if (i + 1) % 100 == 0:
-        print(f"Processed {i + 1}/{len(courses)} courses")
 
-print(f"✅ All {len(courses)} course embeddings generated successfully!")
+    fields = {**projection("embedding_text"), hash_field(space): 1}
+    cursor = courses_col.find(query, fields, batch_size=max(batch_size, 100)).sort("_id", 1)
+
+    stats = {"scanned": 0, "encoded": 0, "skipped": 0}
+    writer = EmbeddingWriter(courses_col, model_id, write_batch_size, checkpoint_path, stats)
+    batches = enumerate(scan_batches(cursor, space, batch_size, full, stats))
+    start = time.perf_counter()
+    last_report = start
+
+    if workers > 1:
+        pending_by_seq = {}
+
+        def texts_for_pool():
+            for seq, (pending, last_id) in batches:
+                pending_by_seq[seq] = (pending, last_id)
+                yield seq, [text for _, text, _ in pending]
+
+        results = parallel_encode(
+            texts_for_pool(), workers, threads_per_worker, batch_size, model_name=model_id
+        )
+        for seq, vectors in results:
+            pending, last_id = pending_by_seq.pop(seq)
+            writer.add(seq, last_id, build_updates(pending, vectors, space))
+            last_report = _report_progress(stats, total, start, last_report)
+    else:
+        for seq, (pending, last_id) in batches:
+            updates = []
+            if pending:
+                vectors = model.encode(
+                    [text for _, text, _ in pending],
+                    batch_size=batch_size,
+                    show_progress_bar=False,
+                )
+                updates = build_updates(pending, vectors, space)
+            writer.add(seq, last_id, updates)
+            last_report = _report_progress(stats, total, start, last_report)
+
+    writer.flush()
+    clear_checkpoint(checkpoint_path)
+
+    elapsed = time.perf_counter() - start
+    rate = stats["encoded"] / elapsed if elapsed > 0 else 0.0
+    print(
+        f"✅ Encoded {stats['encoded']} courses, {stats['skipped']} unchanged, "
+        f"in {elapsed:.1f}s ({rate:.1f} courses/sec)"
+    )
+    return stats
+
+
+def _report_progress(stats, total, start, last_report):
+    now = time.perf_counter()
+    if now - last_report < 5:
+        return last_report
+    rate = stats["encoded"] / (now - start)
+    print(
+        f"Scanned {stats['scanned']}/{total}, encoded {stats['encoded']}, "
+        f"unchanged {stats['skipped']} ({rate:.1f} courses/sec)"
+    )
+    return now
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate course embeddings")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="courses per model.encode call")
+    parser.add_argument("--write-batch-size", type=int, default=DEFAULT_WRITE_BATCH_SIZE,
+                        help="update operations per bulk_write")
+    parser.add_argument("--full", action="store_true",
+                        help="re-embed every course, even if its text hash is unchanged")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH,
+                        help="progress file used to resume an interrupted run")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore an existing checkpoint and scan from the beginning")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="encoder processes (each loads its own model copy)")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="intra-op threads per worker (default: CPU count / workers)")
+    parser.add_argument("--model", default=embedding_model_id(),
+                        help="model whose embedding space to refresh (default: EMBEDDING_MODEL_NAME)")
+    args = parser.parse_args(argv)
+
+    # In parallel mode only the workers need the model
+    model = load_model(args.model) if args.workers <= 1 else None
+    courses_col = get_collection("courses")
+    space = register_space(args.model)
+
+    print(f"Refreshing course embeddings in space {space}...")
+    generate_embeddings(
+        model,
+        courses_col,
+        model_id=args.model,
+        batch_size=args.batch_size,
+        write_batch_size=args.write_batch_size,
+        full=args.full,
+        checkpoint_path=args.checkpoint,
+        resume=not args.restart,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+    )
+    # First complete space becomes the served one; switching away from an
+    # active space is done explicitly with `python -m api.embedding_spaces`.
+    activate_if_complete(space, only_if_unset=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from api.schemas import *
-from api.recommender import recommend_courses
+from api.recommender import rank_courses, normalize_student, catalog_version
 from api.ai_features import generate_ai_insights
+from api import admission, metrics
+from api.singleflight import SingleFlight, request_key
+from api import pagination
+from db.client import pool_stats
 
 app = FastAPI(title="Sri Lanka Course Recommender with AI Features")
 
@@ -15,75 +20,113 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/recommend/ol")
-def recommend_ol(student: OLStudent):
-    recommendations = recommend_courses(student, level="OL")
+# Identical concurrent requests (same normalized student, level and service
+# level) share one run of the recommendation pipeline.
+inflight = SingleFlight("recommend.singleflight")
+
+# Full ranked lists behind /recommend/page cursors
+rankings = pagination.RankingCache()
+
+
+# Admission control: count recommend requests as soon as they arrive (before
+# they wait for a worker thread) and shed them beyond hard capacity. Only the
+# POST pipeline entry points are admitted; GET /recommend/page is a cheap
+# cursor lookup and keeps serving while the pipeline is overloaded.
+@app.middleware("http")
+async def admission_middleware(request: Request, call_next):
+    if request.method != "POST" or not request.url.path.startswith("/recommend/"):
+        return await call_next(request)
+
+    ticket = admission.controller.try_enter()
+    if ticket is None:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Server is overloaded, please retry shortly."},
+            headers={"Retry-After": str(admission.RETRY_AFTER_SECONDS)},
+        )
+
+    request.state.admission = ticket
+    try:
+        return await call_next(request)
+    finally:
+        admission.controller.leave(ticket)
+
+
+def _recommend(student, level, request: Request, response: Response):
+    ticket = getattr(request.state, "admission", None)
+    service_level = (
+        admission.controller.service_level(ticket) if ticket else admission.FULL
+    )
+    response.headers["X-Service-Level"] = service_level
+
+    key = request_key(normalize_student(student, level), service_level)
+    return inflight.do(key, lambda: _run_pipeline(key, student, level, service_level))
+
+
+def _run_pipeline(key, student, level, service_level):
+    version = catalog_version()
+    ranked = rankings.get(key, version)
+    if ranked is None:
+        ranked = rank_courses(
+            student, level=level, semantic=service_level != admission.NON_SEMANTIC
+        )
+        rankings.put(key, version, ranked)
+
+    recommendations = pagination.paginate(ranked, key, version, level)
     # Add AI insights
-    if recommendations.get("recommendations"):
+    if recommendations.get("recommendations") and service_level == admission.FULL:
         ai_insights = generate_ai_insights(
             student.dict(),
             recommendations.get("recommendations", []),
-            "OL"
+            level
         )
         recommendations["ai_insights"] = ai_insights
     return recommendations
 
+
+@app.post("/recommend/ol")
+def recommend_ol(student: OLStudent, request: Request, response: Response):
+    return _recommend(student, "OL", request, response)
+
 @app.post("/recommend/al")
-def recommend_al(student: ALStudent):
-    recommendations = recommend_courses(student, level="AL")
-    if recommendations.get("recommendations"):
-        ai_insights = generate_ai_insights(
-            student.dict(),
-            recommendations.get("recommendations", []),
-            "AL"
-        )
-        recommendations["ai_insights"] = ai_insights
-    return recommendations
+def recommend_al(student: ALStudent, request: Request, response: Response):
+    return _recommend(student, "AL", request, response)
 
 @app.post("/recommend/diploma")
-def recommend_diploma(student: DiplomaStudent):
-    recommendations = recommend_courses(student, level="DIPLOMA")
-    if recommendations.get("recommendations"):
-        ai_insights = generate_ai_insights(
-            student.dict(),
-            recommendations.get("recommendations", []),
-            "DIPLOMA"
-        )
-        recommendations["ai_insights"] = ai_insights
-    return recommendations
+def recommend_diploma(student: DiplomaStudent, request: Request, response: Response):
+    return _recommend(student, "DIPLOMA", request, response)
 
 @app.post("/recommend/hnd")
-def recommend_hnd(student: HNDStudent):
-    recommendations = recommend_courses(student, level="HND")
-    if recommendations.get("recommendations"):
-        ai_insights = generate_ai_insights(
-            student.dict(),
-            recommendations.get("recommendations", []),
-            "HND"
-        )
-        recommendations["ai_insights"] = ai_insights
-    return recommendations
+def recommend_hnd(student: HNDStudent, request: Request, response: Response):
+    return _recommend(student, "HND", request, response)
 
 @app.post("/recommend/bsc")
-def recommend_bsc(student: BScStudent):
-    recommendations = recommend_courses(student, level="BSC")
-    if recommendations.get("recommendations"):
-        ai_insights = generate_ai_insights(
-            student.dict(),
-            recommendations.get("recommendations", []),
-            "BSC"
-        )
-        recommendations["ai_insights"] = ai_insights
-    return recommendations
+def recommend_bsc(student: BScStudent, request: Request, response: Response):
+    return _recommend(student, "BSC", request, response)
 
 @app.post("/recommend/postgrad")
-def recommend_postgrad(student: PostgradStudent):
-    recommendations = recommend_courses(student, level="POSTGRAD")
-    if recommendations.get("recommendations"):
-        ai_insights = generate_ai_insights(
-            student.dict(),
-            recommendations.get("recommendations", []),
-            "POSTGRAD"
+def recommend_postgrad(student: PostgradStudent, request: Request, response: Response):
+    return _recommend(student, "POSTGRAD", request, response)
+
+
+@app.get("/recommend/page")
+def recommend_page(
+    cursor: str,
+    limit: int = Query(pagination.PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+):
+    """Next page of a ranking returned by one of the /recommend/* endpoints."""
+    try:
+        ranked, key, version, level, offset = pagination.resolve_cursor(
+            rankings, cursor, catalog_version()
         )
-        recommendations["ai_insights"] = ai_insights
-    return recommendations
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except pagination.StaleCursor as e:
+        raise HTTPException(status_code=410, detail=f"{e}; request the first page again.")
+
+    return pagination.paginate(ranked, key, version, level, offset=offset, limit=limit)
+
+
+@app.get("/metrics")
+def get_metrics():
+    return {**metrics.snapshot(), "mongo_pool": pool_stats()}
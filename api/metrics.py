@@ -0,0 +1,32 @@
+"""
+Minimal in-process metrics for the API.
+
+Counters and gauges live in a process-wide registry guarded by a lock, so the
+sync endpoints (which FastAPI runs in a threadpool) can update them safely.
+Everything is exposed as JSON at ``GET /metrics``.
+"""
+
+import threading
+
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def set_gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot():
+    with _lock:
+        return {
+            "counters": dict(sorted(_counters.items())),
+            "gauges": dict(sorted(_gauges.items())),
+        }
@@ -0,0 +1,135 @@
+"""
+Cursor-based pagination over cached recommendation rankings.
+
+The first ``/recommend/*`` call ranks every candidate course and stores the
+full list in a bounded TTL cache, keyed by the normalized request and the
+catalog version it was computed against. Later pages are slices of that
+cached ranking, addressed by an opaque, signed cursor. A cursor minted for an
+older catalog version (or whose ranking has expired) is rejected instead of
+silently returning results from a different ranking.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from api import metrics
+
+
+PAGE_SIZE = int(os.environ.get("RECOMMEND_PAGE_SIZE", "12"))
+MAX_PAGE_SIZE = 50
+RANKING_CACHE_SIZE = int(os.environ.get("RANKING_CACHE_SIZE", "256"))
+RANKING_CACHE_TTL = float(os.environ.get("RANKING_CACHE_TTL", "600"))
+
+# Cursors only need to survive as long as the in-process cache, so a random
+# per-process key is enough unless several workers share a load balancer.
+_CURSOR_SECRET = (
+    os.environ.get("CURSOR_SECRET", "").encode("utf-8") or os.urandom(32)
+)
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class StaleCursor(Exception):
+    pass
+
+
+class RankingCache:
+    """LRU of ranked course lists with a per-entry TTL."""
+
+    def __init__(self, max_entries=RANKING_CACHE_SIZE, ttl=RANKING_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                metrics.incr("ranking_cache.miss")
+                return None
+            stored_version, expires_at, ranked = entry
+            if stored_version != version or expires_at < time.monotonic():
+                del self._entries[key]
+                metrics.incr("ranking_cache.miss")
+                return None
+            self._entries.move_to_end(key)
+        metrics.incr("ranking_cache.hit")
+        return ranked
+
+    def put(self, key, version, ranked):
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, ranked)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        metrics.set_gauge("ranking_cache.entries", len(self._entries))
+
+
+def _sign(payload):
+    return hmac.new(_CURSOR_SECRET, payload, hashlib.sha256).hexdigest()[:16]
+
+
+def encode_cursor(key, version, level, offset):
+    payload = json.dumps(
+        {"k": key, "v": version, "l": level, "o": offset}, separators=(",", ":")
+    ).encode("utf-8")
+    token = base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+    return f"{token}.{_sign(payload)}"
+
+
+def decode_cursor(cursor):
+    """Return ``(key, version, level, offset)`` or raise InvalidCursor."""
+    try:
+        token, signature = cursor.rsplit(".", 1)
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidCursor("Cursor signature mismatch")
+
+    try:
+        data = json.loads(payload)
+        return data["k"], data["v"], data["l"], int(data["o"])
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
+
+def paginate(ranked, key, version, level, offset=0, limit=PAGE_SIZE):
+    """Slice one page out of ``ranked`` and mint the cursor for the next one."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page = ranked[offset:offset + limit]
+    next_offset = offset + limit
+    next_cursor = (
+        encode_cursor(key, version, level, next_offset)
+        if next_offset < len(ranked) else None
+    )
+    return {
+        "level": level,
+        "recommendations": page,
+        "total": len(ranked),
+        "next_cursor": next_cursor,
+    }
+
+
+def resolve_cursor(cache, cursor, current_version):
+    """Look up the cached ranking a cursor points at, or raise Invalid/StaleCursor."""
+    key, version, level, offset = decode_cursor(cursor)
+    if version != current_version:
+        metrics.incr("pagination.stale_cursor")
+        raise StaleCursor("Catalog has changed since this cursor was issued")
+
+    ranked = cache.get(key, version)
+    if ranked is None:
+        metrics.incr("pagination.expired_cursor")
+        raise StaleCursor("Ranking for this cursor has expired")
+    return ranked, key, version, level, offset
@@ -1,10 +1,16 @@
-from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 import pandas as pd
 import joblib
 from sklearn.metrics.pairwise import cosine_similarity
 from sentence_transformers import SentenceTransformer
 import numpy as np
 import os
+import threading
+import time
+
+from api.catalog_snapshot import open_snapshot, extract_institution
+from api.embedding_spaces import get_active_space, stored_vector, vector_field
+from db.client import get_collection, projection, with_retry
 
 
 # Load ML model once
@@ -13,50 +19,206 @@ MODEL_PATH = "testing/eligibility_model.pkl"
 model = joblib.load(MODEL_PATH)
 
 
-# AI Embedding model (lazy load + optional local path via EMBEDDING_MODEL_PATH)
-EMBEDDING_MODEL = None
+# AI Embedding models (lazy load + optional local path via EMBEDDING_MODEL_PATH),
+# cached per model name so a new embedding space can be warmed up in the background
+EMBEDDING_MODELS = {}
+DEFAULT_EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
 
-def get_embedding_model():
+def get_embedding_model(model_name=None):
     """Return a cached SentenceTransformer instance or try to load it.
 
-    Set EMBEDDING_MODEL_PATH to a local directory containing the model to avoid
-    network access, or set EMBEDDING_MODEL_NAME to specify a different HF model.
+    Set EMBEDDING_MODEL_PATH to a local directory containing the default model
+    (EMBEDDING_MODEL_NAME) to avoid network access.
     """
-    global EMBEDDING_MODEL
-    if EMBEDDING_MODEL is not None:
-        return EMBEDDING_MODEL
+    model_name = model_name or DEFAULT_EMBEDDING_MODEL
+    if model_name in EMBEDDING_MODELS:
+        return EMBEDDING_MODELS[model_name]
 
-    model_name = os.environ.get("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
-    local_path = os.environ.get("EMBEDDING_MODEL_PATH")
+    local_path = os.environ.get("EMBEDDING_MODEL_PATH") if model_name == DEFAULT_EMBEDDING_MODEL else None
+    embedding_model = None
 
     try:
         if local_path:
             print(f"Loading Sentence-BERT model from local path: {local_path}")
-            EMBEDDING_MODEL = SentenceTransformer(local_path)
+            embedding_model = SentenceTransformer(local_path)
         else:
             # Respect offline flags to avoid long network retries
             if os.environ.get("HF_HUB_OFFLINE") == "1" or os.environ.get("TRANSFORMERS_OFFLINE") == "1":
                 print("⚠️ HF_HUB_OFFLINE or TRANSFORMERS_OFFLINE is set; skipping remote model download.")
-                EMBEDDING_MODEL = None
             else:
                 print(f"Loading Sentence-BERT model: {model_name}")
-                EMBEDDING_MODEL = SentenceTransformer(model_name)
-        if EMBEDDING_MODEL:
+                embedding_model = SentenceTransformer(model_name)
+        if embedding_model:
             print("AI model loaded successfully!")
+            EMBEDDING_MODELS[model_name] = embedding_model
         else:
             print("⚠️ Embedding model not loaded (running without AI).")
     except Exception as e:
         # Keep service running but disable semantic search
         print(f"⚠️ Failed to load embedding model ({model_name}): {e}")
-        EMBEDDING_MODEL = None
-    return EMBEDDING_MODEL
+    return embedding_model
 
 # =====================================================
 # MongoDB
 # =====================================================
-client = MongoClient("mongodb://localhost:27017")
-db = client["ugc_scraper"]
-courses_col = db["courses"]
+courses_col = get_collection("courses")
+
+# =====================================================
+# Catalog snapshot (optional, memory-mapped)
+# =====================================================
+# CATALOG_SOURCE=snapshot serves entirely from the snapshot (no MongoDB needed);
+# with the default "mongo" source the snapshot is only used when MongoDB fails.
+CATALOG_SOURCE = os.environ.get("CATALOG_SOURCE", "mongo")
+CATALOG_SNAPSHOT = open_snapshot(os.environ.get("CATALOG_SNAPSHOT_PATH"))
+
+if CATALOG_SOURCE == "snapshot" and CATALOG_SNAPSHOT is None:
+    print("⚠️ CATALOG_SOURCE=snapshot but no snapshot could be opened; using MongoDB.")
+
+
+def _serve_from_snapshot():
+    return CATALOG_SOURCE == "snapshot" and CATALOG_SNAPSHOT is not None
+
+
+def _snapshot_semantic_search(student_embedding, expected_model):
+    snapshot_model = CATALOG_SNAPSHOT.embedding_model
+    if snapshot_model and snapshot_model != expected_model:
+        print(f"⚠️ Snapshot embeddings are from {snapshot_model}, not {expected_model}; skipping semantic search.")
+        return None
+
+    results = CATALOG_SNAPSHOT.semantic_search(student_embedding, top_k=100)
+    if not results:
+        print("⚠️ No course embeddings in snapshot. Returning all courses.")
+        return None
+    print(f"🤖 AI found {len(results)} semantically relevant courses (snapshot {CATALOG_SNAPSHOT.version})")
+    return results
+
+
+# After a MongoDB failure the read paths go straight to the snapshot for this
+# many seconds instead of waiting out server selection on every request
+MONGO_COOLDOWN = float(os.environ.get("CATALOG_MONGO_COOLDOWN", "30"))
+_mongo_down_until = 0.0
+
+
+def _mongo_in_cooldown():
+    return CATALOG_SNAPSHOT is not None and time.monotonic() < _mongo_down_until
+
+
+def _read_mongo(read):
+    """
+    ``read()`` from MongoDB, or None when the caller should serve from the
+    snapshot instead. With a snapshot to fall back on there is a single
+    attempt (no retries), and a failure sends every read to the snapshot for
+    the next CATALOG_MONGO_COOLDOWN seconds. Without one, transient errors
+    are retried and then raised.
+    """
+    global _mongo_down_until
+    if CATALOG_SNAPSHOT is None:
+        return with_retry(read)
+    if _mongo_in_cooldown():
+        return None
+    try:
+        return read()
+    except PyMongoError as e:
+        _mongo_down_until = time.monotonic() + MONGO_COOLDOWN
+        print(f"⚠️ MongoDB unavailable ({type(e).__name__}); serving from catalog snapshot "
+              f"{CATALOG_SNAPSHOT.version} for the next {MONGO_COOLDOWN:.0f}s")
+        return None
+
+
+def load_all_courses():
+    """All courses for the non-semantic path, from MongoDB or the snapshot."""
+    if _serve_from_snapshot():
+        return CATALOG_SNAPSHOT.records()
+    courses = _read_mongo(lambda: list(courses_col.find({}, projection("recommender_catalog"))))
+    return CATALOG_SNAPSHOT.records() if courses is None else courses
+
+# =====================================================
+# Embedding space (which model's vectors semantic search reads)
+# =====================================================
+EMBEDDING_SPACE_TTL = float(os.environ.get("EMBEDDING_SPACE_TTL", "30"))
+_served_space = None  # (space, model_name); space None = legacy "embedding" field
+_space_checked_at = 0.0
+_space_lock = threading.Lock()
+_warming = set()
+
+
+def _warm_up_space(target):
+    """Load the target space's model off the request path, then switch to it."""
+    global _served_space
+    try:
+        if get_embedding_model(target[1]) is not None:
+            _served_space = target
+            print(f"🔀 Now serving embedding space {target[0]} ({target[1]})")
+    finally:
+        with _space_lock:
+            _warming.discard(target)
+
+
+def served_embedding_space():
+    """
+    ``(space, model_name)`` that semantic search uses. The active-space
+    pointer is re-read at most every EMBEDDING_SPACE_TTL seconds; when it
+    moves to a model that is not loaded yet, the old space keeps serving
+    until the new model has loaded in the background.
+    """
+    global _served_space, _space_checked_at
+    now = time.monotonic()
+    if _served_space is not None and now - _space_checked_at < EMBEDDING_SPACE_TTL:
+        return _served_space
+
+    with _space_lock:
+        _space_checked_at = now
+        try:
+            active = get_active_space()
+        except PyMongoError:
+            return _served_space or (None, DEFAULT_EMBEDDING_MODEL)
+        target = (active["space"], active["model"]) if active else (None, DEFAULT_EMBEDDING_MODEL)
+
+        if _served_space is None or target[1] in EMBEDDING_MODELS:
+            _served_space = target
+        elif target != _served_space and target not in _warming:
+            _warming.add(target)
+            threading.Thread(target=_warm_up_space, args=(target,), daemon=True).start()
+    return _served_space
+
+# =====================================================
+# Catalog version (ties cached rankings / cursors to the data they came from)
+# =====================================================
+RANKING_LIMIT = int(os.environ.get("RANKING_LIMIT", "500"))
+CATALOG_VERSION_TTL = float(os.environ.get("CATALOG_VERSION_TTL", "30"))
+_catalog_version = (None, 0.0)
+
+
+def catalog_version():
+    """
+    Identifier of the catalog currently being served. For the snapshot it is
+    the snapshot version; for MongoDB it is derived from the course count, the
+    latest scrape time and the served embedding space, re-checked at most every
+    CATALOG_VERSION_TTL seconds.
+    """
+    global _catalog_version, _mongo_down_until
+    if _serve_from_snapshot() or _mongo_in_cooldown():
+        return f"snapshot-{CATALOG_SNAPSHOT.version}"
+
+    version, checked_at = _catalog_version
+    if version is not None and time.monotonic() - checked_at < CATALOG_VERSION_TTL:
+        return version
+
+    try:
+        count = courses_col.estimated_document_count()
+        latest = courses_col.find_one({}, projection("catalog_version"), sort=[("scraped_at", -1)])
+        scraped_at = latest.get("scraped_at") if latest else None
+        space, _ = served_embedding_space()
+        version = f"mongo-{count}-{scraped_at.isoformat() if scraped_at else 'none'}-{space or 'legacy'}"
+    except PyMongoError:
+        if CATALOG_SNAPSHOT is None:
+            version = "unavailable"
+        else:
+            _mongo_down_until = time.monotonic() + MONGO_COOLDOWN
+            version = f"snapshot-{CATALOG_SNAPSHOT.version}"
+
+    _catalog_version = (version, time.monotonic())
+    return version
 
 # =====================================================
 # Student normalization (SAFE)
@@ -73,6 +235,10 @@ def normalize_student(student, level):
         "diploma_field": getattr(student, "diploma_field", None),
         "degree_field": getattr(student, "degree_field", None),
         "postgrad_field": getattr(student, "postgrad_field", None),
+        "highest_degree": getattr(student, "highest_degree", None),
+        "gpa": getattr(student, "gpa", None),
+        "institution_recognized": getattr(student, "institution_recognized", False),
+        "research_experience": getattr(student, "research_experience", False),
         "level": level
     }
 
@@ -107,15 +273,29 @@ def semantic_course_search(student_vec, level):
         else:
             profile = "Student looking for suitable courses"
         
+        # The query must be encoded by the same model as the course vectors
+        if _serve_from_snapshot():
+            space, model_name = None, CATALOG_SNAPSHOT.embedding_model or DEFAULT_EMBEDDING_MODEL
+        else:
+            space, model_name = served_embedding_space()
+
         # Generate student profile embedding
-        model = get_embedding_model()
+        model = get_embedding_model(model_name)
         if model is None:
             print("⚠️ Embedding model unavailable; skipping semantic search.")
             return None
         student_embedding = model.encode(profile)
-        
-        # Get all courses with embeddings
-        courses = list(courses_col.find({"embedding": {"$exists": True}}))
+
+        if _serve_from_snapshot():
+            return _snapshot_semantic_search(student_embedding, model_name)
+
+        # Get all courses with embeddings in the served space
+        field = vector_field(space) if space else "embedding"
+        courses = _read_mongo(lambda: list(courses_col.find(
+            {field: {"$exists": True}}, {**projection("recommender_semantic"), field: 1}
+        )))
+        if courses is None:
+            return _snapshot_semantic_search(student_embedding, model_name)
         
         if not courses:
             print("⚠️ No course embeddings found. Returning all courses.")
@@ -125,7 +305,7 @@ def semantic_course_search(student_vec, level):
         similarities = []
         for course in courses:
             try:
-                course_embedding = np.array(course["embedding"])
+                course_embedding = np.array(stored_vector(course, space))
                 # Cosine similarity
                 similarity = np.dot(student_embedding, course_embedding) / (
                     np.linalg.norm(student_embedding) * np.linalg.norm(course_embedding)
@@ -151,31 +331,40 @@ def semantic_course_search(student_vec, level):
 # =====================================================
 # MAIN RECOMMENDER
 # =====================================================
-def recommend_courses(student, level):
+def rank_courses(student, level, semantic=True):
+    """
+    Full ranked list of eligible courses (best first, capped at RANKING_LIMIT).
+    ``semantic=False`` skips the embedding model and semantic search (used by
+    admission control under overload) and scores every course with the
+    neutral fallback ``semantic_score``.
+    """
     student_vec = normalize_student(student, level)
 
     # -------------------------
     # AI-Powered Semantic Search (Step 1)
     # -------------------------
-    print("🤖 Running AI semantic course matching...")
-    semantic_results = semantic_course_search(student_vec, level)
-    
+    if semantic:
+        print("🤖 Running AI semantic course matching...")
+        semantic_results = semantic_course_search(student_vec, level)
+    else:
+        semantic_results = None
+
     if semantic_results:
         # Use AI-filtered courses
         df = pd.DataFrame(semantic_results)
         print(f"✅ AI pre-filtered to {len(df)} relevant courses")
     else:
-        # Fallback to all courses if AI fails
-        print("⚠️ Using traditional search (AI unavailable)")
-        courses = list(courses_col.find())
+        # Fallback to all courses if AI fails (or was skipped under load)
+        if semantic:
+            print("⚠️ Using traditional search (AI unavailable)")
+        else:
+            print("⚠️ Using traditional search (degraded under load)")
+        courses = load_all_courses()
         df = pd.DataFrame(courses)
         df["semantic_score"] = 0.5  # Neutral score for fallback
 
     if df.empty:
-        return {
-            "level": level,
-            "recommendations": []
-        }
+        return []
 
     # -------------------------
     # LEVEL-BASED HARD FILTERING (CRITICAL)
@@ -661,10 +850,7 @@ def recommend_courses(student, level):
                 )]
 
     if df.empty:
-        return {
-            "level": level,
-            "recommendations": []
-        }
+        return []
 
     # -------------------------
     # Feature engineering
@@ -879,42 +1065,18 @@ def recommend_courses(student, level):
     )]
     
     if df.empty:
-        return {
-            "level": level,
-            "recommendations": []
-        }
+        return []
 
     # -------------------------
     # Return top results with institution info (if available)
     # -------------------------
-    # Extract institution name from source_url, handling www subdomain
-    def extract_institution(url):
-        if not isinstance(url, str) or "." not in url:
-            return "Unknown"
-        try:
-            # Get the domain part (e.g., "www.anc.edu.lk" from "https://www.anc.edu.lk/path")
-            domain = url.split("/")[2] if "/" in url else url
-            domain_parts = domain.split(".")
-            
-            # Remove 'www' if it's the first part
-            if domain_parts[0].lower() == "www" and len(domain_parts) > 1:
-                domain_parts = domain_parts[1:]
-            
-            # Return the first part (institution name)
-            return domain_parts[0] if domain_parts else "Unknown"
-        except:
-            return "Unknown"
-    
     # Always regenerate institution from source_url to ensure consistency
     df["institution"] = df["source_url"].apply(extract_institution)
     
     results = (
         df.sort_values("final_score", ascending=False)
-        .head(12)[["course_name", "source_url", "final_score", "institution"]]
+        .head(RANKING_LIMIT)[["course_name", "source_url", "final_score", "institution"]]
         .to_dict(orient="records")
     )
 
-    return {
-        "level": level,
-        "recommendations": results
-    }
+    return results
@@ -0,0 +1,66 @@
+"""
+Single-flight deduplication of identical concurrent work.
+
+The first caller for a key runs the computation; callers that arrive with the
+same key while it is still running wait for that result instead of repeating
+the embedding + filter + scoring + insights pipeline. Keys are dropped as soon
+as the computation finishes, so this is not a cache.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+
+from api import metrics
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self, name="singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Run ``fn()`` once per in-flight ``key``; waiters get a deep copy of the result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            metrics.incr(f"{self.name}.shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Endpoints may mutate the response, so never hand out the leader's object
+            return copy.deepcopy(call.result)
+
+        metrics.incr(f"{self.name}.leader")
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def request_key(*parts):
+    """Stable key for JSON-serialisable request parts (e.g. a normalized student)."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
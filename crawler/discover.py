@@ -1,7 +1,10 @@
+import asyncio
 import re
-import requests
-from crawler.sitemap import fetch_sitemap_urls
-from crawler.robots import can_fetch
+from datetime import datetime
+
+from crawler.sitemap import stream_sitemap
+from crawler.robots import default_cache
+from downloader.html_downloader import normalize_url
 
 
 
@@ -137,42 +140,83 @@ def is_esoft_course(url: str) -> bool:
 
 
 
-def discover_course_urls(university: dict) -> list[str]:
+def is_course_url(university: dict, url: str) -> bool:
 
-    urls = fetch_sitemap_urls(university["sitemap_url"])
-    results = []
+    if university["type"] == "apiit":
+        if not is_apiit_course(url):
+            return False
 
-    for url in urls:
+    if university["type"] == "horizon":
+        if not HORIZON_COURSE_REGEX.search(url):
+            return False
 
-        if university["type"] == "apiit":
-            if not is_apiit_course(url):
-                continue
+    if university["type"] == "bcas":
+        if not is_bcas_course(url):
+            return False
 
-        if university["type"] == "horizon":
-            if not HORIZON_COURSE_REGEX.search(url):
-                continue
+    if university["type"] == "iit":
+        if not is_iit_course(url):
+            return False
 
-        if university["type"] == "bcas":
-            if not is_bcas_course(url):
-                continue
+    if university["type"] == "anc":
+        if not is_anc_course(url):
+            return False
 
-        if university["type"] == "iit":
-            if not is_iit_course(url):
-                continue
+    if university["type"] == "sliit":
+        if not is_sliit_course(url):
+            return False
+    
+    if university["type"] == "esoft":
+        if not is_esoft_course(url):
+            return False
 
-        if university["type"] == "anc":
-            if not is_anc_course(url):
-                continue
+    return True
 
-        if university["type"] == "sliit":
-            if not is_sliit_course(url):
-                continue
-        
-        if university["type"] == "esoft":
-            if not is_esoft_course(url):
+
+def _fetched_at(page_index, url):
+    entry = page_index.get(normalize_url(url))
+    if entry is None or not entry["fetched_at"]:
+        return None
+    return datetime.fromisoformat(entry["fetched_at"])
+
+
+async def discover_course_urls_async(university: dict, downloader, page_index=None,
+                                     robots=None) -> tuple[list[str], list[str]]:
+    """
+    Stream the university's sitemap(s) through ``downloader`` and return
+    ``(course_urls, skipped)``. robots.txt is fetched (or read from
+    ``robots``, a RobotsCache) concurrently with the sitemap, and its
+    Crawl-delay is applied to the host's download slot. With ``page_index``,
+    URLs whose sitemap ``<lastmod>`` is not newer than our last fetch are
+    moved to ``skipped``; URLs without a lastmod are always returned.
+    """
+    robots = robots or default_cache()
+    base_url = university["base_url"]
+    robots_ready = asyncio.ensure_future(robots.ensure(base_url, downloader))
+
+    candidates = []
+    async for entry in stream_sitemap(downloader, university["sitemap_url"]):
+        if is_course_url(university, entry.loc):
+            candidates.append(entry)
+
+    await robots_ready
+    robots.apply_crawl_delay(base_url, downloader)
+
+    results = []
+    skipped = []
+
+    for entry in candidates:
+        url = entry.loc
+
+        if not robots.can_fetch(base_url, url):
+            continue
+
+        if page_index is not None and entry.lastmod is not None:
+            fetched_at = _fetched_at(page_index, url)
+            if fetched_at is not None and entry.lastmod <= fetched_at:
+                skipped.append(url)
                 continue
 
-        if can_fetch(university["base_url"], url):
-            results.append(url)
+        results.append(url)
 
-    return results
+    return results, skipped
@@ -0,0 +1,229 @@
+"""
+Durable crawl frontier.
+
+Every discovered course URL gets a row in ``<CRAWL_STATE_DIR>/frontier.sqlite``
+tracking its stage (discovered -> downloaded -> extracted -> saved, or
+failed), attempt count, last error and per-stage timings. A restarted crawl
+picks up exactly the URLs that are not saved yet. Failed URLs are retried
+once their ``next_attempt_at`` passes (CRAWL_RETRY_AFTER, doubling per
+attempt) until CRAWL_MAX_ATTEMPTS is reached.
+
+Stage updates (``mark`` / ``fail``) are buffered and committed in batches,
+so the crawl's event loop does not wait on a SQLite commit per page. Reads
+and ``close`` flush the buffer first; a crash loses at most one batch of
+progress, and those pages are simply processed again on the next run.
+
+    python -m crawler.frontier status
+    python -m crawler.frontier failed [--uni sliit]
+    python -m crawler.frontier retry [--uni sliit]
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+from crawler import settings
+
+
+DISCOVERED = "discovered"
+DOWNLOADED = "downloaded"
+EXTRACTED = "extracted"
+SAVED = "saved"
+FAILED = "failed"
+
+STAGES = (DISCOVERED, DOWNLOADED, EXTRACTED, SAVED, FAILED)
+
+# Buffered stage updates are committed once this many are waiting, or on
+# the first update after FLUSH_INTERVAL seconds
+FLUSH_SIZE = 200
+FLUSH_INTERVAL = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    url             TEXT PRIMARY KEY,
+    uni_id          TEXT NOT NULL,
+    status          TEXT NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    discovered_at   REAL,
+    updated_at      REAL,
+    next_attempt_at REAL,
+    download_ms     REAL,
+    extract_ms      REAL,
+    save_ms         REAL
+);
+CREATE INDEX IF NOT EXISTS frontier_uni_status ON frontier (uni_id, status);
+"""
+
+
+class Frontier:
+    def __init__(self, path=None, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path or os.path.join(settings.STATE_DIR, "frontier.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.updates = []  # (sql, params) waiting for the next commit
+        self.flushed_at = time.monotonic()
+
+    def _update(self, sql, params):
+        with self.lock:
+            self.updates.append((sql, params))
+            if (len(self.updates) >= self.flush_size
+                    or time.monotonic() - self.flushed_at >= self.flush_interval):
+                self._flush()
+
+    def _flush(self):
+        # Caller holds self.lock
+        if self.updates:
+            for sql, params in self.updates:
+                self.conn.execute(sql, params)
+            self.conn.commit()
+            self.updates = []
+        self.flushed_at = time.monotonic()
+
+    def flush(self):
+        """Commit buffered stage updates now."""
+        with self.lock:
+            self._flush()
+
+    def has_state(self, uni_id):
+        with self.lock:
+            self._flush()
+            row = self.conn.execute("SELECT 1 FROM frontier WHERE uni_id = ? LIMIT 1", (uni_id,)).fetchone()
+        return row is not None
+
+    def add(self, uni_id, urls, requeue=False):
+        """
+        Record discovered URLs. Known URLs keep their state, except that
+        ``requeue`` (a refresh crawl) sends saved ones through the pipeline again.
+        """
+        now = time.time()
+        with self.lock:
+            self._flush()
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO frontier (url, uni_id, status, discovered_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(url, uni_id, DISCOVERED, now, now) for url in urls],
+            )
+            if requeue:
+                self.conn.executemany(
+                    "UPDATE frontier SET status = ?, updated_at = ? WHERE url = ? AND status = ?",
+                    [(DISCOVERED, now, url, SAVED) for url in urls],
+                )
+            self.conn.commit()
+
+    def mark(self, url, status, **timings_ms):
+        """Advance ``url`` to ``status``, storing stage timings (download_ms/extract_ms/save_ms)."""
+        columns = {name: value for name, value in timings_ms.items()
+                   if name in ("download_ms", "extract_ms", "save_ms")}
+        assignments = "".join(f", {name} = ?" for name in columns)
+        params = (status, time.time(), *columns.values(), url)
+        self._update(f"UPDATE frontier SET status = ?, updated_at = ?{assignments} WHERE url = ?", params)
+
+    def fail(self, url, error):
+        """Record a failure and schedule the next attempt (none once MAX_ATTEMPTS is reached)."""
+        # The backoff is computed from the stored attempt count, so the
+        # update can wait in the buffer like any other
+        now = time.time()
+        self._update(
+            "UPDATE frontier SET status = ?, attempts = attempts + 1, last_error = ?, updated_at = ?, "
+            "next_attempt_at = CASE WHEN attempts + 1 < ? THEN ? + ? * (1 << attempts) END WHERE url = ?",
+            (FAILED, str(error)[:500], now, settings.MAX_ATTEMPTS, now, settings.RETRY_AFTER, url),
+        )
+
+    def pending(self, uni_id):
+        """URLs with outstanding work: unfinished stages plus failures due for a retry."""
+        with self.lock:
+            self._flush()
+            rows = self.conn.execute(
+                "SELECT url FROM frontier WHERE uni_id = ? AND ("
+                "  status IN (?, ?, ?)"
+                "  OR (status = ? AND next_attempt_at IS NOT NULL AND next_attempt_at <= ?)"
+                ") ORDER BY discovered_at, url",
+                (uni_id, DISCOVERED, DOWNLOADED, EXTRACTED, FAILED, time.time()),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def counts(self, uni_id=None):
+        """``{status: count}``, for one university or all of them."""
+        query = "SELECT status, COUNT(*) FROM frontier"
+        params = ()
+        if uni_id is not None:
+            query += " WHERE uni_id = ?"
+            params = (uni_id,)
+        with self.lock:
+            self._flush()
+            rows = self.conn.execute(query + " GROUP BY status", params).fetchall()
+        return {status: count for status, count in rows}
+
+    def failed(self, uni_id=None):
+        query = "SELECT url, uni_id, attempts, next_attempt_at, last_error FROM frontier WHERE status = ?"
+        params = [FAILED]
+        if uni_id is not None:
+            query += " AND uni_id = ?"
+            params.append(uni_id)
+        with self.lock:
+            self._flush()
+            return self.conn.execute(query + " ORDER BY uni_id, url", params).fetchall()
+
+    def retry_now(self, uni_id=None):
+        """Make every failed URL (including given-up ones) due on the next run."""
+        query = "UPDATE frontier SET next_attempt_at = ?, attempts = 0 WHERE status = ?"
+        params = [time.time(), FAILED]
+        if uni_id is not None:
+            query += " AND uni_id = ?"
+            params.append(uni_id)
+        with self.lock:
+            self._flush()
+            updated = self.conn.execute(query, params).rowcount
+            self.conn.commit()
+        return updated
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the crawl frontier")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (
+        ("status", "URL counts per university and stage"),
+        ("failed", "List failed URLs with their next retry time"),
+        ("retry", "Retry failed URLs on the next run"),
+    ):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("--uni", default=None, help="university id from config/universities.json")
+    args = parser.parse_args(argv)
+
+    frontier = Frontier()
+    if args.command == "status":
+        with frontier.lock:
+            uni_ids = [row[0] for row in frontier.conn.execute(
+                "SELECT DISTINCT uni_id FROM frontier ORDER BY uni_id"
+            )]
+        print(f"{'university':<12}" + "".join(f"{stage:>12}" for stage in STAGES))
+        for uni_id in uni_ids:
+            if args.uni and uni_id != args.uni:
+                continue
+            counts = frontier.counts(uni_id)
+            print(f"{uni_id:<12}" + "".join(f"{counts.get(stage, 0):>12}" for stage in STAGES))
+    elif args.command == "failed":
+        for url, uni_id, attempts, next_attempt_at, error in frontier.failed(args.uni):
+            when = (time.strftime("%Y-%m-%d %H:%M", time.localtime(next_attempt_at))
+                    if next_attempt_at else "given up")
+            print(f"{uni_id:<10} {attempts} attempts, next: {when:<16} {url}\n           {error}")
+    elif args.command == "retry":
+        print(f"{frontier.retry_now(args.uni)} failed URLs will be retried on the next crawl")
+    frontier.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Crawl orchestration used by main.py: discover -> download -> extract ->
+normalize -> save, for every university concurrently.
+
+Pages stream through three stages connected by bounded queues
+(crawler/pipeline.py): download (CRAWL_CONCURRENCY async workers), extract
+(one worker per ExtractionPool slot, parsing in the process pool) and save
+(CRAWL_SAVE_WORKERS threads normalizing into the bulk CourseWriter, which
+feeds the embedding queue). Discovery blocks once the download queue is
+full, so memory stays bounded however many URLs a crawl covers.
+"""
+
+import asyncio
+import time
+from collections import Counter, defaultdict, namedtuple
+from functools import partial
+
+from crawler import settings
+from crawler.discover import discover_course_urls_async
+from crawler.frontier import Frontier, DOWNLOADED, EXTRACTED, SAVED
+from crawler.pipeline import Pipeline, Stage
+from crawler.robots import RobotsCache
+from crawler.telemetry import CrawlTelemetry
+from downloader.async_downloader import AsyncDownloader
+from downloader.html_downloader import normalize_url
+from downloader.page_index import PageIndex
+from extractor.cache import ExtractionCache
+from extractor.pool import ExtractionPool
+from extractor.registry import get_extractor
+
+from normalizer.normalize import normalize_course
+from db.mongodb import CourseWriter, upsert_university, courses
+
+
+def university_has_courses(uni_id):
+    return courses.count_documents({"university_id": uni_id}) > 0
+
+
+def save_page(writer, uni_id, url, raw, uni_key=None):
+    # Marked saved (and embedded) by the writer's on_saved once the bulk write lands
+    start = time.perf_counter()
+    normalized = normalize_course(raw)
+    writer.add(normalized, uni_id, tag=(url, start, uni_key))
+
+
+def course_writer(frontier, embed_queue, stats=None, telemetry=None):
+    """
+    CourseWriter whose callbacks advance the frontier and feed the embedding
+    queue; ``stats`` (uni id -> Counter) gets per-university write counts.
+    """
+    def on_saved(course, tag):
+        url, start, uni_key = tag
+        seconds = time.perf_counter() - start
+        frontier.mark(url, SAVED, save_ms=seconds * 1000)
+        if telemetry is not None:
+            telemetry.stage(uni_key, "save", seconds)
+        if stats is not None:
+            stats[uni_key]["courses"] += 1
+        if embed_queue is not None:
+            embed_queue.submit(course)
+        print(f"Saved: {course['course_name']}")
+
+    def on_failed(course, tag, error):
+        url, _, uni_key = tag
+        frontier.fail(url, error)
+        if stats is not None:
+            stats[uni_key]["write_errors"] += 1
+        print(f"FAILED {url}: {error}")
+
+    return CourseWriter(on_saved=on_saved, on_failed=on_failed)
+
+
+async def plan_university(uni, uni_id, downloader, frontier, page_index, robots, refresh):
+    """
+    ``(urls, not_modified)`` to work on this run. The sitemap is discovered
+    and new URLs are merged into the frontier, which keeps the state of
+    known ones, so a resumed crawl picks up both its outstanding URLs and
+    pages added since. If discovery fails on a resume, the outstanding
+    URLs are still worked on. ``not_modified`` are URLs skipped by sitemap
+    <lastmod> on a refresh.
+    """
+    resuming = not refresh and frontier.has_state(uni["id"])
+
+    #SKIP ALREADY SCRAPED UNIVERSITIES (crawled before the frontier existed)
+    if not refresh and not resuming and await asyncio.to_thread(university_has_courses, uni_id):
+        print(f"{uni['name']}: already scraped, skipping...")
+        return [], []
+
+    try:
+        # On a refresh, sitemap <lastmod> lets us skip pages unchanged since the last fetch
+        urls, not_modified = await discover_course_urls_async(
+            uni, downloader, page_index if refresh else None, robots
+        )
+        print(f"{uni['name']}: found {len(urls)} course URLs")
+    except Exception as e:
+        if not resuming:
+            raise
+        print(f"  ⚠️  {uni['name']}: sitemap failed ({type(e).__name__}: {e}); resuming known URLs only")
+        urls, not_modified = [], []
+    frontier.add(uni["id"], urls, requeue=refresh)
+    pending = frontier.pending(uni["id"])
+    if resuming:
+        print(f"{uni['name']}: resuming {len(pending)} outstanding URLs")
+    return pending, not_modified
+
+
+# One page on its way through the pipeline; digest and raw are filled in by the stages
+PageJob = namedtuple("PageJob", ["uni", "uni_id", "extractor", "url", "digest", "raw"])
+
+
+def fail_page(ctx, job, error):
+    ctx["frontier"].fail(job.url, error)
+    ctx["stats"][job.uni["id"]]["errors"] += 1
+    print(f"FAILED {job.url}: {error}")
+
+
+async def download_page(ctx, refresh, job, emit):
+    uni, url = job.uni, job.url
+    start = time.perf_counter()
+    digest, changed = await ctx["downloader"].download(url, uni["id"], refresh)
+    seconds = time.perf_counter() - start
+    download_ms = seconds * 1000
+    ctx["telemetry"].stage(uni["id"], "download", seconds)
+    if not changed and ctx["cache"].is_current(uni["type"], job.extractor, digest, url):
+        ctx["frontier"].mark(url, SAVED, download_ms=download_ms)
+        ctx["stats"][uni["id"]]["unchanged"] += 1
+        return
+    ctx["frontier"].mark(url, DOWNLOADED, download_ms=download_ms)
+    await emit(job._replace(digest=digest))
+
+
+async def extract_page(ctx, job, emit):
+    # A page is parsed once per content hash and extractor version
+    uni_type, cache = job.uni["type"], ctx["cache"]
+    start = time.perf_counter()
+    raw = cache.get(uni_type, job.extractor, job.digest, job.url)
+    if raw is None:
+        raw = await ctx["extraction"].extract(uni_type, job.digest, job.url)
+        cache.put(uni_type, job.extractor, job.digest, job.url, raw)
+    seconds = time.perf_counter() - start
+    ctx["frontier"].mark(job.url, EXTRACTED, extract_ms=seconds * 1000)
+    ctx["telemetry"].stage(job.uni["id"], "extract", seconds)
+    await emit(job._replace(raw={**raw, "source_url": job.url}))
+
+
+async def save_page_job(ctx, job, emit):
+    await asyncio.to_thread(save_page, ctx["writer"], job.uni_id, job.url, job.raw, job.uni["id"])
+
+
+async def crawl_university(ctx, uni, refresh, download, extract):
+    """Plan one university and feed its pages into the ``download`` (or ``extract``) stage."""
+    print(f"\nProcessing {uni['name']}")
+
+    # Blocking DB calls run in threads so other universities keep downloading
+    uni_id = await asyncio.to_thread(upsert_university, uni)
+
+    urls, not_modified = await plan_university(
+        uni, uni_id, ctx["downloader"], ctx["frontier"], ctx["page_index"], ctx["robots"], refresh
+    )
+    extractor = get_extractor(uni["type"])
+    stats = ctx["stats"][uni["id"]]
+    stats["pages"] += len(urls) + len(not_modified)
+
+    # Pages that were not re-downloaded are still re-extracted from the
+    # store when their extractor's version changed
+    for url in not_modified:
+        entry = ctx["page_index"].get(normalize_url(url))
+        digest = entry and entry["content_hash"]
+        if digest and not ctx["cache"].is_current(uni["type"], extractor, digest, url):
+            await extract.put(PageJob(uni, uni_id, extractor, url, digest, None))
+        else:
+            stats["unchanged"] += 1
+
+    # Waits whenever the download queue is full
+    for url in urls:
+        await download.put(PageJob(uni, uni_id, extractor, url, None, None))
+
+
+def university_summary(uni, stats, frontier, error=None):
+    """One university's numbers for this run (see crawler/runner.py)."""
+    return {
+        "id": uni["id"],
+        "name": uni["name"],
+        "status": "failed" if error is not None else "ok",
+        "error": None if error is None else f"{type(error).__name__}: {error}",
+        "pages": stats["pages"],
+        "unchanged": stats["unchanged"],
+        "courses": stats["courses"],
+        "errors": stats["errors"] + stats["write_errors"],
+        "frontier": frontier.counts(uni["id"]),
+    }
+
+
+async def crawl(universities, refresh=False, embed_queue=None, extract_workers=None, stats=None):
+    """
+    Crawl ``universities`` and return a summary dict per university.
+    ``stats`` (uni id -> Counter of pages / unchanged / courses / errors) is
+    filled in as the crawl goes, so a caller that cancels it can still read
+    partial counts.
+    """
+    start = time.perf_counter()
+    stats = stats if stats is not None else defaultdict(Counter)
+    frontier = Frontier()
+    try:
+        page_index = PageIndex()
+        robots = RobotsCache()
+        cache = ExtractionCache()
+        telemetry = CrawlTelemetry()
+        writer = course_writer(frontier, embed_queue, stats, telemetry)
+        try:
+            async with AsyncDownloader(page_index=page_index, telemetry=telemetry) as downloader, \
+                    ExtractionPool(extract_workers, store=downloader.store) as extraction:
+                ctx = {
+                    "downloader": downloader,
+                    "extraction": extraction,
+                    "frontier": frontier,
+                    "page_index": page_index,
+                    "robots": robots,
+                    "cache": cache,
+                    "writer": writer,
+                    "stats": stats,
+                    "telemetry": telemetry,
+                }
+
+                def on_error(job, error):
+                    fail_page(ctx, job, error)
+
+                # Async I/O workers fetch, pool slots extract, a few threads feed the bulk writer
+                download = Stage("download", partial(download_page, ctx, refresh), downloader.concurrency,
+                                 on_error=on_error)
+                extract = Stage("extract", partial(extract_page, ctx), extraction.max_in_flight,
+                                on_error=on_error)
+                save = Stage("save", partial(save_page_job, ctx), settings.SAVE_WORKERS, on_error=on_error)
+                gauges = {"mongo": lambda: len(writer.buffer)}
+                if embed_queue is not None:
+                    gauges["embed"] = embed_queue.queue.qsize
+                pipeline = Pipeline([download, extract, save], gauges=gauges)
+                results = await pipeline.run(
+                    [crawl_university(ctx, uni, refresh, download, extract) for uni in universities]
+                )
+        finally:
+            # Also on cancellation (a runner timeout): keep what was saved so far
+            writer.close()
+            robots.save()
+            page_index.close()
+            cache.close()
+
+        print()
+        summaries = []
+        for uni, result in zip(universities, results):
+            error = result if isinstance(result, Exception) else None
+            if error is not None:
+                print(f"FAILED {uni['name']}: {error}")
+            unchanged = stats[uni["id"]]["unchanged"]
+            if unchanged:
+                print(f"{uni['name']}: {unchanged} pages unchanged since last crawl")
+            print(f"{uni['name']}: {frontier.counts(uni['id'])}")
+            summaries.append(university_summary(uni, stats[uni["id"]], frontier, error))
+    finally:
+        # Commits buffered stage updates, also on cancellation
+        frontier.close()
+    pipeline.report()
+    downloader.report()
+    extraction.report()
+    print(f"Extraction cache: {cache.hits} hits, {cache.misses} misses")
+    writer.report()
+
+    report = telemetry.to_dict(
+        robots_denied=dict(robots.denied),
+        rates=downloader.rate_stats(),
+        summaries=summaries,
+        extra={
+            "refresh": refresh,
+            "pipeline": {stage.name: {"workers": stage.workers, "done": stage.processed, "errors": stage.errors}
+                         for stage in pipeline.stages},
+            "extraction": extraction.stats,
+            "extraction_cache": {"hits": cache.hits, "misses": cache.misses},
+            "course_writes": writer.flush_stats(),
+        },
+    )
+    json_path, text_path = telemetry.write(report, label=universities[0]["id"] if len(universities) == 1 else None)
+    print(f"Telemetry report: {text_path} (JSON: {json_path})")
+    print(f"\nCrawl finished in {time.perf_counter() - start:.1f}s")
+    return summaries
@@ -0,0 +1,165 @@
+"""
+Bounded, staged pipeline for the crawl.
+
+Each ``Stage`` is a pool of asyncio worker tasks that take items from a
+bounded input queue and pass results to the next stage's queue. A full
+queue blocks its producer, so a slow stage slows everything upstream
+instead of letting pages pile up in memory. Each stage is sized on its own
+(async I/O workers for downloads, one worker per pool slot for extraction,
+a few for the batched MongoDB writer).
+
+    download = Stage("download", fetch, workers=16, maxsize=256)
+    extract = Stage("extract", parse, workers=8, maxsize=64)
+    pipeline = Pipeline([download, extract])
+    await pipeline.run(producers)   # producers put into download.queue
+    pipeline.report()
+
+While it runs a reporter prints one line per CRAWL_PROGRESS_INTERVAL
+seconds: per stage, items done, throughput over the last interval, queue
+depth, busy workers and errors.
+"""
+
+import asyncio
+import time
+
+from crawler import settings
+
+
+_DONE = object()
+
+
+class Stage:
+    """
+    ``handler(item, emit)`` is a coroutine; ``await emit(result)`` passes a
+    result to the next stage (and waits while its queue is full). A handler
+    that raises counts as an error and ``on_error(item, exc)`` is called.
+    """
+
+    def __init__(self, name, handler, workers, maxsize=None, on_error=None):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue = asyncio.Queue(maxsize if maxsize is not None else settings.QUEUE_SIZE)
+        self.on_error = on_error
+        self.next = None
+        self.tasks = []
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0
+        self.seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+
+    async def put(self, item):
+        """Queue ``item`` for this stage; waits while the queue is full."""
+        await self.queue.put(item)
+
+    async def emit(self, item):
+        if self.next is not None:
+            await self.next.put(item)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def finish(self):
+        """Let the workers drain the queue, then wait for them to exit."""
+        for _ in self.tasks:
+            await self.queue.put(_DONE)
+        await asyncio.gather(*self.tasks)
+        self.finished_at = time.perf_counter()
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            if item is _DONE:
+                return
+            self.busy += 1
+            start = time.perf_counter()
+            try:
+                await self.handler(item, self.emit)
+                self.processed += 1
+            except Exception as e:
+                self.errors += 1
+                if self.on_error is not None:
+                    self.on_error(item, e)
+            finally:
+                self.seconds += time.perf_counter() - start
+                self.busy -= 1
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+
+class Pipeline:
+    """
+    Stages chained in order. ``gauges`` maps a label to a callable returning
+    the depth of a buffer outside the pipeline (e.g. the embedding queue),
+    shown on the progress line.
+    """
+
+    def __init__(self, stages, gauges=None, interval=None):
+        self.stages = stages
+        for stage, following in zip(stages, stages[1:]):
+            stage.next = following
+        self.gauges = gauges or {}
+        self.interval = settings.PROGRESS_INTERVAL if interval is None else interval
+        self.started_at = None
+
+    async def run(self, producers):
+        """
+        Run the stages until the ``producers`` (coroutines feeding the first
+        stage, or any later one) have finished and every queue is drained.
+        Returns the producers' results, exceptions included.
+        """
+        self.started_at = time.perf_counter()
+        for stage in self.stages:
+            stage.start()
+        reporter = asyncio.ensure_future(self._report_progress()) if self.interval > 0 else None
+        try:
+            results = await asyncio.gather(*producers, return_exceptions=True)
+            # A stage only stops once everything upstream of it has stopped
+            for stage in self.stages:
+                await stage.finish()
+        finally:
+            for stage in self.stages:
+                stage.cancel()
+            if reporter is not None:
+                reporter.cancel()
+        return results
+
+    def progress_line(self, last=None, seconds=None):
+        parts = []
+        for stage in self.stages:
+            part = f"{stage.name} {stage.processed}"
+            if last is not None and seconds:
+                part += f" ({(stage.processed - last[stage.name]) / seconds:.1f}/s)"
+            part += f" q={stage.queue.qsize()}/{stage.queue.maxsize} busy={stage.busy}"
+            if stage.errors:
+                part += f" err={stage.errors}"
+            parts.append(part)
+        for label, depth in self.gauges.items():
+            parts.append(f"{label} q={depth()}")
+        return " | ".join(parts)
+
+    async def _report_progress(self):
+        last = {stage.name: 0 for stage in self.stages}
+        last_at = time.perf_counter()
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            print(f"[{now - self.started_at:6.1f}s] {self.progress_line(last, now - last_at)}")
+            last = {stage.name: stage.processed for stage in self.stages}
+            last_at = now
+
+    def report(self):
+        """Print per-stage totals: items, errors, wall throughput and worker utilisation."""
+        print("\nPipeline stages:")
+        print(f"  {'stage':<10} {'workers':>7} {'done':>6} {'errors':>6} {'items/s':>8} {'busy %':>7}")
+        for stage in self.stages:
+            elapsed = (stage.finished_at or time.perf_counter()) - (stage.started_at or self.started_at)
+            rate = stage.processed / elapsed if elapsed > 0 else 0.0
+            busy = stage.seconds / (elapsed * stage.workers) * 100 if elapsed > 0 else 0.0
+            print(f"  {stage.name:<10} {stage.workers:>7} {stage.processed:>6} {stage.errors:>6} "
+                  f"{rate:>8.1f} {busy:>7.1f}")
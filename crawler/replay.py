@@ -0,0 +1,368 @@
+"""
+Record a crawl's HTTP traffic and replay it offline.
+
+``record`` runs discovery and downloads for the configured universities
+against the live sites. It captures every robots.txt, sitemap and course
+page response (status, validators, body) into one deflate-compressed zip.
+Nothing is extracted or written to MongoDB, and the crawl state under
+CRAWL_STATE_DIR is left alone.
+
+``serve`` answers those requests from the archive on a local stdlib HTTP
+server, with optional artificial latency. With CRAWL_REPLAY_URL pointing at
+it, the async downloader sends every request there. Hosts, rate control,
+the page index and the extractors all still see the original URLs.
+``bench`` does both in one process: it serves the archive and times a full
+ingest (discover -> download -> extract -> save) against it. Crawl state,
+the artifact store and the telemetry report go to a throwaway directory,
+so every page is fetched and extracted and the real artifacts tree is left
+alone.
+
+    python -m crawler.replay record corpus.zip --only sliit,nsbm
+    python -m crawler.replay info corpus.zip
+    python -m crawler.replay serve corpus.zip --port 8800 --latency 80 --jitter 40
+    CRAWL_REPLAY_URL=http://127.0.0.1:8800 python main.py --refresh
+    python -m crawler.replay bench corpus.zip --latency 80
+
+``bench`` saves the replayed courses to a scratch database,
+``<MONGO_DB>_replay_bench``, which is dropped afterwards (``--mongo-db``
+names another one, which is kept). Courses are only embedded on ingest with
+``--embed``.
+
+Archive layout: ``index.json`` maps ``host/path?query`` to the recorded
+status, headers and body name. ``universities.json`` holds the config
+entries that were recorded. ``bodies/<sha256>`` stores each distinct body
+once.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+# Response headers worth replaying; the rest describe the original transfer
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After")
+
+
+def archive_key(url):
+    """``host/path?query`` (scheme-less), the key a URL is recorded under."""
+    parts = urlparse(url)
+    return parts.netloc + (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+
+def replay_rewrite(base_url):
+    """URL rewrite for AsyncDownloader: ``https://host/path`` -> ``<base_url>/host/path``."""
+    base_url = base_url.rstrip("/")
+    return lambda url: f"{base_url}/{archive_key(url)}"
+
+
+# -------------------------------------------------
+# Recording
+# -------------------------------------------------
+class _BufferedContent:
+    """Stands in for ``res.content`` once the body has been read for recording."""
+
+    def __init__(self, body):
+        self.body = body
+
+    async def iter_chunked(self, n):
+        for start in range(0, len(self.body), n):
+            yield self.body[start:start + n]
+
+
+class _CapturedResponse:
+    def __init__(self, res, body):
+        self._res = res
+        self.content = _BufferedContent(body)
+
+    def __getattr__(self, name):
+        return getattr(self._res, name)
+
+
+class Recorder:
+    """Writes responses into a zip archive as the downloader receives them."""
+
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        self.index = {}
+        self.bodies = set()
+        self.bytes = 0
+
+    def record(self, url, status, headers, body):
+        digest = hashlib.sha256(body).hexdigest()
+        if digest not in self.bodies:
+            self.zip.writestr(f"bodies/{digest}", body)
+            self.bodies.add(digest)
+            self.bytes += len(body)
+        self.index[archive_key(url)] = {
+            "url": url,
+            "status": status,
+            "headers": {name: headers[name] for name in KEPT_HEADERS if name in headers},
+            "body": digest,
+        }
+
+    async def capture(self, url, res):
+        """Record a streamed response; returns it with its body buffered for the caller."""
+        body = await res.read()
+        self.record(url, res.status, res.headers, body)
+        return _CapturedResponse(res, body)
+
+    def close(self, universities=()):
+        self.zip.writestr("index.json", json.dumps(self.index, indent=1))
+        self.zip.writestr("universities.json", json.dumps(list(universities), indent=1))
+        self.zip.close()
+
+
+async def record(universities, path):
+    """Discover and download ``universities`` from the live sites into the archive at ``path``."""
+    from crawler.discover import discover_course_urls_async
+    from crawler.robots import RobotsCache
+    from downloader.async_downloader import AsyncDownloader
+    from downloader.html_downloader import normalize_url
+    from downloader.page_index import PageIndex
+
+    recorder = Recorder(path)
+    # Scratch state: every robots.txt and page is fetched, the real state is untouched
+    scratch = tempfile.mkdtemp(prefix="crawl-record-")
+    page_index = PageIndex(os.path.join(scratch, "page_index.sqlite"))
+    robots = RobotsCache(os.path.join(scratch, "robots.json"))
+
+    async def one(uni, downloader):
+        urls, _ = await discover_course_urls_async(uni, downloader, None, robots)
+        # Plain fetches: nothing goes into the artifact store or page index
+        results = await asyncio.gather(*(downloader.fetch(normalize_url(url)) for url in urls),
+                                       return_exceptions=True)
+        failed = sum(isinstance(result, Exception) for result in results)
+        print(f"{uni['name']}: {len(urls)} course URLs recorded ({failed} failed)")
+
+    try:
+        async with AsyncDownloader(page_index=page_index, recorder=recorder) as downloader:
+            results = await asyncio.gather(*(one(uni, downloader) for uni in universities),
+                                           return_exceptions=True)
+        for uni, result in zip(universities, results):
+            if isinstance(result, Exception):
+                print(f"FAILED {uni['name']}: {result}")
+    finally:
+        recorder.close(universities)
+        page_index.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+    print(f"Recorded {len(recorder.index)} responses, {len(recorder.bodies)} distinct bodies "
+          f"({recorder.bytes / 1024 / 1024:.1f} MB raw, {os.path.getsize(path) / 1024 / 1024:.1f} MB archive)")
+
+
+# -------------------------------------------------
+# Replaying
+# -------------------------------------------------
+class ReplayArchive:
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        self.index = json.loads(self.zip.read("index.json"))
+        self.universities = json.loads(self.zip.read("universities.json"))
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """``(entry, body)`` for an archive key, or None."""
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        with self.lock:
+            return entry, self.zip.read(f"bodies/{entry['body']}")
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real sites
+
+    def do_GET(self):
+        server = self.server
+        if server.latency or server.jitter:
+            time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+        found = server.archive.get(self.path.lstrip("/"))
+        with server.lock:
+            server.stats["hits" if found else "misses"] += 1
+        if found is None:
+            self._respond(404, {}, b"not in archive")
+            return
+        entry, body = found
+        headers = entry["headers"]
+        # Conditional requests get a 304 like a well-behaved origin
+        if entry["status"] == 200 and (
+            ("ETag" in headers and self.headers.get("If-None-Match") == headers["ETag"])
+            or ("Last-Modified" in headers and self.headers.get("If-Modified-Since") == headers["Last-Modified"])
+        ):
+            self._respond(304, headers, b"")
+            return
+        self._respond(entry["status"], headers, body)
+
+    def _respond(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(archive, port=0, latency=0.0, jitter=0.0):
+    """Serve ``archive`` on 127.0.0.1 from a background thread; returns the server (``server.url``)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), ReplayHandler)
+    server.daemon_threads = True
+    server.archive = archive
+    server.latency = latency
+    server.jitter = jitter
+    server.stats = Counter()
+    server.lock = threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="replay-server", daemon=True).start()
+    return server
+
+
+def bench(archive, universities, extract_workers=None, latency=0.0, jitter=0.0, mongo_db=None, embed=False):
+    """
+    Time a full ingest of ``universities`` against the archive; returns wall
+    seconds. Courses go to ``mongo_db`` (default: a scratch database that is
+    dropped afterwards) and are embedded on ingest only with ``embed``.
+    """
+    from db import client as db_client
+
+    # db.mongodb binds its collections to MONGO_DB when first imported, so
+    # the database has to be switched before anything imports it
+    if "db.mongodb" in sys.modules:
+        raise RuntimeError("bench() must run before db.mongodb is imported")
+    scratch_db = mongo_db is None
+    mongo_db = mongo_db or f"{db_client.MONGO_DB}_replay_bench"
+    db_client.MONGO_DB = mongo_db
+
+    from api.embedding_queue import start_embedding_queue
+    from crawler import settings, telemetry
+    from crawler.ingest import crawl
+
+    server = start_server(archive, latency=latency, jitter=jitter)
+    embed_queue = start_embedding_queue() if embed else None
+    scratch = tempfile.mkdtemp(prefix="crawl-bench-")
+    # Read when the downloader, the stores and the report are created, so set
+    # before the crawl starts: nothing lands in the real artifacts tree
+    saved = (settings.REPLAY_URL, settings.ARTIFACTS_DIR, settings.STATE_DIR, telemetry.REPORT_DIR)
+    settings.REPLAY_URL = server.url
+    settings.ARTIFACTS_DIR = scratch
+    settings.STATE_DIR = os.path.join(scratch, "_state")
+    telemetry.REPORT_DIR = os.path.join(scratch, "_reports")
+
+    start = time.perf_counter()
+    try:
+        # refresh: crawl universities already in MongoDB too; the empty page
+        # index makes every request unconditional
+        asyncio.run(crawl(universities, refresh=True, embed_queue=embed_queue, extract_workers=extract_workers))
+    finally:
+        if embed_queue is not None:
+            embed_queue.close()
+        server.shutdown()
+        settings.REPLAY_URL, settings.ARTIFACTS_DIR, settings.STATE_DIR, telemetry.REPORT_DIR = saved
+        shutil.rmtree(scratch, ignore_errors=True)
+        if scratch_db:
+            try:
+                db_client.get_client().drop_database(mongo_db)
+            except Exception as e:
+                print(f"⚠️  Could not drop scratch database {mongo_db}: {e}")
+    elapsed = time.perf_counter() - start
+    print(f"\nReplay bench: {elapsed:.1f}s for {len(universities)} universities "
+          f"({server.stats['hits']} responses served, {server.stats['misses']} not in archive, "
+          f"latency {latency * 1000:.0f}±{jitter * 1000:.0f} ms, database {mongo_db})")
+    return elapsed
+
+
+def info(archive):
+    hosts = Counter()
+    statuses = Counter()
+    for key, entry in archive.index.items():
+        hosts[key.split("/", 1)[0]] += 1
+        statuses[entry["status"]] += 1
+    sizes = {item.filename: item for item in archive.zip.infolist()}
+    raw = sum(item.file_size for name, item in sizes.items() if name.startswith("bodies/"))
+    packed = sum(item.compress_size for name, item in sizes.items() if name.startswith("bodies/"))
+    print(f"{archive.path}: {len(archive.index)} responses for "
+          f"{', '.join(uni['id'] for uni in archive.universities)}")
+    print(f"  bodies: {raw / 1024 / 1024:.1f} MB raw, {packed / 1024 / 1024:.1f} MB compressed")
+    print("  statuses: " + " ".join(f"{status}:{count}" for status, count in sorted(statuses.items())))
+    for host, count in hosts.most_common():
+        print(f"  {host:<40} {count:>6}")
+
+
+def _universities(config, only):
+    with open(config) as f:
+        universities = json.load(f)
+    if only:
+        wanted = set(only.split(","))
+        universities = [uni for uni in universities if uni["id"] in wanted]
+    return universities
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record crawl traffic and replay it offline")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Fetch robots.txt, sitemaps and pages into an archive")
+    rec.add_argument("archive")
+    rec.add_argument("--only", default=None, help="comma-separated university ids")
+    rec.add_argument("--config", default="config/universities.json")
+
+    show = sub.add_parser("info", help="Summarize an archive")
+    show.add_argument("archive")
+
+    for name, help_text in (("serve", "Serve an archive on a local HTTP server"),
+                            ("bench", "Time a full ingest against an archive")):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("archive")
+        cmd.add_argument("--latency", type=float, default=0.0, help="ms added to every response")
+        cmd.add_argument("--jitter", type=float, default=0.0, help="± ms of random extra latency")
+        if name == "serve":
+            cmd.add_argument("--port", type=int, default=8800)
+        else:
+            cmd.add_argument("--only", default=None, help="comma-separated university ids (default: all recorded)")
+            cmd.add_argument("--extract-workers", type=int, default=None)
+            cmd.add_argument("--mongo-db", default=None,
+                             help="database for the saved courses "
+                                  "(default: <MONGO_DB>_replay_bench, dropped afterwards)")
+            cmd.add_argument("--embed", action="store_true", help="embed courses on ingest (EMBED_ON_INGEST)")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        asyncio.run(record(_universities(args.config, args.only), args.archive))
+        return
+    archive = ReplayArchive(args.archive)
+    if args.command == "info":
+        info(archive)
+    elif args.command == "serve":
+        server = start_server(archive, args.port, args.latency / 1000, args.jitter / 1000)
+        print(f"Serving {len(archive.index)} responses; run the crawler with CRAWL_REPLAY_URL={server.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.command == "bench":
+        universities = archive.universities
+        if args.only:
+            wanted = set(args.only.split(","))
+            universities = [uni for uni in universities if uni["id"] in wanted]
+        bench(archive, universities, args.extract_workers, args.latency / 1000, args.jitter / 1000,
+              mongo_db=args.mongo_db, embed=args.embed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,154 @@
-import ssl
-import urllib.request
+"""
+robots.txt rules, cached on disk across crawler runs.
+
+Each host's robots.txt is stored (raw lines + fetch time) in
+``<CRAWL_STATE_DIR>/robots.json`` and re-fetched once it is older than
+CRAWL_ROBOTS_TTL seconds (CRAWL_ROBOTS_ERROR_TTL after a failed fetch). The
+crawler fetches rules asynchronously through the shared downloader, and each
+host's Crawl-delay / Request-rate becomes that host's politeness delay in the
+download scheduler.
+"""
+
+import json
+import os
+import time
 import urllib.robotparser
+from collections import Counter
+from urllib.parse import urlparse
 
+from crawler import settings
 
 
-_robots_cache = {}
+ROBOTS_TTL = float(os.environ.get("CRAWL_ROBOTS_TTL", str(24 * 3600)))
+ROBOTS_ERROR_TTL = float(os.environ.get("CRAWL_ROBOTS_ERROR_TTL", "3600"))
+USER_AGENT = "*"
 
 
-def can_fetch(base_url, target_url):
-    """Check if URL can be fetched according to robots.txt"""
-    
-   
-    if base_url in _robots_cache:
-        rp = _robots_cache[base_url]
-        if rp is None:
-            return True  # robots.txt failed, allow all
-        return rp.can_fetch("*", target_url)
-    
-    robots_url = base_url.rstrip("/") + "/robots.txt"
+def _robots_url(base_url):
+    return base_url.rstrip("/") + "/robots.txt"
+
+
+def _parser(entry):
+    """RobotFileParser for a cache entry (None = no usable rules, allow all)."""
+    if entry["status"] != "ok":
+        return None
     rp = urllib.robotparser.RobotFileParser()
+    rp.parse(entry["lines"])
+    return rp
+
+
+def _entry(status, body=""):
+    """
+    Cache entry for a robots.txt response, following RFC 9309: any 4xx
+    (401/403 included) means "no rules", and 5xx or network errors allow
+    everything but are retried sooner.
+    """
+    if status == 200:
+        return {"status": "ok", "lines": body.splitlines(), "fetched_at": time.time()}
+    if status is not None and 400 <= status < 500:
+        return {"status": "missing", "fetched_at": time.time()}
+    return {"status": "error", "fetched_at": time.time()}
+
+
+class RobotsCache:
+    def __init__(self, path=None, ttl=ROBOTS_TTL, error_ttl=ROBOTS_ERROR_TTL):
+        self.path = path or os.path.join(settings.STATE_DIR, "robots.json")
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.entries = self._load()
+        self.fetched = set()  # hosts whose rules this process (re)fetched
+        self.parsers = {}
+        self.denied = Counter()  # disallowed URLs per host, for crawl stats
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        # Parallel crawl workers (crawler/runner.py) share the file, so merge
+        # this process's fetches into whatever is on disk now
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        entries = self._load()
+        entries.update({base_url: self.entries[base_url] for base_url in self.fetched})
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    def is_fresh(self, base_url):
+        entry = self.entries.get(base_url)
+        if entry is None:
+            return False
+        ttl = self.error_ttl if entry["status"] == "error" else self.ttl
+        return time.time() - entry["fetched_at"] < ttl
+
+    def _store(self, base_url, entry):
+        self.entries[base_url] = entry
+        self.fetched.add(base_url)
+        self.parsers[base_url] = _parser(entry)
+        if entry["status"] == "error":
+            print(f"  ⚠️  robots.txt failed for {base_url}; allowing all")
+
+    def _rules(self, base_url):
+        if base_url not in self.parsers:
+            entry = self.entries.get(base_url)
+            self.parsers[base_url] = _parser(entry) if entry else None
+        return self.parsers[base_url]
+
+    # -------------------------------------------------
+    # Fetching
+    # -------------------------------------------------
+    async def ensure(self, base_url, downloader):
+        """Make sure ``base_url``'s rules are cached and fresh (async, via the shared downloader)."""
+        if self.is_fresh(base_url):
+            return
+        try:
+            status, _, body = await downloader.request(_robots_url(base_url))
+            entry = _entry(status, body)
+        except Exception as e:
+            entry = _entry(getattr(e, "status", None))
+        self._store(base_url, entry)
+
+    # -------------------------------------------------
+    # Rules
+    # -------------------------------------------------
+    def can_fetch(self, base_url, target_url):
+        rp = self._rules(base_url)
+        if rp is None:
+            return True
+        allowed = rp.can_fetch(USER_AGENT, target_url)
+        if not allowed:
+            self.denied[urlparse(base_url).netloc] += 1
+        return allowed
+
+    def crawl_delay(self, base_url):
+        """Seconds between requests asked for by Crawl-delay or Request-rate (None if neither)."""
+        rp = self._rules(base_url)
+        if rp is None:
+            return None
+        delay = rp.crawl_delay(USER_AGENT)
+        rate = rp.request_rate(USER_AGENT)
+        if rate and rate.requests:
+            delay = max(delay or 0, rate.seconds / rate.requests)
+        return float(delay) if delay else None
+
+    def apply_crawl_delay(self, base_url, downloader):
+        """Hand the host's robots.txt delay to the download scheduler."""
+        delay = self.crawl_delay(base_url)
+        if delay:
+            downloader.set_host_delay(urlparse(base_url).netloc, delay)
+        return delay
+
+
+_default_cache = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RobotsCache()
+    return _default_cache
 
-    try:
-        ctx = ssl._create_unverified_context()
-        with urllib.request.urlopen(robots_url, context=ctx, timeout=3) as f:
-            rp.parse(f.read().decode("utf-8").splitlines())
-        _robots_cache[base_url] = rp
-        return rp.can_fetch("*", target_url)
-
-    except Exception as e:
-      
-        print(f"  ⚠️  robots.txt failed for {base_url}: {type(e).__name__}")
-        _robots_cache[base_url] = None
-        return True
@@ -0,0 +1,215 @@
+"""
+Crawl universities in parallel worker processes.
+
+``main.py`` crawls every university in one process, so one huge or hanging
+site holds up the end of the run, and anything that brings the process down
+takes every institution with it. The runner starts one process per
+university (at most ``--parallel`` at a time). Each process runs the normal
+crawl (crawler/ingest.py) for its university, with its own downloader and
+extraction pool. A university that fails, times out or crashes is reported
+and the others carry on.
+
+The workers do not embed on ingest, since each would load its own copy of
+the embedding model. Once the pool is done, the parent embeds the new and
+changed courses in one incremental pass (skipped with EMBED_ON_INGEST=0).
+
+    python -m crawler.runner
+    python -m crawler.runner --parallel 4 --timeout 1800 --refresh
+    python -m crawler.runner --only sliit,nsbm
+
+``--timeout`` is enforced inside the worker first: the crawl is cancelled,
+courses written so far are kept and the frontier resumes the rest on the
+next run. A worker still alive CRAWL_RUNNER_KILL_GRACE seconds (default 60)
+after its deadline is terminated.
+
+Crawl state (frontier, page index, extraction cache, robots.json, artifact
+store) is shared between the workers through CRAWL_STATE_DIR, as it is
+between runs.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import time
+from collections import Counter, defaultdict
+
+
+KILL_GRACE = float(os.environ.get("CRAWL_RUNNER_KILL_GRACE", "60"))
+
+
+def _crawl_one(uni, refresh, extract_workers, timeout, results):
+    """Worker process: crawl one university and put its summary on ``results``."""
+    # Imported in the worker so the runner itself stays light
+    from crawler.frontier import Frontier
+    from crawler.ingest import crawl, university_summary
+
+    start = time.perf_counter()
+    stats = defaultdict(Counter)
+    try:
+        # No embed queue: the parent embeds everything once the pool is done
+        summary = asyncio.run(asyncio.wait_for(
+            crawl([uni], refresh=refresh, extract_workers=extract_workers, stats=stats),
+            timeout,
+        ))[0]
+    except Exception as e:
+        # Partial counts: whatever the crawl got through before it stopped
+        frontier = Frontier()
+        summary = university_summary(uni, stats[uni["id"]], frontier, e)
+        frontier.close()
+        if isinstance(e, asyncio.TimeoutError):
+            summary.update(status="timeout", error=f"timed out after {timeout:.0f}s")
+    summary["seconds"] = time.perf_counter() - start
+    results.put(summary)
+
+
+def _lost(uni, status, error, seconds):
+    """Summary for a worker that never reported back."""
+    return {
+        "id": uni["id"], "name": uni["name"], "status": status, "error": error,
+        "pages": 0, "unchanged": 0, "courses": 0, "errors": 0, "frontier": {},
+        "seconds": seconds,
+    }
+
+
+def embed_saved_courses():
+    """
+    Embed new and changed courses in one incremental pass, loading the model
+    once (what each worker's embed-on-ingest queue would otherwise do).
+    """
+    from api.embedding_queue import ENABLED, target_space
+    from api.embedding_spaces import activate_if_complete
+    from api.generate_embeddings import generate_embeddings, load_model
+    from crawler import settings
+    from db.client import get_collection
+
+    if not ENABLED:
+        return None
+    try:
+        space, model_id = target_space()
+        model = load_model(model_id)
+    except Exception as e:
+        print(f"⚠️ Embedding skipped ({e}); run api/generate_embeddings.py after the crawl.")
+        return None
+    print(f"\nEmbedding saved courses in space {space}...")
+    os.makedirs(settings.STATE_DIR, exist_ok=True)
+    # Own checkpoint file, never resumed: a manual generate_embeddings run
+    # keeps its checkpoint, and courses updated below an old checkpoint are
+    # still found (unchanged ones are skipped by their text hash)
+    stats = generate_embeddings(
+        model, get_collection("courses"), model_id=model_id, resume=False,
+        checkpoint_path=os.path.join(settings.STATE_DIR, "runner_embedding_checkpoint.json"),
+    )
+    activate_if_complete(space, only_if_unset=True)
+    return stats
+
+
+def run(universities, parallel=None, timeout=None, refresh=False, extract_workers=None, embed=True):
+    """
+    Crawl ``universities`` with up to ``parallel`` worker processes and
+    return their summaries in config order. With ``embed``, saved courses
+    are embedded once the pool is done (see embed_saved_courses).
+    """
+    parallel = max(1, min(parallel or os.cpu_count() or 1, len(universities) or 1))
+    # Split the CPUs between the workers' extraction pools unless told otherwise
+    extract_workers = extract_workers or max(1, (os.cpu_count() or 1) // parallel)
+
+    mp = multiprocessing.get_context("spawn")
+    results = mp.Queue()
+    pending = list(universities)
+    running = {}    # uni id -> (process, uni, started_at)
+    summaries = {}  # uni id -> summary
+
+    def collect(block_for=0.0):
+        try:
+            while True:
+                summary = results.get(timeout=block_for) if block_for else results.get_nowait()
+                summaries[summary["id"]] = summary
+                block_for = 0.0
+        except queue.Empty:
+            pass
+
+    while pending or running:
+        while pending and len(running) < parallel:
+            uni = pending.pop(0)
+            # Non-daemonic: each worker starts its own extraction pool
+            process = mp.Process(
+                target=_crawl_one, args=(uni, refresh, extract_workers, timeout, results),
+                name=f"crawl-{uni['id']}",
+            )
+            process.start()
+            running[uni["id"]] = (process, uni, time.perf_counter())
+            print(f"Started {uni['name']} (pid {process.pid})")
+
+        collect(block_for=0.5)
+        now = time.perf_counter()
+        for uni_id, (process, uni, started_at) in list(running.items()):
+            if process.is_alive():
+                if timeout is None or now - started_at <= timeout + KILL_GRACE:
+                    continue
+                process.terminate()
+                lost = ("killed", f"still running {timeout + KILL_GRACE:.0f}s after start")
+            else:
+                lost = ("crashed", f"worker exited with code {process.exitcode}")
+            process.join()
+            collect()
+            summaries.setdefault(uni_id, _lost(uni, *lost, now - started_at))
+            del running[uni_id]
+            print(f"Finished {uni['name']}: {summaries[uni_id]['status']}")
+
+    if embed:
+        embed_saved_courses()
+    return [summaries[uni["id"]] for uni in universities]
+
+
+def print_summary(summaries, elapsed):
+    print(f"\nCrawl summary ({len(summaries)} universities, {elapsed:.1f}s wall)")
+    print(f"  {'university':<30} {'status':<8} {'pages':>6} {'unchgd':>6} {'courses':>7} {'errors':>6} {'wall s':>7}")
+    for s in summaries:
+        print(f"  {s['name'][:30]:<30} {s['status']:<8} {s['pages']:>6} {s['unchanged']:>6} "
+              f"{s['courses']:>7} {s['errors']:>6} {s['seconds']:>7.1f}")
+    for s in summaries:
+        if s["error"]:
+            print(f"  {s['name']}: {s['error']}")
+    totals = Counter()
+    for s in summaries:
+        totals.update({key: s[key] for key in ("pages", "courses", "errors")})
+    failed = sum(1 for s in summaries if s["status"] != "ok")
+    print(f"  total: {totals['pages']} pages, {totals['courses']} courses, {totals['errors']} page errors, "
+          f"{failed} universities not completed")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl universities in parallel worker processes")
+    parser.add_argument("--parallel", type=int, default=None,
+                        help="universities crawled at once (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds allowed per university (default: no limit)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="re-crawl scraped universities with conditional requests (as in main.py)")
+    parser.add_argument("--extract-workers", type=int, default=None,
+                        help="extraction processes per university (default: CPU count / --parallel)")
+    parser.add_argument("--only", default=None, help="comma-separated university ids to crawl")
+    parser.add_argument("--config", default="config/universities.json")
+    parser.add_argument("--summary-json", default=None, help="also write the summaries to this file")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        universities = json.load(f)
+    if args.only:
+        wanted = set(args.only.split(","))
+        universities = [uni for uni in universities if uni["id"] in wanted]
+
+    start = time.perf_counter()
+    summaries = run(universities, args.parallel, args.timeout, args.refresh, args.extract_workers)
+    print_summary(summaries, time.perf_counter() - start)
+    if args.summary_json:
+        with open(args.summary_json, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, indent=2)
+    return summaries
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Crawl settings shared by the crawler and downloader (environment overrides).
+
+    CRAWL_CONCURRENCY           default 16   requests in flight across all hosts
+    CRAWL_PER_HOST_CONCURRENCY  default 2    requests in flight per host
+    CRAWL_HOST_DELAY            default 1.0  min seconds between request starts on one host
+    CRAWL_TIMEOUT               default 30   seconds per request
+    CRAWL_RETRIES               default 3    attempts per URL
+    CRAWL_BACKOFF_BASE          default 1.0  seconds; retry n waits up to base * 2**n (jittered)
+    CRAWL_BACKOFF_MAX           default 30   seconds
+    CRAWL_RETRY_AFTER           default 300  seconds before a failed URL is retried (doubles per attempt)
+    CRAWL_MAX_ATTEMPTS          default 5    failures before a URL is given up on
+    CRAWL_QUEUE_SIZE            default 256  pages waiting between two pipeline stages
+    CRAWL_SAVE_WORKERS          default 2    normalize + MongoDB writer workers
+    CRAWL_PROGRESS_INTERVAL     default 10   seconds between live progress lines (0 disables)
+    CRAWL_REPLAY_URL            default unset; send every request to this replay server (crawler/replay.py)
+    ARTIFACTS_DIR               default artifacts
+    CRAWL_STATE_DIR             default artifacts/_state
+"""
+
+import os
+
+
+CONCURRENCY = int(os.environ.get("CRAWL_CONCURRENCY", "16"))
+PER_HOST_CONCURRENCY = int(os.environ.get("CRAWL_PER_HOST_CONCURRENCY", "2"))
+HOST_DELAY = float(os.environ.get("CRAWL_HOST_DELAY", "1.0"))
+TIMEOUT = float(os.environ.get("CRAWL_TIMEOUT", "30"))
+RETRIES = int(os.environ.get("CRAWL_RETRIES", "3"))
+BACKOFF_BASE = float(os.environ.get("CRAWL_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = float(os.environ.get("CRAWL_BACKOFF_MAX", "30"))
+
+# Frontier retry schedule (across runs, unlike the in-request retries above)
+RETRY_AFTER = float(os.environ.get("CRAWL_RETRY_AFTER", "300"))
+MAX_ATTEMPTS = int(os.environ.get("CRAWL_MAX_ATTEMPTS", "5"))
+
+# Streaming pipeline (crawler/pipeline.py)
+QUEUE_SIZE = int(os.environ.get("CRAWL_QUEUE_SIZE", "256"))
+SAVE_WORKERS = int(os.environ.get("CRAWL_SAVE_WORKERS", "2"))
+PROGRESS_INTERVAL = float(os.environ.get("CRAWL_PROGRESS_INTERVAL", "10"))
+
+# Offline runs against a recorded corpus, e.g. http://127.0.0.1:8800
+REPLAY_URL = os.environ.get("CRAWL_REPLAY_URL", "")
+
+ARTIFACTS_DIR = os.environ.get("ARTIFACTS_DIR", "artifacts")
+
+# Crawl state that persists between runs (page validators, robots cache, frontier)
+STATE_DIR = os.environ.get("CRAWL_STATE_DIR", os.path.join(ARTIFACTS_DIR, "_state"))
@@ -1,19 +1,205 @@
-import requests
-from bs4 import BeautifulSoup
+"""
+Streaming sitemap reader.
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (compatible; UniScraper/1.0)"
-}
+Sitemaps are parsed incrementally with an XML pull parser as the response
+body arrives, so a large WordPress sitemap never has to sit in memory as a
+document tree. ``<sitemapindex>`` files are followed recursively (child
+sitemaps are fetched concurrently by ``stream_sitemap``), gzipped sitemaps
+are decompressed on the fly, and each URL comes with its ``<lastmod>`` so
+discovery can skip pages that have not changed since the last crawl.
 
+Real sitemaps are often not well-formed XML. Anything before the XML
+declaration or root element (whitespace, a BOM, a PHP warning) is skipped.
+With lxml installed the pull parser runs in recovery mode, the same
+tolerance as the BeautifulSoup "xml" parse it replaced. Without lxml, a
+parse error ends the sitemap but keeps the URLs read up to that point.
+"""
 
-def fetch_sitemap_urls(sitemap_url: str) -> list[str]:
-    res = requests.get(sitemap_url, headers=HEADERS, timeout=30)
-    res.raise_for_status()
+import asyncio
+import re
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from xml.etree import ElementTree
 
-    soup = BeautifulSoup(res.text, "xml")
-    urls = []
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
 
-    for loc in soup.find_all("loc"):
-        urls.append(loc.text.strip())
+CHUNK_SIZE = 64 * 1024
 
-    return urls
+SitemapEntry = namedtuple("SitemapEntry", ["loc", "lastmod"])
+
+# Where the XML starts; junk before it is dropped
+_XML_START = re.compile(rb"<\?xml|<(?:[\w.-]+:)?(?:urlset|sitemapindex)\b", re.IGNORECASE)
+# Give up looking for the start after this much leading junk
+_MAX_PREAMBLE = 64 * 1024
+
+PARSE_ERRORS = (ElementTree.ParseError,) + ((etree.XMLSyntaxError,) if etree is not None else ())
+
+_DONE = object()
+
+
+def parse_lastmod(value):
+    """
+    W3C datetime -> naive UTC datetime (None if missing or malformed). A bare
+    date means "some time that day", so it maps to the end of the day.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        if len(value) == 10:
+            return datetime.fromisoformat(value) + timedelta(days=1)
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+class SitemapParser:
+    """
+    Incremental parser: ``feed`` raw bytes, get back ``(kind, loc, lastmod)``
+    tuples where kind is "url" or "sitemap" (a child of a sitemap index).
+    After a parse error the rest of the body is ignored and ``error`` is set.
+    """
+
+    def __init__(self):
+        if etree is not None:
+            self.parser = etree.XMLPullParser(events=("end",), recover=True)
+        else:
+            self.parser = ElementTree.XMLPullParser(events=("end",))
+        self.decompressor = None
+        self.started = False
+        self.preamble = b""  # bytes seen before the XML starts
+        self.error = None
+
+    def feed(self, chunk):
+        if not self.started:
+            # .xml.gz served without Content-Encoding arrives still compressed
+            self.started = True
+            if chunk[:2] == b"\x1f\x8b":
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.decompressor is not None:
+            chunk = self.decompressor.decompress(chunk)
+        if self.preamble is not None:
+            chunk = self._skip_preamble(chunk)
+        return self._parse(self.parser.feed, chunk) if chunk else []
+
+    def close(self):
+        if self.preamble:
+            # Never found the start: let the parser make what it can of it
+            chunk, self.preamble = self.preamble.lstrip(), None
+            entries = self._parse(self.parser.feed, chunk)
+        else:
+            entries = []
+        return entries + self._parse(self.parser.close)
+
+    def _skip_preamble(self, chunk):
+        self.preamble += chunk
+        match = _XML_START.search(self.preamble)
+        if match is None and len(self.preamble) < _MAX_PREAMBLE:
+            return b""
+        chunk = self.preamble[match.start():] if match else self.preamble.lstrip()
+        self.preamble = None
+        return chunk
+
+    def _parse(self, step, *args):
+        entries = []
+        if self.error is not None:
+            return entries
+        try:
+            step(*args)
+            self._drain(entries)
+        except PARSE_ERRORS as e:
+            # Keep whatever was parsed before the error (ElementTree raises
+            # it from read_events, after the events that preceded it)
+            self.error = e
+        return entries
+
+    def _drain(self, entries):
+        for _, elem in self.parser.read_events():
+            if not isinstance(elem.tag, str):
+                continue  # comments / processing instructions
+            kind = _local_name(elem.tag)
+            if kind not in ("url", "sitemap"):
+                continue
+            loc = lastmod = None
+            for child in elem:
+                if not isinstance(child.tag, str):
+                    continue
+                name = _local_name(child.tag)
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = parse_lastmod(child.text)
+            if loc:
+                entries.append((kind, loc, lastmod))
+            # Drop the parsed subtree so memory stays flat
+            elem.clear()
+
+
+# =====================================================
+# Async (used by the crawler)
+# =====================================================
+async def _read_sitemap(downloader, url):
+    parser = SitemapParser()
+    async with downloader.stream(url) as res:
+        async for chunk in res.content.iter_chunked(CHUNK_SIZE):
+            for entry in parser.feed(chunk):
+                yield entry
+    for entry in parser.close():
+        yield entry
+    if parser.error is not None:
+        print(f"  ⚠️  sitemap {url} is malformed ({parser.error}); kept the URLs before the error")
+
+
+async def stream_sitemap(downloader, sitemap_url, max_queued=1000):
+    """
+    Yield a SitemapEntry for every page URL reachable from ``sitemap_url``
+    as soon as it is parsed. Child sitemaps of an index are read
+    concurrently; a failing child is reported and skipped, a failing root
+    raises.
+    """
+    queue = asyncio.Queue(maxsize=max_queued)
+    seen = {sitemap_url}
+    tasks = []
+
+    async def read(url):
+        try:
+            async for kind, loc, lastmod in _read_sitemap(downloader, url):
+                if kind == "sitemap":
+                    if loc not in seen:
+                        seen.add(loc)
+                        tasks.append(asyncio.ensure_future(read(loc)))
+                else:
+                    await queue.put(SitemapEntry(loc, lastmod))
+        except Exception as e:
+            if url == sitemap_url:
+                await queue.put(e)
+            else:
+                print(f"  ⚠️  sitemap {url} failed: {type(e).__name__}: {e}")
+        finally:
+            await queue.put(_DONE)
+
+    tasks.append(asyncio.ensure_future(read(sitemap_url)))
+    finished = 0
+    try:
+        while finished < len(tasks):
+            item = await queue.get()
+            if item is _DONE:
+                finished += 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,343 @@
+"""
+Crawl telemetry: where the time of a crawl goes.
+
+``CrawlTelemetry`` hooks into the downloader's aiohttp session through a
+``TraceConfig`` and collects per-host numbers:
+
+- DNS, connect, time-to-first-byte and full download time
+- bytes received
+- a status-code histogram
+- new vs reused connections
+
+The ingest stages report per-university download / extract / save times,
+and the robots cache supplies denied URLs per host. At the end of a run the
+crawl writes ``crawl-<time>[-<uni id>].json`` and a matching ``.txt``
+report to CRAWL_REPORT_DIR (default artifacts/_reports).
+
+    python -m crawler.telemetry show                 # latest report
+    python -m crawler.telemetry compare              # latest vs the one before, same label
+    python -m crawler.telemetry compare --label sliit
+    python -m crawler.telemetry compare old.json new.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from collections import Counter, defaultdict, deque
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+import aiohttp
+
+from crawler import settings
+
+
+REPORT_DIR = os.environ.get("CRAWL_REPORT_DIR", os.path.join(settings.ARTIFACTS_DIR, "_reports"))
+
+# compare flags timings that got this much slower (and at least 5 ms)
+REGRESSION_RATIO = 1.25
+
+STAGES = ("download", "extract", "save")
+
+
+class Timing:
+    """Count, total and max of a duration, plus recent samples for percentiles."""
+
+    def __init__(self, samples=5000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=samples)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def summary(self):
+        """``{count, total_s, avg_ms, p50_ms, p95_ms, max_ms}``."""
+        samples = sorted(self.samples)
+
+        def pct(p):
+            return samples[int(p * (len(samples) - 1))] * 1000 if samples else 0.0
+
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+            "max_ms": self.max * 1000,
+        }
+
+
+class HostMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.statuses = Counter()
+        self.timings = {name: Timing() for name in ("dns", "connect", "ttfb", "download")}
+
+
+class CrawlTelemetry:
+    def __init__(self):
+        self.hosts = defaultdict(HostMetrics)
+        self.stages = defaultdict(Timing)   # (uni id, stage) -> Timing
+        self.started_at = time.time()
+
+    # -------------------------------------------------
+    # Recording
+    # -------------------------------------------------
+    def trace_config(self):
+        """aiohttp TraceConfig feeding this object; pass it to the ClientSession."""
+        # The downloader passes {"host": ...} as trace_request_ctx: the same host
+        # key as its rate controllers, which under CRAWL_REPLAY_URL is not the
+        # host the request actually goes to
+        trace = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace(
+            host=(trace_request_ctx or {}).get("host")
+        ))
+
+        async def on_request_start(session, ctx, params):
+            ctx.host = ctx.host or urlparse(str(params.url)).netloc
+            ctx.start = time.monotonic()
+
+        async def on_dns_start(session, ctx, params):
+            ctx.dns_start = time.monotonic()
+
+        async def on_dns_end(session, ctx, params):
+            if getattr(ctx, "dns_start", None) is not None:
+                self.hosts[ctx.host].timings["dns"].add(time.monotonic() - ctx.dns_start)
+
+        async def on_connection_start(session, ctx, params):
+            ctx.connect_start = time.monotonic()
+
+        async def on_connection_end(session, ctx, params):
+            self.hosts[ctx.host].new_connections += 1
+            # Includes DNS, like curl's time_connect
+            self.hosts[ctx.host].timings["connect"].add(time.monotonic() - ctx.connect_start)
+
+        async def on_connection_reuse(session, ctx, params):
+            self.hosts[ctx.host].reused_connections += 1
+
+        async def on_request_end(session, ctx, params):
+            host = self.hosts[ctx.host]
+            host.requests += 1
+            host.statuses[params.response.status] += 1
+            host.timings["ttfb"].add(time.monotonic() - ctx.start)
+
+        async def on_chunk(session, ctx, params):
+            self.hosts[ctx.host].bytes += len(params.chunk)
+
+        async def on_request_exception(session, ctx, params):
+            host = self.hosts[ctx.host]
+            host.requests += 1
+            host.errors += 1
+            host.statuses[type(params.exception).__name__] += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_dns_resolvehost_start.append(on_dns_start)
+        trace.on_dns_resolvehost_end.append(on_dns_end)
+        trace.on_connection_create_start.append(on_connection_start)
+        trace.on_connection_create_end.append(on_connection_end)
+        trace.on_connection_reuseconn.append(on_connection_reuse)
+        trace.on_request_end.append(on_request_end)
+        trace.on_response_chunk_received.append(on_chunk)
+        trace.on_request_exception.append(on_request_exception)
+        return trace
+
+    def download(self, host, seconds):
+        """Request start to fully read body (the trace has no end-of-body event)."""
+        self.hosts[host].timings["download"].add(seconds)
+
+    def stage(self, uni_id, stage, seconds):
+        self.stages[uni_id, stage].add(seconds)
+
+    # -------------------------------------------------
+    # Reports
+    # -------------------------------------------------
+    def to_dict(self, robots_denied=None, rates=None, summaries=None, extra=None):
+        rates = {rate["host"]: rate for rate in rates or []}
+        robots_denied = robots_denied or {}
+        hosts = {}
+        for name in sorted(set(self.hosts) | set(robots_denied)):
+            host = self.hosts[name]
+            hosts[name] = {
+                "requests": host.requests,
+                "errors": host.errors,
+                "bytes": host.bytes,
+                "new_connections": host.new_connections,
+                "reused_connections": host.reused_connections,
+                "statuses": {str(status): count for status, count in sorted(host.statuses.items(), key=str)},
+                "robots_denied": robots_denied.get(name, 0),
+                **{key: timing.summary() for key, timing in host.timings.items()},
+                "rate": rates.get(name),
+            }
+
+        universities = defaultdict(dict)
+        for summary in summaries or []:
+            universities[summary["id"]].update(summary)
+        overall = defaultdict(Timing)
+        for (uni_id, stage), timing in self.stages.items():
+            universities[uni_id].setdefault("stages", {})[stage] = timing.summary()
+            overall[stage].samples.extend(timing.samples)
+            overall[stage].count += timing.count
+            overall[stage].total += timing.total
+            overall[stage].max = max(overall[stage].max, timing.max)
+
+        finished_at = time.time()
+        return {
+            "started_at": self.started_at,
+            "finished_at": finished_at,
+            "wall_seconds": finished_at - self.started_at,
+            "hosts": hosts,
+            "stages": {stage: overall[stage].summary() for stage in STAGES if stage in overall},
+            "universities": dict(universities),
+            **(extra or {}),
+        }
+
+    def write(self, report, label=None, directory=None):
+        """Write ``report`` as JSON and text; returns ``(json_path, text_path)``."""
+        directory = directory or REPORT_DIR
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(report["started_at"]))
+        base = os.path.join(directory, f"crawl-{stamp}" + (f"-{label}" if label else ""))
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(format_report(report))
+        return base + ".json", base + ".txt"
+
+
+def _mb(n):
+    return n / (1024 * 1024)
+
+
+def format_report(report):
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(report["started_at"]))
+    lines = [f"Crawl report {started} ({report['wall_seconds']:.1f}s wall)", ""]
+
+    lines.append("Hosts (ms: p50 / p95)")
+    lines.append(f"  {'host':<32} {'reqs':>5} {'err':>4} {'MB':>7} {'dns':>7} {'connect':>9} "
+                 f"{'ttfb':>13} {'download':>13} {'denied':>6} {'conn new/reused':>15}  statuses")
+    for name, host in report["hosts"].items():
+        dns, connect, ttfb, download = (host[k] for k in ("dns", "connect", "ttfb", "download"))
+        statuses = " ".join(f"{status}:{count}" for status, count in host["statuses"].items())
+        lines.append(
+            f"  {name[:32]:<32} {host['requests']:>5} {host['errors']:>4} {_mb(host['bytes']):>7.2f} "
+            f"{dns['p50_ms']:>7.0f} {connect['p50_ms']:>9.0f} "
+            f"{ttfb['p50_ms']:>6.0f} / {ttfb['p95_ms']:<4.0f} {download['p50_ms']:>6.0f} / {download['p95_ms']:<4.0f} "
+            f"{host['robots_denied']:>6} {host['new_connections']:>7}/{host['reused_connections']:<7}  {statuses}"
+        )
+
+    lines += ["", "Stages (ms per page: p50 / p95, total s)"]
+    lines.append(f"  {'university':<20} " + " ".join(f"{stage:>24}" for stage in STAGES))
+    rows = [(uni_id, uni.get("stages", {})) for uni_id, uni in report["universities"].items()]
+    rows.append(("all", report["stages"]))
+    for uni_id, stages in rows:
+        cells = []
+        for stage in STAGES:
+            s = stages.get(stage)
+            cells.append(f"{s['p50_ms']:>6.0f} / {s['p95_ms']:<5.0f} {s['total_s']:>7.1f}s" if s else f"{'-':>24}")
+        lines.append(f"  {uni_id[:20]:<20} " + " ".join(f"{cell:>24}" for cell in cells))
+
+    universities = [uni for uni in report["universities"].values() if "status" in uni]
+    if universities:
+        lines += ["", "Universities"]
+        for uni in universities:
+            lines.append(f"  {uni['name'][:30]:<30} {uni['status']:<8} pages {uni['pages']}, "
+                         f"unchanged {uni['unchanged']}, courses {uni['courses']}, errors {uni['errors']}")
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+def _reports(directory):
+    return sorted(glob.glob(os.path.join(directory, "crawl-*.json")))
+
+
+def _label(path):
+    """Label of a ``crawl-<stamp>[-<label>].json`` report ("" for none)."""
+    name = os.path.basename(path)[len("crawl-"):-len(".json")]
+    return name[len("YYYYmmdd-HHMMSS-"):]
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _change(old, new):
+    """``"120 -> 180 ms (+50%)"``, flagged when it is a regression."""
+    if not old:
+        return f"{new:.0f} ms (new)"
+    ratio = new / old
+    flag = "  <-- slower" if ratio >= REGRESSION_RATIO and new - old >= 5 else ""
+    return f"{old:.0f} -> {new:.0f} ms ({(ratio - 1) * 100:+.0f}%){flag}"
+
+
+def compare(old, new):
+    lines = [f"Wall time: {old['wall_seconds']:.1f}s -> {new['wall_seconds']:.1f}s", "", "Hosts (p50)"]
+    for name, host in new["hosts"].items():
+        before = old["hosts"].get(name)
+        if before is None:
+            lines.append(f"  {name}: new host")
+            continue
+        lines.append(f"  {name}")
+        for key in ("ttfb", "download"):
+            lines.append(f"    {key:<9} {_change(before[key]['p50_ms'], host[key]['p50_ms'])}")
+        lines.append(f"    requests {before['requests']} -> {host['requests']}, errors {before['errors']} -> "
+                     f"{host['errors']}, MB {_mb(before['bytes']):.2f} -> {_mb(host['bytes']):.2f}")
+    lines += ["", "Stages (p50 per page)"]
+    for stage, timing in new["stages"].items():
+        before = old["stages"].get(stage)
+        lines.append(f"  {stage:<9} {_change(before['p50_ms'] if before else 0, timing['p50_ms'])}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or compare crawl telemetry reports")
+    parser.add_argument("--dir", default=REPORT_DIR, help="report directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="Print a report (default: the latest)")
+    show.add_argument("report", nargs="?")
+    diff = sub.add_parser("compare", help="Compare two reports (default: the latest two with the same label)")
+    diff.add_argument("old", nargs="?")
+    diff.add_argument("new", nargs="?")
+    diff.add_argument("--label", default=None,
+                      help='report label, e.g. a university id from crawler.runner ("" for full crawls; '
+                           "default: the latest report's)")
+    args = parser.parse_args(argv)
+
+    reports = _reports(args.dir)
+    if args.command == "show":
+        path = args.report or (reports[-1] if reports else None)
+        if path is None:
+            print(f"No reports in {args.dir}")
+            return
+        print(format_report(_load(path)), end="")
+    elif args.command == "compare":
+        if args.old and args.new:
+            old, new = args.old, args.new
+        else:
+            # Runner workers write one labelled report per university, so
+            # only reports of the same crawl target are comparable
+            label = args.label if args.label is not None else (_label(reports[-1]) if reports else "")
+            same = [path for path in reports if _label(path) == label]
+            if len(same) < 2:
+                print(f"Need two reports labelled {label!r} in {args.dir} "
+                      "(choose one with --label, or pass both paths)")
+                return
+            old, new = same[-2], same[-1]
+        print(f"{os.path.basename(old)} -> {os.path.basename(new)}")
+        print(compare(_load(old), _load(new)))
+
+
+if __name__ == "__main__":
+    main()
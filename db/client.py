@@ -0,0 +1,203 @@
+"""
+Shared MongoDB access for every subsystem (API, crawler, embedding jobs and
+scripts).
+
+Owns exactly one configured MongoClient per process (re-created after a fork,
+since MongoClient is not fork-safe), the projections each caller should use,
+a small retry helper for transient network errors, and connection-pool
+metrics.
+
+Configuration (environment):
+    MONGO_URI                          default mongodb://localhost:27017
+    MONGO_DB                           default ugc_scraper
+    MONGO_MAX_POOL_SIZE                default 50
+    MONGO_MIN_POOL_SIZE                default 0
+    MONGO_MAX_IDLE_TIME_MS             default 300000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS  default 5000
+    MONGO_CONNECT_TIMEOUT_MS           default 5000
+    MONGO_SOCKET_TIMEOUT_MS            default 30000
+    MONGO_READ_PREFERENCE              default primaryPreferred
+    MONGO_RETRY_ATTEMPTS               default 3
+"""
+
+import os
+import threading
+import time
+
+from pymongo import MongoClient
+from pymongo.errors import AutoReconnect, NetworkTimeout, ServerSelectionTimeoutError
+from pymongo.monitoring import ConnectionPoolListener
+
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.environ.get("MONGO_DB", "ugc_scraper")
+MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "50"))
+MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+MAX_IDLE_TIME_MS = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000"))
+SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+READ_PREFERENCE = os.environ.get("MONGO_READ_PREFERENCE", "primaryPreferred")
+RETRY_ATTEMPTS = int(os.environ.get("MONGO_RETRY_ATTEMPTS", "3"))
+
+TRANSIENT_ERRORS = (AutoReconnect, NetworkTimeout, ServerSelectionTimeoutError)
+
+
+# =====================================================
+# Projections (only pull the fields each caller needs)
+# =====================================================
+PROJECTIONS = {
+    # api/recommender.py (semantic/snapshot callers add the active space's vector field)
+    "recommender_semantic": {"course_name": 1, "source_url": 1, "eligibility": 1},
+    "recommender_catalog": {"course_name": 1, "source_url": 1, "eligibility": 1},
+    "catalog_version": {"scraped_at": 1},
+    # api/catalog_snapshot.py
+    "snapshot_export": {"course_name": 1, "source_url": 1, "eligibility": 1},
+    # api/generate_embeddings.py (plus the target space's hash field)
+    "embedding_text": {"course_name": 1, "description": 1, "keywords": 1},
+    # scripts/normalize_existing_courses.py
+    "eligibility_normalize": {"course_name": 1, "eligibility": 1, "eligibility_raw": 1},
+    # scripts/export_courses_to_csv.py
+    "csv_export": {"embedding": 0, "embeddings": 0},
+    # main.py / db/mongodb.py
+    "id_only": {"_id": 1},
+}
+
+
+def projection(name):
+    return dict(PROJECTIONS[name])
+
+
+# =====================================================
+# Pool metrics
+# =====================================================
+class PoolMetrics(ConnectionPoolListener):
+    """Counts pool events; read with pool_stats()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checked_out": 0,
+            "checked_in": 0,
+            "checkout_failed": 0,
+            "pools_cleared": 0,
+        }
+
+    def _incr(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._incr("pools_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._incr("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._incr("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._incr("checkout_failed")
+
+    def connection_checked_out(self, event):
+        self._incr("checked_out")
+
+    def connection_checked_in(self, event):
+        self._incr("checked_in")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counts)
+        stats["open_connections"] = stats["connections_created"] - stats["connections_closed"]
+        stats["in_use"] = stats["checked_out"] - stats["checked_in"]
+        return stats
+
+
+_pool_metrics = PoolMetrics()
+_retry_counts = {"retries": 0, "retry_exhausted": 0}
+
+
+# =====================================================
+# Client
+# =====================================================
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+
+
+def get_client():
+    """The process-wide MongoClient (created lazily; no I/O until first use)."""
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = MongoClient(
+                MONGO_URI,
+                maxPoolSize=MAX_POOL_SIZE,
+                minPoolSize=MIN_POOL_SIZE,
+                maxIdleTimeMS=MAX_IDLE_TIME_MS,
+                serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=CONNECT_TIMEOUT_MS,
+                socketTimeoutMS=SOCKET_TIMEOUT_MS,
+                readPreference=READ_PREFERENCE,
+                retryReads=True,
+                retryWrites=True,
+                event_listeners=[_pool_metrics],
+                connect=False,
+            )
+            _client_pid = os.getpid()
+    return _client
+
+
+def get_db():
+    return get_client()[MONGO_DB]
+
+
+def get_collection(name):
+    return get_db()[name]
+
+
+def with_retry(fn, *args, attempts=None, **kwargs):
+    """
+    Call ``fn`` and retry transient network errors with exponential backoff
+    (on top of the driver's single built-in retry). Only use this for reads
+    and idempotent writes such as upserts.
+    """
+    attempts = attempts or RETRY_ATTEMPTS
+    for attempt in range(attempts):
+        try:
+            return fn(*args, **kwargs)
+        except TRANSIENT_ERRORS:
+            if attempt == attempts - 1:
+                _retry_counts["retry_exhausted"] += 1
+                raise
+            _retry_counts["retries"] += 1
+            time.sleep(min(0.2 * (2 ** attempt), 2.0))
+
+
+def pool_stats():
+    return {
+        "max_pool_size": MAX_POOL_SIZE,
+        "read_preference": READ_PREFERENCE,
+        **_pool_metrics.stats(),
+        **_retry_counts,
+    }
@@ -1,95 +1,42 @@
-# from pymongo import MongoClient
-# from datetime import datetime
-# from bson import ObjectId
-
-# #Connection
-# client = MongoClient("mongodb://localhost:27017")
-# db = client["ugc_scraper"]
-
-# universities = db["universities"]
-# courses = db["courses"]
-
-# #Indexes
-# universities.create_index("id", unique=True)
-# courses.create_index("source_url", unique=True)
-
-
-# #Universities
-# def upsert_university(uni: dict) -> ObjectId:
-#     """
-#     Insert or update a university and ALWAYS return its ObjectId.
-#     """
-#     result = universities.update_one(
-#         {"id": uni["id"]},
-#         {"$set": uni},
-#         upsert=True
-#     )
-
-#     # If inserted now
-#     if result.upserted_id:
-#         return result.upserted_id
-
-#     # If already existed
-#     doc = universities.find_one({"id": uni["id"]})
-#     if not doc:
-#         raise RuntimeError("University upsert failed")
-
-#     return doc["_id"]
-
-
-# #Courses
-# def save_course(course: dict, university_id: ObjectId):
-#     """
-#     Save a course with a mandatory university_id FK.
-#     """
-#     if university_id is None:
-#         raise ValueError("university_id is None — FK relationship broken")
-
-#     course_doc = {
-#         **course,
-#         "university_id": university_id,
-#         "scraped_at": datetime.utcnow()
-#     }
-
-#     courses.update_one(
-#         {"source_url": course["source_url"]},
-#         {"$set": course_doc},
-#         upsert=True
-#     )
-
-from pymongo import MongoClient
+import os
+import threading
+import time
+from collections import deque
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 
-#Connection
-client = MongoClient("mongodb://localhost:27017")
-db = client["ugc_scraper"]
+from db.client import get_collection, projection, with_retry
 
-universities = db["universities"]
-courses = db["courses"]
+#Connection (shared, pooled client from db/client.py)
+universities = get_collection("universities")
+courses = get_collection("courses")
 
 #Indexes
 universities.create_index("id", unique=True)
 courses.create_index("source_url", unique=True)
+courses.create_index("scraped_at")  # latest scrape = API catalog version
+
+#Buffered course writes (CourseWriter)
+FLUSH_SIZE = int(os.environ.get("COURSE_WRITER_FLUSH_SIZE", "100"))
+FLUSH_INTERVAL = float(os.environ.get("COURSE_WRITER_FLUSH_INTERVAL", "1.0"))
 
 
 #Universities
 def upsert_university(uni: dict) -> ObjectId:
     """
-    Insert or update a university and ALWAYS return its ObjectId.
+    Insert or update a university and ALWAYS return its ObjectId
+    (one round trip: the upsert returns the document).
     """
-    result = universities.update_one(
+    doc = with_retry(
+        universities.find_one_and_update,
         {"id": uni["id"]},
         {"$set": uni},
-        upsert=True
+        projection=projection("id_only"),
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
     )
-
-    # If inserted now
-    if result.upserted_id:
-        return result.upserted_id
-
-    # If already existed
-    doc = universities.find_one({"id": uni["id"]})
     if not doc:
         raise RuntimeError("University upsert failed")
 
@@ -97,22 +44,128 @@ def upsert_university(uni: dict) -> ObjectId:
 
 
 #Courses
-def save_course(course: dict, university_id: ObjectId):
+def course_doc(course: dict, university_id: ObjectId) -> dict:
     """
-    Save a course with a mandatory university_id FK.
+    Course document with a mandatory university_id FK.
     """
     if university_id is None:
         raise ValueError("university_id is None — FK relationship broken")
 
-    course_doc = {
+    return {
         **course,
         "university_id": university_id,
         "scraped_at": datetime.utcnow()
     }
 
-    courses.update_one(
-        {"source_url": course["source_url"]},
-        {"$set": course_doc},
-        upsert=True
-    )
 
+class CourseWriter:
+    """
+    Buffers courses and upserts them with unordered bulk writes: when
+    ``flush_size`` courses are waiting, or every ``flush_interval`` seconds
+    from a background thread. ``on_saved(course, tag)`` / ``on_failed(course,
+    tag, error)`` are called from the flushing thread once a course's write
+    is acknowledged or rejected, so callers can defer "saved" bookkeeping
+    until the data is actually in MongoDB.
+    """
+
+    def __init__(self, courses_col=None, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 on_saved=None, on_failed=None):
+        self.courses_col = courses_col if courses_col is not None else courses
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.on_saved = on_saved
+        self.on_failed = on_failed
+        self.buffer = {}  # source_url -> (course, university_id, tag); latest save wins
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()  # one bulk write at a time, in submission order
+        self.stats = {"saved": 0, "failed": 0, "flushes": 0, "flush_seconds": 0.0, "max_flush_seconds": 0.0}
+        self.latencies = deque(maxlen=1000)  # seconds per recent flush, for percentiles
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="course-writer", daemon=True)
+        self.thread.start()
+
+    def add(self, course: dict, university_id: ObjectId, tag=None):
+        """Queue a course; flushes in the calling thread once the buffer is full."""
+        if university_id is None:
+            raise ValueError("university_id is None — FK relationship broken")
+        with self.lock:
+            self.buffer[course["source_url"]] = (course, university_id, tag)
+            full = len(self.buffer) >= self.flush_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far in one unordered bulk_write."""
+        with self.flush_lock:
+            with self.lock:
+                batch = list(self.buffer.values())
+                self.buffer = {}
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        ops = [
+            UpdateOne({"source_url": course["source_url"]}, {"$set": course_doc(course, university_id)}, upsert=True)
+            for course, university_id, _ in batch
+        ]
+        failed = {}
+        start = time.perf_counter()
+        try:
+            with_retry(self.courses_col.bulk_write, ops, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg", "write error") for error in e.details["writeErrors"]}
+        except Exception as e:
+            failed = dict.fromkeys(range(len(batch)), e)
+        seconds = time.perf_counter() - start
+
+        with self.lock:
+            self.stats["flushes"] += 1
+            self.stats["flush_seconds"] += seconds
+            self.stats["max_flush_seconds"] = max(self.stats["max_flush_seconds"], seconds)
+            self.stats["failed"] += len(failed)
+            self.stats["saved"] += len(batch) - len(failed)
+            self.latencies.append(seconds)
+
+        for index, (course, _, tag) in enumerate(batch):
+            if index in failed:
+                if self.on_failed:
+                    self.on_failed(course, tag, failed[index])
+            elif self.on_saved:
+                self.on_saved(course, tag)
+
+    def _run(self):
+        while not self.stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Course flush failed: {e}")
+
+    def close(self):
+        """Flush what is left and stop the background thread."""
+        self.stopped.set()
+        self.thread.join()
+        self.flush()
+
+    def flush_stats(self):
+        """Per-flush latency summary (ms) plus saved/failed counts."""
+        with self.lock:
+            stats = dict(self.stats)
+            latencies = sorted(self.latencies)
+        flushes = stats["flushes"]
+        return {
+            "saved": stats["saved"],
+            "failed": stats["failed"],
+            "flushes": flushes,
+            "courses_per_flush": (stats["saved"] + stats["failed"]) / flushes if flushes else 0.0,
+            "avg_ms": stats["flush_seconds"] / flushes * 1000 if flushes else 0.0,
+            "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0,
+            "max_ms": stats["max_flush_seconds"] * 1000,
+        }
+
+    def report(self):
+        stats = self.flush_stats()
+        print(
+            f"Course writes: {stats['saved']} saved, {stats['failed']} failed in {stats['flushes']} flushes "
+            f"({stats['courses_per_flush']:.1f} courses/flush, avg {stats['avg_ms']:.1f} ms, "
+            f"p95 {stats['p95_ms']:.1f} ms, max {stats['max_ms']:.1f} ms)"
+        )
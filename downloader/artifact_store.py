@@ -0,0 +1,133 @@
+"""
+Content-addressed, compressed store for downloaded pages.
+
+Each distinct page body is stored once under
+``<ARTIFACTS_DIR>/objects/<h[:2]>/<h>.html.<codec>``, where ``h`` is the
+sha256 of the body. The codec is zstd when the ``zstandard`` package is
+installed and gzip otherwise (ARTIFACT_CODEC=gzip|zstd overrides this).
+Which URL maps to which hash, together with its fetch metadata, lives in the
+page index (downloader/page_index.py). Identical pages served under many
+URLs therefore cost one object, and readers stream the decompressed text
+instead of loading raw files.
+
+    python -m downloader.artifact_store stats
+"""
+
+import argparse
+import gzip
+import io
+import os
+import sqlite3
+import threading
+
+from crawler import settings
+from downloader.page_index import content_hash
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+CODECS = ("zst", "gz")
+
+
+def default_codec():
+    codec = os.environ.get("ARTIFACT_CODEC", "auto")
+    if codec == "zstd" or (codec == "auto" and zstandard is not None):
+        if zstandard is None:
+            raise RuntimeError("ARTIFACT_CODEC=zstd but the zstandard package is not installed")
+        return "zst"
+    return "gz"
+
+
+class ArtifactStore:
+    def __init__(self, root=None, codec=None):
+        self.root = root or os.path.join(settings.ARTIFACTS_DIR, "objects")
+        self.codec = codec or default_codec()
+
+    def _path(self, digest, codec):
+        return os.path.join(self.root, digest[:2], f"{digest}.html.{codec}")
+
+    def find(self, digest):
+        """Path of the stored object for ``digest`` (any codec), or None."""
+        for codec in CODECS:
+            path = self._path(digest, codec)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def exists(self, digest):
+        return self.find(digest) is not None
+
+    def put(self, body):
+        """Store ``body`` (str or bytes) unless an identical page is already stored; returns its hash."""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        digest = content_hash(body)
+        if self.exists(digest):
+            return digest
+
+        path = self._path(digest, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique temp name: several crawl processes (and the downloader's
+        # worker threads) may store the same page at once
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if self.codec == "zst":
+            data = zstandard.ZstdCompressor(level=10).compress(body)
+        else:
+            data = gzip.compress(body, compresslevel=6)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return digest
+
+    def open(self, digest):
+        """Text stream of a stored page (decompressed on the fly)."""
+        path = self.find(digest)
+        if path is None:
+            raise FileNotFoundError(f"No artifact for {digest}")
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError(f"{path} is zstd-compressed but zstandard is not installed")
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+            return io.TextIOWrapper(raw, encoding="utf-8")
+        return gzip.open(path, "rt", encoding="utf-8")
+
+    def read(self, digest):
+        with self.open(digest) as f:
+            return f.read()
+
+    def stats(self):
+        objects = 0
+        stored_bytes = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(tuple(f".{codec}" for codec in CODECS)):
+                    objects += 1
+                    stored_bytes += os.path.getsize(os.path.join(dirpath, name))
+        return {"objects": objects, "stored_bytes": stored_bytes}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the artifact store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Object count, compressed size and URL dedup ratio")
+    parser.parse_args(argv)
+
+    stats = ArtifactStore().stats()
+    urls = 0
+    index_path = os.path.join(settings.STATE_DIR, "page_index.sqlite")
+    if os.path.exists(index_path):
+        conn = sqlite3.connect(index_path)
+        urls = conn.execute("SELECT COUNT(*) FROM pages WHERE content_hash IS NOT NULL").fetchone()[0]
+        conn.close()
+    print(f"Objects:       {stats['objects']}")
+    print(f"Stored size:   {stats['stored_bytes'] / 1024 / 1024:.1f} MiB")
+    print(f"Indexed URLs:  {urls}")
+    if stats["objects"]:
+        print(f"URLs / object: {urls / stats['objects']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Concurrent page downloader (asyncio + aiohttp).
+
+One pooled ClientSession (keep-alive connections, per-host connection limit)
+serves every university. Each host gets a rate controller
+(downloader/rate_control.py) that adapts its in-flight requests, starting at
+CRAWL_PER_HOST_CONCURRENCY, to the host's latency and 429/503s, honours
+Retry-After and spaces request starts by at least its politeness delay
+(CRAWL_HOST_DELAY); CRAWL_CONCURRENCY caps requests across all hosts.
+Failed requests are retried with jittered exponential backoff.
+
+Page bodies go into the content-addressed ArtifactStore and the PageIndex
+records each URL's content hash, ETag and Last-Modified. ``refresh=True``
+re-requests stored pages conditionally and reports which ones actually
+changed. Compressing and writing a body and committing its index row run in
+a worker thread, so they never hold up the event loop.
+
+    async with AsyncDownloader() as downloader:
+        content_hash, changed = await downloader.download(url, uni_id, refresh=True)
+"""
+
+import asyncio
+import contextlib
+import os
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+
+from crawler import settings
+from downloader.html_downloader import HEADERS, artifact_path, backoff_delay, normalize_url
+from downloader.artifact_store import ArtifactStore
+from downloader.page_index import PageIndex
+from crawler.replay import replay_rewrite
+from downloader.rate_control import MAX_PER_HOST_CONCURRENCY, HostRateController, print_rates
+
+
+# Responses worth retrying; other 4xx fail immediately
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AsyncDownloader:
+    def __init__(self, concurrency=None, per_host_concurrency=None, host_delay=None,
+                 timeout=None, retries=None, page_index=None, store=None, telemetry=None,
+                 recorder=None, url_rewrite=None):
+        self.concurrency = concurrency or settings.CONCURRENCY
+        self.per_host_concurrency = per_host_concurrency or settings.PER_HOST_CONCURRENCY
+        self.host_delay = settings.HOST_DELAY if host_delay is None else host_delay
+        self.timeout = timeout or settings.TIMEOUT
+        self.retries = retries or settings.RETRIES
+        self.page_index = page_index or PageIndex()
+        self.store = store or ArtifactStore()
+        self.telemetry = telemetry  # crawler/telemetry.py CrawlTelemetry, optional
+        self.recorder = recorder    # crawler/replay.py Recorder, optional
+        # Where requests actually go (CRAWL_REPLAY_URL: a local replay server);
+        # hosts, rate control and the page index still see the original URLs
+        if url_rewrite is None and settings.REPLAY_URL:
+            url_rewrite = replay_rewrite(settings.REPLAY_URL)
+        self.url_rewrite = url_rewrite
+        self.session = None
+        self.slots = {}
+        self.global_limit = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            # The rate controllers decide how much of this each host gets (a
+            # replay server stands in for every host)
+            limit_per_host=0 if self.url_rewrite else max(self.per_host_concurrency, MAX_PER_HOST_CONCURRENCY),
+            ttl_dns_cache=300,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=HEADERS,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[self.telemetry.trace_config()] if self.telemetry else None,
+        )
+        self.global_limit = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def slot(self, host):
+        if host not in self.slots:
+            self.slots[host] = HostRateController(host, self.per_host_concurrency, self.host_delay)
+        return self.slots[host]
+
+    def set_host_delay(self, host, delay):
+        """Raise a host's politeness delay (never lowers it below the configured default)."""
+        self.slot(host).min_delay = max(self.host_delay, delay)
+
+    def _target(self, url):
+        return self.url_rewrite(url) if self.url_rewrite else url
+
+    def rate_stats(self):
+        """Per-host rate controller snapshots (see downloader/rate_control.py)."""
+        return [slot.snapshot() for slot in self.slots.values()]
+
+    def report(self):
+        print_rates(list(self.slots.values()))
+
+    # -------------------------------------------------
+    # Fetching
+    # -------------------------------------------------
+    async def fetch(self, url):
+        """GET ``url`` and return its body as text, retrying transient failures."""
+        _, _, body = await self.request(url)
+        return body
+
+    async def request(self, url, headers=None):
+        """GET ``url`` with retries; returns ``(status, response headers, body)``."""
+        host = urlparse(url).netloc
+        slot = self.slot(host)
+
+        for attempt in range(self.retries):
+            # Politeness / Retry-After wait happens before taking a global slot
+            await slot.acquire()
+            start = time.monotonic()
+            try:
+                async with self.global_limit, self.session.get(
+                    self._target(url), headers=headers, trace_request_ctx={"host": host}
+                ) as res:
+                    if res.status >= 400:
+                        slot.record(res.status, time.monotonic() - start, res.headers.get("Retry-After"))
+                        if self.recorder:
+                            self.recorder.record(url, res.status, res.headers, b"")
+                    if res.status in RETRY_STATUSES:
+                        raise aiohttp.ClientResponseError(
+                            res.request_info, res.history, status=res.status, message=res.reason
+                        )
+                    res.raise_for_status()
+                    body = await res.text()
+                    elapsed = time.monotonic() - start
+                    if self.recorder:
+                        self.recorder.record(url, res.status, res.headers, await res.read())
+                    slot.record(res.status, elapsed)
+                    if self.telemetry:
+                        self.telemetry.download(host, elapsed)
+                    return res.status, res.headers, body
+
+            except aiohttp.ClientResponseError as e:
+                if e.status not in RETRY_STATUSES or attempt == self.retries - 1:
+                    raise
+            except asyncio.TimeoutError:
+                slot.record(timeout=True)
+                if attempt == self.retries - 1:
+                    raise
+            except aiohttp.ClientError:
+                slot.record()
+                if attempt == self.retries - 1:
+                    raise
+            finally:
+                slot.release()
+            await asyncio.sleep(backoff_delay(attempt))
+
+    @contextlib.asynccontextmanager
+    async def stream(self, url):
+        """
+        Open ``url`` and yield the response without reading its body, for
+        callers that consume it incrementally (``res.content.iter_chunked``).
+        Opening the request is retried like ``request``; the host and global
+        slots stay held until the block exits. The rate controller sees the
+        time to the response headers.
+        """
+        host = urlparse(url).netloc
+        slot = self.slot(host)
+
+        for attempt in range(self.retries):
+            last_attempt = attempt == self.retries - 1
+            await slot.acquire()
+            try:
+                await self.global_limit.acquire()
+            except asyncio.CancelledError:
+                slot.release()
+                raise
+            start = time.monotonic()
+            try:
+                res = await self.session.get(self._target(url), trace_request_ctx={"host": host})
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                slot.record(timeout=isinstance(e, asyncio.TimeoutError))
+                self.global_limit.release()
+                slot.release()
+                if last_attempt:
+                    raise
+            else:
+                slot.record(res.status, time.monotonic() - start, res.headers.get("Retry-After"))
+                if res.status not in RETRY_STATUSES or last_attempt:
+                    break
+                res.release()
+                self.global_limit.release()
+                slot.release()
+            await asyncio.sleep(backoff_delay(attempt))
+
+        try:
+            if self.recorder:
+                res = await self.recorder.capture(url, res)
+            res.raise_for_status()
+            yield res
+        finally:
+            res.release()
+            self.global_limit.release()
+            slot.release()
+
+    def _stored_hash(self, url, uni_id):
+        """
+        Hash of the stored body for ``url``, or None. A page downloaded by
+        the old flat-file layout (artifacts/{uni_id}/<path>.html) is moved
+        into the store on first access.
+        """
+        entry = self.page_index.get(url)
+        if entry and entry["content_hash"] and self.store.exists(entry["content_hash"]):
+            return entry["content_hash"]
+
+        legacy_path = artifact_path(url, uni_id)
+        if os.path.exists(legacy_path):
+            with open(legacy_path, encoding="utf-8") as f:
+                digest = self.store.put(f.read())
+            self.page_index.record(url, uni_id, None, None, digest)
+            os.remove(legacy_path)
+            return digest
+        return None
+
+    def _save(self, url, uni_id, etag, last_modified, html):
+        # Store first: the index must never point at a body the store lacks
+        digest = self.store.put(html)
+        return digest, self.page_index.record(url, uni_id, etag, last_modified, digest)
+
+    async def download(self, url, uni_id, refresh=False):
+        """
+        Fetch ``url`` into the artifact store and return ``(content_hash,
+        changed)``. Without ``refresh`` a page that is already stored is
+        reused as-is; with it the page is re-requested conditionally and
+        ``changed`` is False on a 304 or an identical body.
+        """
+        url = normalize_url(url)
+        stored_hash = await asyncio.to_thread(self._stored_hash, url, uni_id)
+
+        # already downloaded
+        if stored_hash and not refresh:
+            return stored_hash, True
+
+        headers = self.page_index.conditional_headers(url) if stored_hash else None
+        status, res_headers, html = await self.request(url, headers=headers)
+        if status == 304:
+            await asyncio.to_thread(self.page_index.touch, url)
+            return stored_hash, False
+
+        digest, changed = await asyncio.to_thread(
+            self._save, url, uni_id, res_headers.get("ETag"), res_headers.get("Last-Modified"), html
+        )
+        return digest, changed or not stored_hash
+
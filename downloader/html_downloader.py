@@ -1,8 +1,8 @@
-import os
-import time
-import requests
+import random
 from urllib.parse import urlparse
 
+from crawler import settings
+
 HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -15,35 +15,20 @@ HEADERS = {
 }
 
 
-def download_html(url: str, uni_id: str) -> str:
-    os.makedirs(f"artifacts/{uni_id}", exist_ok=True)
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number ``attempt`` (0-based)."""
+    cap = min(settings.BACKOFF_MAX, settings.BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, cap)
+
 
+def normalize_url(url: str) -> str:
     #BCAS FIX FORCE TRAILING SLASH
     if not url.endswith("/"):
         url = url + "/"
+    return url
 
-    filename = urlparse(url).path.strip("/").replace("/", "_") + ".html"
-    path = f"artifacts/{uni_id}/{filename}"
-
-    # already downloaded
-    if os.path.exists(path):
-        return path
 
-    # Add delay before fetching to avoid rate limiting
-    time.sleep(1)
-
-    # retry logic
-    for attempt in range(3):
-        try:
-            res = requests.get(url, headers=HEADERS, timeout=30)
-            res.raise_for_status()
-
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(res.text)
-
-            return path
+def artifact_path(url: str, uni_id: str) -> str:
+    filename = urlparse(url).path.strip("/").replace("/", "_") + ".html"
+    return f"{settings.ARTIFACTS_DIR}/{uni_id}/{filename}"
 
-        except Exception as e:
-            if attempt == 2:
-                raise e
-            time.sleep(3)  # Longer delay before retry
@@ -0,0 +1,106 @@
+"""
+Per-URL fetch validators for conditional re-crawls.
+
+A small SQLite table (``<CRAWL_STATE_DIR>/page_index.sqlite``) remembers the
+ETag, Last-Modified and content hash of every page we downloaded. A refresh
+crawl sends them back as If-None-Match / If-Modified-Since and only treats a
+page as changed when the server returns a new body with a different hash.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from crawler import settings
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url           TEXT PRIMARY KEY,
+    uni_id        TEXT,
+    etag          TEXT,
+    last_modified TEXT,
+    content_hash  TEXT,
+    fetched_at    TEXT,
+    changed_at    TEXT
+)
+"""
+
+
+def content_hash(body):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha256(body).hexdigest()
+
+
+class PageIndex:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(settings.STATE_DIR, "page_index.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Shared by the event loop and extraction threads; several crawl
+        # processes may open the same file, so use WAL and wait on locks.
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        """Stored validators for ``url`` as a dict, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, content_hash, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "content_hash": row[2], "fetched_at": row[3]}
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a refresh request."""
+        entry = self.get(url)
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, url, uni_id, etag, last_modified, body_hash):
+        """
+        Store the validators of a 200 response. Returns True if the content
+        hash differs from the previous fetch (or the page is new).
+        """
+        now = datetime.utcnow().isoformat()
+        with self.lock:
+            row = self.conn.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            changed = row is None or row[0] != body_hash
+            self.conn.execute(
+                """
+                INSERT INTO pages (url, uni_id, etag, last_modified, content_hash, fetched_at, changed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    uni_id = excluded.uni_id,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    content_hash = excluded.content_hash,
+                    fetched_at = excluded.fetched_at,
+                    changed_at = CASE WHEN pages.content_hash = excluded.content_hash
+                                      THEN pages.changed_at ELSE excluded.changed_at END
+                """,
+                (url, uni_id, etag, last_modified, body_hash, now, now),
+            )
+            self.conn.commit()
+        return changed
+
+    def touch(self, url):
+        """Record a 304 Not Modified (page checked, unchanged)."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE pages SET fetched_at = ? WHERE url = ?", (datetime.utcnow().isoformat(), url)
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
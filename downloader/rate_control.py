@@ -0,0 +1,218 @@
+"""
+Adaptive per-host request rate for the async downloader (AIMD).
+
+Each host gets a ``HostRateController`` that decides how many requests may
+be in flight to it and how far apart request starts must be:
+
+- Additive increase: every 2xx/3xx answered within CRAWL_TARGET_LATENCY
+  seconds adds ``1 / limit`` to the host's concurrency limit. That is about
+  +1 per round of ``limit`` requests, up to CRAWL_MAX_PER_HOST_CONCURRENCY.
+- Multiplicative decrease: a 429, 503 or timeout halves the limit. A slow
+  success (over the target latency) cuts it by a quarter. Either cut
+  happens at most once per round trip, so one burst of failures counts
+  once. Each throttling cut also doubles an extra delay between request
+  starts, which shrinks again as requests succeed.
+- ``Retry-After`` (seconds or an HTTP date, capped at CRAWL_RETRY_AFTER_MAX)
+  pauses every request to the host until then.
+
+The politeness delay (CRAWL_HOST_DELAY, or a larger robots.txt
+Crawl-delay) is a floor the controller never goes under. The first limit
+is CRAWL_PER_HOST_CONCURRENCY. With CRAWL_ADAPTIVE_RATE=0 the limit stays
+there, and only Retry-After and the throttling delay apply.
+
+    slot = HostRateController("www.sliit.lk", concurrency=2, delay=1.0)
+    await slot.acquire()
+    try:
+        ...
+        slot.record(status, seconds, retry_after=res.headers.get("Retry-After"))
+    finally:
+        slot.release()
+"""
+
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from email.utils import parsedate_to_datetime
+
+from crawler import settings
+
+
+ADAPTIVE = os.environ.get("CRAWL_ADAPTIVE_RATE", "1") == "1"
+MAX_PER_HOST_CONCURRENCY = int(os.environ.get("CRAWL_MAX_PER_HOST_CONCURRENCY", "8"))
+TARGET_LATENCY = float(os.environ.get("CRAWL_TARGET_LATENCY", "2.0"))
+RETRY_AFTER_MAX = float(os.environ.get("CRAWL_RETRY_AFTER_MAX", "120"))
+
+# Responses that mean "slow down"
+THROTTLE_STATUSES = {429, 503}
+
+# Extra spacing after throttling: starts here, doubles per throttle, decays on success
+PENALTY_STEP = 0.5
+PENALTY_DECAY = 0.9
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait for a ``Retry-After`` header value (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+class HostRateController:
+    def __init__(self, host, concurrency=None, delay=None, max_concurrency=None,
+                 target_latency=TARGET_LATENCY, retry_after_max=RETRY_AFTER_MAX, adaptive=ADAPTIVE):
+        self.host = host
+        self.limit = float(concurrency or settings.PER_HOST_CONCURRENCY)
+        self.min_limit = 1.0 if adaptive else self.limit
+        self.max_limit = float(max(self.limit, max_concurrency or MAX_PER_HOST_CONCURRENCY)) \
+            if adaptive else self.limit
+        self.min_delay = settings.HOST_DELAY if delay is None else delay  # politeness floor
+        self.penalty = 0.0
+        self.target_latency = target_latency
+        self.retry_after_max = retry_after_max
+
+        self.in_flight = 0
+        self.waiters = deque()
+        self.lock = asyncio.Lock()
+        self.next_start = 0.0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.latency = None  # EWMA of response seconds
+
+        self.stats = Counter()  # requests, ok, throttled, timeouts, errors, slow, pauses, decreases
+        self.peak_limit = self.limit
+        self.peak_in_flight = 0
+        self.first_start = None
+        self.last_end = None
+
+    @property
+    def delay(self):
+        """Current minimum spacing between request starts."""
+        return self.min_delay + self.penalty
+
+    # -------------------------------------------------
+    # Gate
+    # -------------------------------------------------
+    async def acquire(self):
+        """Wait for a concurrency slot, any Retry-After pause and the start spacing."""
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append(waiter)
+            try:
+                await waiter  # _wake() hands over the slot
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release()
+                raise
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        try:
+            async with self.lock:
+                while True:
+                    now = time.monotonic()
+                    wait = max(self.next_start, self.paused_until) - now
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                self.next_start = time.monotonic() + self.delay
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        if self.first_start is None:
+            self.first_start = time.monotonic()
+
+    def release(self):
+        self.in_flight -= 1
+        self.last_end = time.monotonic()
+        self._wake()
+
+    def _wake(self):
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    # -------------------------------------------------
+    # Feedback
+    # -------------------------------------------------
+    def record(self, status=None, seconds=None, retry_after=None, timeout=False):
+        """Feed one request's outcome back: HTTP ``status`` and ``seconds``, or ``timeout``."""
+        now = time.monotonic()
+        self.stats["requests"] += 1
+        if seconds is not None:
+            self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+
+        if timeout or status in THROTTLE_STATUSES:
+            self.stats["timeouts" if timeout else "throttled"] += 1
+            if self._decrease(now, 0.5):
+                self.penalty = min(max(self.penalty * 2, PENALTY_STEP), settings.BACKOFF_MAX)
+            pause = parse_retry_after(retry_after)
+            if pause:
+                self.paused_until = max(self.paused_until, now + min(pause, self.retry_after_max))
+                self.stats["pauses"] += 1
+            return
+
+        if status is None or status >= 400:
+            self.stats["errors"] += 1
+            return
+
+        self.stats["ok"] += 1
+        if seconds is not None and seconds > self.target_latency:
+            self.stats["slow"] += 1
+            self._decrease(now, 0.75)
+            return
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self.peak_limit = max(self.peak_limit, self.limit)
+        self.penalty = self.penalty * PENALTY_DECAY if self.penalty > 0.05 else 0.0
+        self._wake()
+
+    def _decrease(self, now, factor):
+        """Cut the limit by ``factor``; returns False if it was already cut this round trip."""
+        # At most one cut per round trip: responses already in flight saw the old rate
+        if now - self.last_decrease < max(self.latency or 0.0, self.delay, 0.1):
+            return False
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit * factor)
+        self.stats["decreases"] += 1
+        return True
+
+    def snapshot(self):
+        """Current rate and counters, for crawl stats."""
+        active = (self.last_end or 0) - (self.first_start or 0)
+        return {
+            "host": self.host,
+            "limit": int(self.limit),
+            "peak_limit": int(self.peak_limit),
+            "peak_in_flight": self.peak_in_flight,
+            "delay": self.delay,
+            "latency_ms": (self.latency or 0.0) * 1000,
+            "requests_per_s": self.stats["requests"] / active if active > 0 else 0.0,
+            **{key: self.stats[key] for key in
+               ("requests", "ok", "throttled", "timeouts", "errors", "slow", "pauses", "decreases")},
+        }
+
+
+def print_rates(controllers):
+    """Per-host table of the rates the controllers settled on."""
+    if not controllers:
+        return
+    print(f"\nPer-host rates ({'adaptive' if ADAPTIVE else 'fixed'}):")
+    print(f"  {'host':<32} {'reqs':>5} {'req/s':>6} {'limit':>5} {'peak':>4} {'delay s':>7} "
+          f"{'lat ms':>7} {'429/503':>7} {'tmout':>5} {'paused':>6}")
+    for controller in sorted(controllers, key=lambda c: c.host):
+        s = controller.snapshot()
+        print(f"  {s['host'][:32]:<32} {s['requests']:>5} {s['requests_per_s']:>6.1f} {s['limit']:>5} "
+              f"{s['peak_limit']:>4} {s['delay']:>7.2f} {s['latency_ms']:>7.0f} {s['throttled']:>7} "
+              f"{s['timeouts']:>5} {s['pauses']:>6}")
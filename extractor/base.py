@@ -1,3 +1,47 @@
+import os
+
+from extractor.scan import LxmlScan, SoupScan
+
+
+# "html.parser" builds the tree the extractors were written against. "lxml"
+# is faster but repairs malformed markup differently, so only set
+# EXTRACTOR_PARSER=lxml once scripts/benchmark_extractors.py reports no
+# differing pages on the stored corpus.
+PARSER = os.environ.get("EXTRACTOR_PARSER", "html.parser")
+
+
 class BaseExtractor:
-    def extract(self, html: str, url: str) -> dict:
+    # True if extract() output depends on the URL beyond "source_url" (e.g. a
+    # course name derived from the slug), so identical pages under different
+    # URLs cannot share one extraction result.
+    uses_url = False
+
+    # Bump when a change alters extract() output; cached results of older
+    # versions are re-extracted on the next crawl (see extractor/cache.py)
+    version = 1
+
+    # Block elements whose texts the extractor searches (see PageScan)
+    blocks = ("p", "li", "span")
+
+    def __init__(self, parser=None):
+        # "lxml" scans an lxml tree directly; anything else is a BeautifulSoup tree builder
+        self.parser = parser or PARSER
+
+    def extract(self, html, url: str) -> dict:
+        """``html`` is the page as a string or a text stream."""
         raise NotImplementedError
+
+    def scan(self, html):
+        """Parse ``html`` and index it in one walk (see extractor/scan.py)."""
+        if self.parser == "lxml":
+            return LxmlScan(html, self.blocks)
+        return SoupScan(html, self.blocks, self.parser)
+
+    @property
+    def cache_version(self):
+        """Version recorded with cached results; backends may build different trees for broken markup."""
+        return f"{self.version}/{self.parser}"
+
+    def result_key(self, content_hash: str, url: str):
+        """Key under which the extraction of a stored page can be reused."""
+        return (content_hash, url if self.uses_url else None)
@@ -0,0 +1,132 @@
+"""
+Extraction results cached per stored page and extractor version.
+
+``<CRAWL_STATE_DIR>/extraction_cache.sqlite`` maps (extractor type, content
+hash, URL) to the raw course dict that extractor produced. The URL is part
+of the key only for extractors with ``uses_url``. Each row records the
+extractor's ``cache_version`` (its ``version`` plus parser backend). A crawl
+re-parses a page only when its HTML changed or its extractor's version was
+bumped.
+
+    python -m extractor.cache stats
+    python -m extractor.cache invalidate sliit
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from crawler import settings
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    extractor     TEXT NOT NULL,
+    content_hash  TEXT NOT NULL,
+    url           TEXT NOT NULL,
+    version       TEXT NOT NULL,
+    result        TEXT NOT NULL,
+    extracted_at  REAL,
+    PRIMARY KEY (extractor, content_hash, url)
+)
+"""
+
+
+class ExtractionCache:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(settings.STATE_DIR, "extraction_cache.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(uni_type, extractor, content_hash, url):
+        content_hash, url = extractor.result_key(content_hash, url)
+        return (uni_type, content_hash, url or "")
+
+    def _lookup(self, uni_type, extractor, content_hash, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT version, result FROM results WHERE extractor = ? AND content_hash = ? AND url = ?",
+                self._key(uni_type, extractor, content_hash, url),
+            ).fetchone()
+        if row is None or row[0] != extractor.cache_version:
+            return None
+        return row[1]
+
+    def is_current(self, uni_type, extractor, content_hash, url):
+        """True if this page has a result from the extractor's current version."""
+        return self._lookup(uni_type, extractor, content_hash, url) is not None
+
+    def get(self, uni_type, extractor, content_hash, url):
+        """Cached raw dict for this page and extractor version, or None."""
+        result = self._lookup(uni_type, extractor, content_hash, url)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(result)
+
+    def put(self, uni_type, extractor, content_hash, url, raw):
+        self._write(
+            "INSERT OR REPLACE INTO results (extractor, content_hash, url, version, result, extracted_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (*self._key(uni_type, extractor, content_hash, url), extractor.cache_version,
+             json.dumps(raw), time.time()),
+        )
+
+    def _write(self, sql, params=()):
+        with self.lock:
+            cursor = self.conn.execute(sql, params)
+            self.conn.commit()
+        return cursor.rowcount
+
+    def invalidate(self, uni_type=None):
+        """Drop cached results for one extractor (or all of them); returns the number removed."""
+        if uni_type is None:
+            return self._write("DELETE FROM results")
+        return self._write("DELETE FROM results WHERE extractor = ?", (uni_type,))
+
+    def stats(self):
+        """``[(extractor, version, rows), ...]``."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT extractor, version, COUNT(*) FROM results GROUP BY extractor, version "
+                "ORDER BY extractor, version"
+            ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the extraction cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Cached results per extractor and version")
+    invalidate = sub.add_parser("invalidate", help="Re-extract an extractor's pages on the next refresh crawl")
+    target = invalidate.add_mutually_exclusive_group(required=True)
+    target.add_argument("extractor", nargs="?", help="extractor type, e.g. sliit")
+    target.add_argument("--all", action="store_true", help="invalidate every extractor")
+    args = parser.parse_args(argv)
+
+    cache = ExtractionCache()
+    if args.command == "stats":
+        print(f"{'extractor':<10} {'version':<20} {'results':>8}")
+        for extractor, version, rows in cache.stats():
+            print(f"{extractor:<10} {version:<20} {rows:>8}")
+    elif args.command == "invalidate":
+        removed = cache.invalidate(None if args.all else args.extractor)
+        print(f"Removed {removed} cached results; they are re-extracted on the next `main.py --refresh`")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
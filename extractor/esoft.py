@@ -1,54 +1,43 @@
-from bs4 import BeautifulSoup
 from extractor.base import BaseExtractor
 
 
-def safe_text(el):
-    return el.get_text(" ", strip=True) if el else None
-
-
 class ESOFTExtractor(BaseExtractor):
+    version = 1
 
     def extract(self, html, url):
-        soup = BeautifulSoup(html, "html.parser")
+        scan = self.scan(html)
 
      
         course_name = None
 
      
-        h1 = soup.select_one("h1")
-        if h1:
-            course_name = safe_text(h1)
+        h1 = scan.first("h1")
+        if h1 is not None:
+            course_name = scan.text(h1, " ")
 
         
         if not course_name:
-            h2 = soup.select_one(".elementor-heading-title")
-            if h2:
-                course_name = safe_text(h2)
+            h2 = scan.first_by_class("elementor-heading-title")
+            if h2 is not None:
+                course_name = scan.text(h2, " ")
 
         
         if not course_name:
-            title = soup.find("title")
-            if title:
+            title = scan.first("title")
+            if title is not None:
                 course_name = (
-                    title.get_text(strip=True)
+                    scan.text(title)
                     .replace("| ESOFT", "")
                     .replace("ESOFT", "")
                     .strip()
                 )
 
        
-        duration = None
-        for el in soup.find_all(["p", "li", "span"]):
-            text = el.get_text(strip=True).lower()
-            if any(k in text for k in ["year", "years", "month", "months"]):
-                duration = el.get_text(strip=True)
-                break
+        duration = next(scan.texts_containing("year", "month"), None)
 
        
-        eligibility_raw = None
-
-        heading = soup.find(
-            string=lambda x: x and any(
+        eligibility_raw = scan.container_text(
+            lambda x: x and any(
                 k in x.lower()
                 for k in [
                     "entry requirement",
@@ -59,11 +48,6 @@ class ESOFTExtractor(BaseExtractor):
             )
         )
 
-        if heading:
-            container = heading.find_parent(["section", "div"])
-            if container:
-                eligibility_raw = container.get_text(" ", strip=True)
-
         return {
             "course_name": course_name,
             "duration": duration,
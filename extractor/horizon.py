@@ -1,31 +1,28 @@
-from bs4 import BeautifulSoup
 from extractor.base import BaseExtractor
 
 
-def safe_text(el):
-    return el.get_text(strip=True) if el else None
-
-
 class HorizonExtractor(BaseExtractor):
+    version = 1
+    uses_url = True  # falls back to the URL slug for the course name
 
     def extract(self, html, url):
-        soup = BeautifulSoup(html, "html.parser")
+        scan = self.scan(html)
 
         
 
         course_name = None
 
       
-        h1 = soup.find("h1")
-        if h1:
-            text = safe_text(h1)
+        h1 = scan.first("h1")
+        if h1 is not None:
+            text = scan.text(h1)
             if text and "discover" not in text.lower():
                 course_name = text
 
         
         if not course_name:
-            for el in soup.select("h2.elementor-heading-title"):
-                text = safe_text(el)
+            for el in scan.find_all("h2", class_="elementor-heading-title"):
+                text = scan.text(el)
                 if text:
                     course_name = text
                     break
@@ -41,28 +38,17 @@ class HorizonExtractor(BaseExtractor):
 
         
 
-        duration = None
-        for el in soup.find_all(["p", "li", "span"]):
-            t = el.get_text(strip=True).lower()
-            if "year" in t or "month" in t:
-                duration = el.get_text(strip=True)
-                break
+        duration = next(scan.texts_containing("year", "month"), None)
 
         
 
-        eligibility_raw = None
-        eligibility_heading = soup.find(
-            string=lambda x: x and (
+        eligibility_raw = scan.container_text(
+            lambda x: x and (
                 "entry requirement" in x.lower()
                 or "eligibility" in x.lower()
             )
         )
 
-        if eligibility_heading:
-            parent = eligibility_heading.find_parent(["section", "div"])
-            if parent:
-                eligibility_raw = parent.get_text(" ", strip=True)
-
         return {
             "course_name": course_name,
             "duration": duration,
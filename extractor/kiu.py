@@ -1,24 +1,21 @@
-from bs4 import BeautifulSoup
 from extractor.base import BaseExtractor
 
 class KIUExtractor(BaseExtractor):
+    version = 1
+    blocks = ("p", "li")
 
     def extract(self, html, url):
-        soup = BeautifulSoup(html, "html.parser")
+        scan = self.scan(html)
 
         def safe(el):
-            return el.get_text(strip=True) if el else "Not Available"
+            return scan.text(el) if el is not None else "Not Available"
 
-        course_name = safe(soup.find("h1"))
-        duration = "Not Available"
-        eligibility = "Refer course page"
-
-        for div in soup.find_all(["p", "li"]):
-            text = div.get_text(strip=True).lower()
-            if "year" in text:
-                duration = div.get_text(strip=True)
-            if "entry" in text or "eligibility" in text:
-                eligibility = div.get_text(strip=True)
+        course_name = safe(scan.first("h1"))
+        # The last matching block wins
+        duration = next(scan.texts_containing("year", reverse=True), "Not Available")
+        eligibility = next(
+            scan.texts_containing("entry", "eligibility", reverse=True), "Refer course page"
+        )
 
         return {
             "course_name": course_name,
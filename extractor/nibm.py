@@ -1,33 +1,30 @@
-from bs4 import BeautifulSoup
 from extractor.base import BaseExtractor
 
 
-def safe_text(el):
-    return el.get_text(strip=True) if el else None
-
-
 class NIBMExtractor(BaseExtractor):
+    version = 1
+    uses_url = True  # falls back to the URL slug for the course name
 
     def extract(self, html, url):
-        soup = BeautifulSoup(html, "html.parser")
+        scan = self.scan(html)
 
   
 
         course_name = None
 
         
-        h1 = soup.find("h1")
-        if h1:
-            text = safe_text(h1)
+        h1 = scan.first("h1")
+        if h1 is not None:
+            text = scan.text(h1)
             if text and len(text) > 5:
                 course_name = text
 
        
         if not course_name:
-            title_tag = soup.find("title")
-            if title_tag:
+            title_tag = scan.first("title")
+            if title_tag is not None:
                 course_name = (
-                    title_tag.get_text(strip=True)
+                    scan.text(title_tag)
                     .replace("| NIBM", "")
                     .replace("– NIBM", "")
                     .strip()
@@ -43,27 +40,16 @@ class NIBMExtractor(BaseExtractor):
             )
 
      
-        duration = None
-        for el in soup.find_all(["p", "li", "span"]):
-            t = el.get_text(strip=True).lower()
-            if "year" in t or "month" in t:
-                duration = el.get_text(strip=True)
-                break
+        duration = next(scan.texts_containing("year", "month"), None)
 
         
-        eligibility_raw = None
-        eligibility_heading = soup.find(
-            string=lambda x: x and (
+        eligibility_raw = scan.container_text(
+            lambda x: x and (
                 "entry requirement" in x.lower()
                 or "eligibility" in x.lower()
             )
         )
 
-        if eligibility_heading:
-            parent = eligibility_heading.find_parent(["section", "div"])
-            if parent:
-                eligibility_raw = parent.get_text(" ", strip=True)
-
         return {
             "course_name": course_name,
             "duration": duration,
@@ -1,31 +1,24 @@
-from bs4 import BeautifulSoup
 from extractor.base import BaseExtractor
 
 
-def safe_text(el):
-    return el.get_text(strip=True) if el else None
-
-
 class NSBMExtractor(BaseExtractor):
+    version = 1
+    blocks = ()
 
     def extract(self, html, url):
-        soup = BeautifulSoup(html, "html.parser")
-
-        course_name = safe_text(
-            soup.select_one("h2.elementor-heading-title")
-        )
+        scan = self.scan(html)
 
-        duration = safe_text(
-            soup.select_one(".elementor-headline-dynamic-text")
+        course_name = scan.text(
+            scan.first("h2", class_="elementor-heading-title")
         )
 
-        eligibility_block = soup.find(
-            string=lambda x: x and "ENTRY QUALIFICATIONS" in x.upper()
+        duration = scan.text(
+            scan.first_by_class("elementor-headline-dynamic-text")
         )
 
-        eligibility_raw = (
-            eligibility_block.find_parent("section").get_text(" ", strip=True)
-            if eligibility_block else None
+        eligibility_raw = scan.container_text(
+            lambda x: x and "ENTRY QUALIFICATIONS" in x.upper(),
+            containers=("section",),
         )
 
         return {
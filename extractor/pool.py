@@ -0,0 +1,105 @@
+"""
+Process-pool extraction stage.
+
+BeautifulSoup parsing is CPU-bound, so pages are extracted in
+EXTRACT_WORKERS processes (default: CPU count) instead of inline between
+downloads. Each worker opens the artifact store itself and keeps one
+instance of every extractor it has used. Only content hashes go in and raw
+course dicts come out, so the pages never cross process boundaries.
+
+    async with ExtractionPool(workers=4) as pool:
+        raw = await pool.extract("sliit", content_hash, url)
+    pool.report()
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from downloader.artifact_store import ArtifactStore
+from extractor.registry import get_extractor
+
+
+DEFAULT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+
+_worker_store = None
+_worker_extractors = {}
+
+
+def _init_worker(store_root, codec):
+    global _worker_store
+    _worker_store = ArtifactStore(store_root, codec)
+
+
+def _extract_in_worker(uni_type, digest, url):
+    """Returns ``(raw, seconds)`` so the parent can keep per-extractor stats."""
+    start = time.perf_counter()
+    extractor = _worker_extractors.get(uni_type)
+    if extractor is None:
+        extractor = _worker_extractors[uni_type] = get_extractor(uni_type)
+    with _worker_store.open(digest) as html:
+        raw = extractor.extract(html, url)
+    return raw, time.perf_counter() - start
+
+
+class ExtractionPool:
+    def __init__(self, workers=None, store=None, max_in_flight=None):
+        self.workers = workers or DEFAULT_WORKERS
+        self.store = store or ArtifactStore()
+        # Bounds memory: at most this many pages queued for the workers
+        self.max_in_flight = max_in_flight or self.workers * 4
+        self.executor = None
+        self.slots = None
+        self.lock = threading.Lock()
+        self.stats = {}  # uni_type -> {"pages", "errors", "seconds"}
+        self.started_at = None
+
+    async def __aenter__(self):
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.store.root, self.store.codec),
+        )
+        self.slots = asyncio.Semaphore(self.max_in_flight)
+        self.started_at = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.executor.shutdown(wait=True, cancel_futures=exc[0] is not None)
+
+    def _record(self, uni_type, seconds=0.0, error=False):
+        with self.lock:
+            stats = self.stats.setdefault(uni_type, {"pages": 0, "errors": 0, "seconds": 0.0})
+            stats["errors" if error else "pages"] += 1
+            stats["seconds"] += seconds
+
+    async def extract(self, uni_type, digest, url):
+        """Extract one stored page in a worker process and return the raw course dict."""
+        loop = asyncio.get_running_loop()
+        async with self.slots:
+            try:
+                raw, seconds = await loop.run_in_executor(
+                    self.executor, _extract_in_worker, uni_type, digest, url
+                )
+            except Exception:
+                self._record(uni_type, error=True)
+                raise
+        self._record(uni_type, seconds)
+        return raw
+
+    def report(self):
+        """Print per-extractor throughput (pages/s of worker CPU time) and overall wall rate."""
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        total = sum(stats["pages"] for stats in self.stats.values())
+        print(f"\nExtraction ({self.workers} workers): {total} pages"
+              + (f", {total / elapsed:.1f} pages/s wall" if elapsed > 0 else ""))
+        print(f"  {'extractor':<10} {'pages':>6} {'errors':>6} {'ms/page':>8} {'pages/s/worker':>15}")
+        for uni_type, stats in sorted(self.stats.items()):
+            per_page = stats["seconds"] / stats["pages"] if stats["pages"] else 0.0
+            rate = 1 / per_page if per_page else 0.0
+            print(f"  {uni_type:<10} {stats['pages']:>6} {stats['errors']:>6} "
+                  f"{per_page * 1000:>8.1f} {rate:>15.1f}")
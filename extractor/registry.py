@@ -0,0 +1,36 @@
+"""Extractor class for each university ``type`` in config/universities.json."""
+
+from extractor.nsbm import NSBMExtractor
+from extractor.apiit import APIITExtractor
+from extractor.cinec import CINECExtractor
+from extractor.kiu import KIUExtractor
+from extractor.icbt import ICBTExtractor
+from extractor.sltc import SLTCExtractor
+from extractor.nibm import NIBMExtractor
+from extractor.horizon import HorizonExtractor
+from extractor.bcas import BCASExtractor
+from extractor.iit import IITExtractor
+from extractor.anc import ANCExtractor
+from extractor.esoft import ESOFTExtractor
+from extractor.sliit import SLIITExtractor
+
+
+EXTRACTORS = {
+    "nsbm": NSBMExtractor,
+    "apiit": APIITExtractor,
+    "cinec": CINECExtractor,
+    "kiu": KIUExtractor,
+    "icbt": ICBTExtractor,
+    "sltc": SLTCExtractor,
+    "nibm": NIBMExtractor,
+    "horizon": HorizonExtractor,
+    "bcas": BCASExtractor,
+    "iit": IITExtractor,
+    "anc": ANCExtractor,
+    "esoft": ESOFTExtractor,
+    "sliit": SLIITExtractor
+}
+
+
+def get_extractor(uni_type):
+    return EXTRACTORS[uni_type]()
@@ -0,0 +1,289 @@
+"""
+Single-pass page scanning for the extractors.
+
+The extractors used to call ``el.get_text(strip=True)`` on every <p>/<li>/
+<span>/<div> in turn. Nested blocks re-stringify the same text again and
+again, so the cost grows with page depth, and building a BeautifulSoup tree
+is itself the slowest part of extraction. A ``PageScan`` parses the page and
+walks it once. On the way it records every tag by name and class, every
+string in document order, and each element's span in the concatenated page
+text. Element texts are then slices of that text, and keyword tests are
+bisects over precomputed match positions.
+
+Two backends produce the same index:
+
+- ``LxmlScan`` works on an lxml tree directly (no BeautifulSoup), which is
+  several times faster to build and walk.
+- ``SoupScan`` works on any BeautifulSoup tree builder (``html.parser``,
+  ``html5lib``). It matches the tree the extractors were written against.
+
+Texts follow BeautifulSoup's ``get_text(strip=True)`` rules for every
+backend: stripped strings, skipping comments and anything inside
+<script>/<style>/<template>/<rt>/<rp>.
+
+    scan = LxmlScan(html, blocks=("p", "li", "span"))
+    title = scan.text(scan.first("title"))
+    duration = next(scan.texts_containing("year", "month"), None)
+"""
+
+from bisect import bisect_left
+
+from bs4 import BeautifulSoup
+from bs4.element import CData, NavigableString, Tag
+
+try:
+    import lxml
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+
+# Strings get_text() includes for ordinary elements (no comments, scripts, ...)
+TEXT_TYPES = (NavigableString, CData)
+
+# Tags whose strings BeautifulSoup gives their own string types, so they are
+# left out of the text of the elements around them
+STRING_CONTAINERS = frozenset(("script", "style", "template", "rt", "rp"))
+
+
+class PageScan:
+    """Backend-independent page index; subclasses fill it in ``_walk``."""
+
+    def __init__(self, root, blocks=("p", "li", "span")):
+        self.root = root
+        self.block_names = frozenset(blocks)
+        self.tags = {}       # name -> [element, ...] in document order
+        self.classes = {}    # CSS class -> [element, ...] in document order
+        self.strings = []    # (string, enclosing element) for every string, comments included
+        self.blocks = []     # spans of the block elements, in document order
+        # id(element) -> [element, first piece, end piece, start, end, lower start, lower end]
+        self.spans = {}
+        self._pieces = []
+        self._lowered = []
+        self._length = 0
+        self._lower_length = 0
+        self._positions = {}  # keyword -> sorted match offsets in the lowercased text
+        if root is not None:
+            self._walk(root)
+        self.page_text = "".join(self._pieces)
+        self.lower_text = "".join(self._lowered)
+
+    # -------------------------------------------------
+    # Building the index (used by the backends)
+    # -------------------------------------------------
+    def _open(self, element, name, class_names):
+        self.tags.setdefault(name, []).append(element)
+        for class_name in class_names:
+            self.classes.setdefault(class_name, []).append(element)
+        span = [element, len(self._pieces), None, self._length, None, self._lower_length, None]
+        self.spans[id(element)] = span
+        if name in self.block_names:
+            self.blocks.append(span)
+        return span
+
+    def _close(self, span):
+        span[2], span[4], span[6] = len(self._pieces), self._length, self._lower_length
+
+    def _string(self, string, parent, is_text):
+        self.strings.append((string, parent))
+        if not is_text:
+            return
+        stripped = string.strip()
+        if stripped:
+            lower = stripped.lower()
+            self._pieces.append(stripped)
+            self._lowered.append(lower)
+            self._length += len(stripped)
+            self._lower_length += len(lower)
+
+    def _walk(self, root):
+        raise NotImplementedError
+
+    def _parent(self, element):
+        raise NotImplementedError
+
+    def _name(self, element):
+        raise NotImplementedError
+
+    def _class_names(self, element):
+        raise NotImplementedError
+
+    # -------------------------------------------------
+    # Tags and strings
+    # -------------------------------------------------
+    def find_all(self, name, class_=None):
+        """Tags named ``name`` (optionally with CSS class ``class_``), like ``soup.select("name.class")``."""
+        tags = self.tags.get(name, [])
+        if class_ is None:
+            return tags
+        return [tag for tag in tags if class_ in self._class_names(tag)]
+
+    def first(self, name, class_=None):
+        """First matching tag, like ``soup.find(name)`` / ``soup.select_one("name.class")``."""
+        tags = self.find_all(name, class_)
+        return tags[0] if tags else None
+
+    def first_by_class(self, class_):
+        """First tag of any name with CSS class ``class_``, like ``soup.select_one(".class")``."""
+        tags = self.classes.get(class_)
+        return tags[0] if tags else None
+
+    def has_ancestor(self, element, name, *class_names):
+        """True if an ancestor of ``element`` is a ``name`` tag with all of ``class_names``."""
+        parent = self._parent(element)
+        while parent is not None:
+            if self._name(parent) == name and set(class_names) <= self._class_names(parent):
+                return True
+            parent = self._parent(parent)
+        return False
+
+    def container_text(self, predicate, containers=("section", "div"), separator=" "):
+        """
+        Text of the nearest ``containers`` element around the first string for
+        which ``predicate(string)`` is true, i.e.
+        ``soup.find(string=predicate).find_parent(containers).get_text(separator, strip=True)``.
+        None if there is no such string or container.
+        """
+        for string, parent in self.strings:
+            if predicate(string):
+                while parent is not None and self._name(parent) not in containers:
+                    parent = self._parent(parent)
+                return self.text(parent, separator)
+        return None
+
+    # -------------------------------------------------
+    # Texts
+    # -------------------------------------------------
+    def text(self, element, separator=""):
+        """``element.get_text(separator, strip=True)``; None for a missing element."""
+        if element is None:
+            return None
+        span = self.spans[id(element)]
+        if separator == "":
+            return self.page_text[span[3]:span[4]]
+        return separator.join(self._pieces[span[1]:span[2]])
+
+    def _occurrences(self, keyword):
+        positions = self._positions.get(keyword)
+        if positions is None:
+            positions = []
+            index = self.lower_text.find(keyword)
+            while index != -1:
+                positions.append(index)
+                index = self.lower_text.find(keyword, index + 1)
+            self._positions[keyword] = positions
+        return positions
+
+    def _contains(self, keyword, start, end):
+        positions = self._occurrences(keyword)
+        i = bisect_left(positions, start)
+        return i < len(positions) and positions[i] + len(keyword) <= end
+
+    def texts_containing(self, *keywords, require_all=False, reverse=False):
+        """
+        Texts of the blocks whose lowercased text contains any (or, with
+        ``require_all``, every) of the lowercase ``keywords``, in document
+        order (last block first with ``reverse``).
+        """
+        match = all if require_all else any
+        blocks = reversed(self.blocks) if reverse else self.blocks
+        for span in blocks:
+            if match(self._contains(keyword, span[5], span[6]) for keyword in keywords):
+                yield self.page_text[span[3]:span[4]]
+
+
+class SoupScan(PageScan):
+    """Scan of a BeautifulSoup tree (``html.parser``, ``html5lib``, ...)."""
+
+    def __init__(self, html, blocks=("p", "li", "span"), parser="html.parser"):
+        super().__init__(BeautifulSoup(html, parser), blocks)
+
+    def _walk(self, root):
+        stack = [(None, iter(root.contents))]
+        while stack:
+            span, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                if span is not None:
+                    self._close(span)
+                continue
+            if isinstance(child, Tag):
+                span = self._open(child, child.name, child.get("class") or ())
+                stack.append((span, iter(child.contents)))
+            else:
+                self._string(child, child.parent, type(child) in TEXT_TYPES)
+
+    def _parent(self, element):
+        parent = element.parent
+        # The BeautifulSoup object itself is not a page element
+        return None if parent is None or isinstance(parent, BeautifulSoup) else parent
+
+    def _name(self, element):
+        return element.name
+
+    def _class_names(self, element):
+        return set(element.get("class") or ())
+
+
+_lxml_parser = None
+
+
+def _utf8_parser():
+    global _lxml_parser
+    if _lxml_parser is None:
+        _lxml_parser = etree.HTMLParser(encoding="utf-8")
+    return _lxml_parser
+
+
+class LxmlScan(PageScan):
+    """Scan of an lxml HTML tree; needs the ``lxml`` package."""
+
+    def __init__(self, html, blocks=("p", "li", "span")):
+        if hasattr(html, "read"):
+            html = html.read()
+        if isinstance(html, str):
+            # lxml refuses str input that carries an <?xml encoding=...?> declaration
+            html = html.encode("utf-8")
+        try:
+            root = etree.fromstring(html, _utf8_parser()) if html.strip() else None
+        except etree.XMLSyntaxError:  # nothing but whitespace / comments
+            root = None
+        super().__init__(root, blocks)
+
+    def _walk(self, root):
+        # iterwalk yields elements and comments in document order (processing
+        # instructions come out of the HTML parser as comments). Strings inside
+        # STRING_CONTAINERS are searchable but not text, as in BeautifulSoup.
+        spans = []
+        containers = 0
+        for event, element in etree.iterwalk(root, events=("start", "end", "comment")):
+            if event == "start":
+                name = element.tag
+                if name in STRING_CONTAINERS:
+                    containers += 1
+                class_names = element.get("class")
+                spans.append(self._open(element, name, class_names.split() if class_names else ()))
+                if element.text:
+                    self._string(element.text, element, not containers)
+            elif event == "end":
+                self._close(spans.pop())
+                if element.tag in STRING_CONTAINERS:
+                    containers -= 1
+                if element.tail and spans:
+                    self._string(element.tail, spans[-1][0], not containers)
+            else:
+                parent = element.getparent()
+                if element.text:
+                    self._string(element.text, parent, False)
+                if element.tail:
+                    self._string(element.tail, parent, not containers)
+
+    def _parent(self, element):
+        return element.getparent()
+
+    def _name(self, element):
+        return element.tag
+
+    def _class_names(self, element):
+        return set((element.get("class") or "").split())
@@ -1,68 +1,56 @@
-from bs4 import BeautifulSoup
-from extractor.base import BaseExtractor
-
+import re
 
-def safe_text(el):
-    return el.get_text(strip=True) if el else None
+from extractor.base import BaseExtractor
 
 
 class SLIITExtractor(BaseExtractor):
+    version = 1
+    blocks = ("p", "li", "span", "div")
 
     def extract(self, html, url):
-        soup = BeautifulSoup(html, "html.parser")
+        scan = self.scan(html)
 
        
         course_name = None
         
   
-        title_tag = soup.find("title")
-        if title_tag:
-            title_text = safe_text(title_tag)
+        title_tag = scan.first("title")
+        if title_tag is not None:
+            title_text = scan.text(title_tag)
             if title_text and len(title_text) > 3:
                 
                 course_name = title_text.split("|")[0].strip()
         
         
         if not course_name:
-            strong_tags = soup.find_all("strong")
+            strong_tags = scan.find_all("strong")
             for strong in strong_tags[:5]:  
-                text = safe_text(strong)
+                text = scan.text(strong)
                 if text and "bsc" in text.lower() or "msc" in text.lower() or "bachelor" in text.lower():
                     course_name = text
                     break
         
        
         if not course_name:
-            h1 = soup.find("h1")
-            if h1:
-                h1_text = safe_text(h1)
+            h1 = scan.first("h1")
+            if h1 is not None:
+                h1_text = scan.text(h1)
                 if h1_text and len(h1_text) > 3 and not any(nav in h1_text.lower() for nav in ["home", "contact", "sliit"]):
                     course_name = h1_text
 
         
         duration = None
-        for el in soup.find_all(["p", "li", "span", "div"]):
-            text = el.get_text(strip=True)
-           
-            if "duration" in text.lower() and "year" in text.lower():
-               
-                import re
-                match = re.search(r"duration\s*:\s*(\d+)\s*years?", text, re.IGNORECASE)
-                if match:
-                    duration = f"Duration : {match.group(1)} Years"
-                    break
+        for text in scan.texts_containing("duration", "year", require_all=True):
+            match = re.search(r"duration\s*:\s*(\d+)\s*years?", text, re.IGNORECASE)
+            if match:
+                duration = f"Duration : {match.group(1)} Years"
+                break
 
        
-        eligibility_raw = None
-        heading = soup.find(
-            string=lambda x: x and "entry requirement" in x.lower()
+        eligibility_raw = scan.container_text(
+            lambda x: x and "entry requirement" in x.lower()
         )
 
-        if heading:
-            parent = heading.find_parent(["section", "div"])
-            if parent:
-                eligibility_raw = parent.get_text(" ", strip=True)
-
         return {
             "course_name": course_name,
             "duration": duration,
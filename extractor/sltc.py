@@ -1,31 +1,30 @@
-from bs4 import BeautifulSoup
 from extractor.base import BaseExtractor
 
 
-def safe_text(el):
-    return el.get_text(strip=True) if el else None
-
-
 class SLTCExtractor(BaseExtractor):
+    version = 1
+    uses_url = True  # falls back to the URL slug for the course name
 
     def extract(self, html, url):
-        soup = BeautifulSoup(html, "html.parser")
+        scan = self.scan(html)
 
       
 
         course_name = None
 
        
-        h2 = soup.select_one(
-            "div.tab-content-section.section-main h2.elementor-heading-title"
-        )
-        if h2:
-            course_name = safe_text(h2)
+        # div.tab-content-section.section-main h2.elementor-heading-title
+        h2 = next((
+            el for el in scan.find_all("h2", class_="elementor-heading-title")
+            if scan.has_ancestor(el, "div", "tab-content-section", "section-main")
+        ), None)
+        if h2 is not None:
+            course_name = scan.text(h2)
 
        
         if not course_name:
-            for el in soup.select("h2.elementor-heading-title"):
-                text = safe_text(el)
+            for el in scan.find_all("h2", class_="elementor-heading-title"):
+                text = scan.text(el)
                 if text and "learn." not in text.lower() and "discover" not in text.lower():
                     course_name = text
                     break
@@ -41,29 +40,18 @@ class SLTCExtractor(BaseExtractor):
 
 
 
-        duration = None
-        for el in soup.find_all(["p", "li", "span"]):
-            t = el.get_text(strip=True).lower()
-            if "year" in t or "month" in t:
-                duration = el.get_text(strip=True)
-                break
+        duration = next(scan.texts_containing("year", "month"), None)
 
        
 
-        eligibility_raw = None
-        eligibility_heading = soup.find(
-            string=lambda x: x and (
+        eligibility_raw = scan.container_text(
+            lambda x: x and (
                 "entry requirement" in x.lower()
                 or "entry qualification" in x.lower()
                 or "eligibility" in x.lower()
             )
         )
 
-        if eligibility_heading:
-            parent = eligibility_heading.find_parent(["section", "div"])
-            if parent:
-                eligibility_raw = parent.get_text(" ", strip=True)
-
         return {
             "course_name": course_name,
             "duration": duration,
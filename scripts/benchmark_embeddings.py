@@ -0,0 +1,105 @@
+"""
+Benchmark multi-process embedding generation, scaling from 1 to N workers.
+
+Encodes the same corpus with 1, 2, 4, ... worker processes (each pinned to
+CPU count / workers intra-op threads) and prints courses/sec and speedup.
+Nothing is written to MongoDB.
+
+    python scripts/benchmark_embeddings.py --max-workers 8 --courses 2000
+    python scripts/benchmark_embeddings.py --from-db --courses 5000
+"""
+
+import sys
+import os
+import argparse
+import itertools
+import time
+
+# add project root to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.generate_embeddings import (
+    DEFAULT_BATCH_SIZE,
+    course_text,
+    default_threads_per_worker,
+    parallel_encode,
+)
+
+
+LEVELS = ["BSc (Hons) in", "MSc in", "Higher National Diploma in", "Diploma in", "Foundation Certificate in", "MBA in"]
+FIELDS = ["Software Engineering", "Business Management", "Nursing", "Civil Engineering", "Psychology",
+          "Data Science", "Accounting and Finance", "Marine Engineering", "Law", "Graphic Design"]
+
+
+def synthetic_texts(count):
+    names = itertools.cycle(f"{level} {field}" for level in LEVELS for field in FIELDS)
+    return [
+        course_text({
+            "course_name": f"{next(names)} ({i})",
+            "description": "A full-time programme with industry placement, lab work and a final year project.",
+            "keywords": "career, degree, sri lanka",
+        })
+        for i in range(count)
+    ]
+
+
+def db_texts(count):
+    from db.client import get_collection, projection
+
+    cursor = get_collection("courses").find({}, projection("embedding_text")).limit(count)
+    return [course_text(course) for course in cursor]
+
+
+def worker_counts(max_workers):
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def run(texts, workers, batch_size):
+    batches = (
+        (i, texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)
+    )
+    start = time.perf_counter()
+    first_result = None
+    encoded = 0
+    for _, vectors in parallel_encode(batches, workers, batch_size=batch_size):
+        if first_result is None:
+            first_result = time.perf_counter()
+        encoded += len(vectors)
+    end = time.perf_counter()
+    return encoded, end - start, end - (first_result or end)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parallel embedding generation")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--from-db", action="store_true",
+                        help="benchmark on real course texts instead of a synthetic corpus")
+    args = parser.parse_args(argv)
+
+    texts = db_texts(args.courses) if args.from_db else synthetic_texts(args.courses)
+    print(f"Benchmarking {len(texts)} courses, batch size {args.batch_size}, CPUs {os.cpu_count()}")
+    print(f"{'workers':>7} {'threads':>7} {'wall s':>8} {'courses/s':>10} {'steady/s':>9} {'speedup':>8}")
+
+    baseline = None
+    for workers in worker_counts(args.max_workers):
+        encoded, wall, steady = run(texts, workers, args.batch_size)
+        rate = encoded / wall if wall else 0.0
+        # Rate after the first batch returns, i.e. excluding process start + model load
+        steady_rate = (encoded - args.batch_size) / steady if steady > 0 else rate
+        baseline = baseline or rate
+        print(
+            f"{workers:>7} {default_threads_per_worker(workers):>7} {wall:>8.1f} "
+            f"{rate:>10.1f} {steady_rate:>9.1f} {rate / baseline:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark the extractor parser backends on stored pages.
+
+Re-extracts pages from the artifact store (via the page index) with each
+backend, prints ms/page per extractor, and counts pages whose output
+differs from the first backend. Only switch EXTRACTOR_PARSER away from
+html.parser once this reports zero differing pages.
+Nothing is written to MongoDB.
+
+    python scripts/benchmark_extractors.py
+    python scripts/benchmark_extractors.py --parsers html.parser,lxml --pages 200 --uni sliit
+"""
+
+import sys
+import os
+import argparse
+import json
+import sqlite3
+import time
+from collections import defaultdict
+
+# add project root to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import settings
+from downloader.artifact_store import ArtifactStore
+from extractor.registry import EXTRACTORS
+
+
+def stored_pages(uni_types, limit, uni_id=None):
+    """``(uni_type, url, body)`` for up to ``limit`` stored pages per university."""
+    conn = sqlite3.connect(os.path.join(settings.STATE_DIR, "page_index.sqlite"))
+    store = ArtifactStore()
+    pages = []
+    for uni, uni_type in uni_types.items():
+        if uni_id and uni != uni_id:
+            continue
+        rows = conn.execute(
+            "SELECT url, content_hash FROM pages WHERE uni_id = ? AND content_hash IS NOT NULL LIMIT ?",
+            (uni, limit),
+        ).fetchall()
+        pages.extend(
+            (uni_type, url, store.read(digest)) for url, digest in rows if store.exists(digest)
+        )
+    conn.close()
+    return pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark extractor parser backends")
+    parser.add_argument("--parsers", default="html.parser,lxml",
+                        help="comma-separated backends; the first is the reference output")
+    parser.add_argument("--pages", type=int, default=100, help="pages per university")
+    parser.add_argument("--uni", default=None, help="university id from config/universities.json")
+    args = parser.parse_args(argv)
+
+    with open("config/universities.json") as f:
+        uni_types = {uni["id"]: uni["type"] for uni in json.load(f)}
+    pages = stored_pages(uni_types, args.pages, args.uni)
+    if not pages:
+        print("No stored pages; run a crawl first")
+        return
+
+    parsers = args.parsers.split(",")
+    seconds = defaultdict(float)   # (uni_type, parser) -> total
+    counts = defaultdict(int)      # uni_type -> pages
+    mismatches = defaultdict(int)  # (uni_type, parser) -> pages differing from parsers[0]
+    for uni_type, url, body in pages:
+        counts[uni_type] += 1
+        reference = None
+        for name in parsers:
+            extractor = EXTRACTORS[uni_type](name)
+            start = time.perf_counter()
+            result = extractor.extract(body, url)
+            seconds[uni_type, name] += time.perf_counter() - start
+            if reference is None:
+                reference = result
+            elif result != reference:
+                mismatches[uni_type, name] += 1
+
+    print(f"Benchmarking {len(pages)} stored pages; reference backend {parsers[0]}")
+    print(f"{'extractor':<10} {'pages':>6}" + "".join(f" {name + ' ms':>15}" for name in parsers)
+          + "".join(f" {name + ' diff':>15}" for name in parsers[1:]))
+    for uni_type in sorted(counts):
+        n = counts[uni_type]
+        print(f"{uni_type:<10} {n:>6}"
+              + "".join(f" {seconds[uni_type, name] / n * 1000:>15.1f}" for name in parsers)
+              + "".join(f" {mismatches[uni_type, name]:>15}" for name in parsers[1:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
-from pymongo import MongoClient
+import sys
+import os
+
+# add project root to PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 import pandas as pd
+from db.client import get_collection, projection
 
-# Connect to MongoDB
-client = MongoClient("mongodb://localhost:27017")
-db = client["ugc_scraper"]
-courses = db["courses"]
+# Connect to MongoDB (shared client)
+courses = get_collection("courses")
 
-# Fetch data
-docs = list(courses.find())
+# Fetch data (embeddings are large and not useful in a CSV)
+docs = list(courses.find({}, projection("csv_export")))
 
 # Convert ObjectId to string
 for d in docs:
@@ -4,15 +4,13 @@ import os
 # ✅ add project root to PYTHONPATH FIRST
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from pymongo import MongoClient
+from db.client import get_collection, projection
 from services.eligibility_normalizer import normalize_eligibility
 
 
-client = MongoClient("mongodb://localhost:27017")
-db = client["ugc_scraper"]
-courses = db["courses"]
+courses = get_collection("courses")
 
-for course in courses.find():
+for course in courses.find({}, projection("eligibility_normalize")):
     updated = normalize_eligibility(course)
 
     courses.update_one(
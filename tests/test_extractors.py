@@ -0,0 +1,40 @@
+"""
+The SoupScan extractors against the original BeautifulSoup extractors.
+
+tests/fixtures/expected_extractions.json holds what the original
+extractors (find/find_all/get_text on an ``html.parser`` soup) returned for
+each page in tests/fixtures/pages, for every extractor type. The pages
+cover the layouts the extractors target plus the awkward cases: scripts,
+comments, entities, CDATA, <template> and unclosed or misnested tags.
+"""
+
+import json
+import os
+
+import pytest
+
+from extractor.registry import EXTRACTORS
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+with open(os.path.join(FIXTURES, "expected_extractions.json"), encoding="utf-8") as f:
+    EXPECTED = json.load(f)
+
+
+def page_url(page):
+    return f"https://www.example.lk/programmes/{page[:-5].replace('_', '-')}-course/"
+
+
+@pytest.mark.parametrize("page", sorted(EXPECTED))
+@pytest.mark.parametrize("uni_type", sorted(EXTRACTORS))
+def test_matches_original_extractor(page, uni_type):
+    with open(os.path.join(FIXTURES, "pages", page), encoding="utf-8") as f:
+        html = f.read()
+    assert EXTRACTORS[uni_type]("html.parser").extract(html, page_url(page)) == EXPECTED[page][uni_type]
+
+
+def test_every_page_has_expectations():
+    pages = {name for name in os.listdir(os.path.join(FIXTURES, "pages")) if name.endswith(".html")}
+    assert pages == set(EXPECTED)
+    assert all(set(results) == set(EXTRACTORS) for results in EXPECTED.values())
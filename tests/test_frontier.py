@@ -0,0 +1,88 @@
+import pytest
+
+from crawler import frontier as frontier_module
+from crawler import settings
+from crawler.frontier import DISCOVERED, DOWNLOADED, EXTRACTED, FAILED, SAVED, Frontier
+
+
+URLS = [f"https://www.example.lk/programmes/course-{i}/" for i in range(6)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "frontier.sqlite")
+
+
+def test_restart_resumes_unfinished_urls(path):
+    frontier = Frontier(path)
+    frontier.add("sliit", URLS)
+    frontier.mark(URLS[0], SAVED, save_ms=12.0)
+    frontier.mark(URLS[1], DOWNLOADED, download_ms=30.0)
+    frontier.mark(URLS[2], EXTRACTED, extract_ms=4.0)
+    frontier.add("nsbm", ["https://www.nsbm.ac.lk/programmes/other/"])
+    frontier.close()
+
+    resumed = Frontier(path)
+    assert resumed.has_state("sliit")
+    assert resumed.pending("sliit") == URLS[1:]
+    assert resumed.counts("sliit") == {SAVED: 1, DOWNLOADED: 1, EXTRACTED: 1, DISCOVERED: 3}
+    resumed.close()
+
+
+def test_rediscovered_urls_keep_their_state(path):
+    frontier = Frontier(path)
+    frontier.add("sliit", URLS[:2])
+    frontier.mark(URLS[0], SAVED)
+    frontier.add("sliit", URLS)
+    assert frontier.pending("sliit") == URLS[1:]
+
+    frontier.add("sliit", URLS, requeue=True)  # refresh: saved pages go round again
+    assert frontier.pending("sliit") == URLS
+    frontier.close()
+
+
+def test_failed_urls_wait_for_their_retry_time(path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(frontier_module.time, "time", lambda: clock[0])
+    monkeypatch.setattr(settings, "RETRY_AFTER", 60)
+    monkeypatch.setattr(settings, "MAX_ATTEMPTS", 2)
+
+    frontier = Frontier(path)
+    frontier.add("sliit", URLS[:1])
+    frontier.fail(URLS[0], RuntimeError("HTTP 500"))
+    assert frontier.pending("sliit") == []
+    assert frontier.counts("sliit") == {FAILED: 1}
+
+    clock[0] += 61
+    assert frontier.pending("sliit") == URLS[:1]
+
+    # Second failure reaches MAX_ATTEMPTS: given up until retried by hand
+    frontier.fail(URLS[0], RuntimeError("HTTP 500"))
+    clock[0] += 10_000
+    assert frontier.pending("sliit") == []
+    (url, uni_id, attempts, next_attempt_at, error), = frontier.failed("sliit")
+    assert (attempts, next_attempt_at, error) == (2, None, "HTTP 500")
+
+    assert frontier.retry_now("sliit") == 1
+    assert frontier.pending("sliit") == URLS[:1]
+    frontier.close()
+
+
+def test_stage_updates_are_committed_in_batches(path):
+    frontier = Frontier(path, flush_size=3, flush_interval=3600)
+    frontier.add("sliit", URLS)
+    other = Frontier(path)
+
+    frontier.mark(URLS[0], SAVED)
+    frontier.fail(URLS[1], RuntimeError("HTTP 500"))
+    assert other.counts("sliit") == {DISCOVERED: 6}  # still buffered
+
+    frontier.mark(URLS[2], SAVED)  # third update fills the batch
+    assert other.counts("sliit") == {DISCOVERED: 3, SAVED: 2, FAILED: 1}
+
+    frontier.mark(URLS[3], DOWNLOADED)
+    assert frontier.counts("sliit")[DOWNLOADED] == 1  # reads see their own updates
+    frontier.mark(URLS[4], EXTRACTED)
+    frontier.close()
+    assert other.counts("sliit") == {DISCOVERED: 1, DOWNLOADED: 1, EXTRACTED: 1, SAVED: 2, FAILED: 1}
+    other.close()
@@ -0,0 +1,82 @@
+import pytest
+
+from api import pagination
+from api.pagination import InvalidCursor, RankingCache, StaleCursor
+
+
+RANKED = [{"course_name": f"Course {i}"} for i in range(30)]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def cached(version="v1", key="key"):
+    cache = RankingCache(max_entries=4, ttl=60)
+    cache.put(key, version, RANKED)
+    return cache
+
+
+def test_cursor_round_trip():
+    cache = cached()
+    first = pagination.paginate(RANKED, "key", "v1", "AL", limit=12)
+    assert first["total"] == 30
+    ranked, key, version, level, offset = pagination.resolve_cursor(cache, first["next_cursor"], "v1")
+    assert (key, version, level, offset) == ("key", "v1", "AL", 12)
+
+    last = pagination.paginate(ranked, key, version, level, offset=24, limit=12)
+    assert [c["course_name"] for c in last["recommendations"]] == [f"Course {i}" for i in range(24, 30)]
+    assert last["next_cursor"] is None
+
+
+def test_tampered_payload_is_rejected():
+    cursor = pagination.encode_cursor("key", "v1", "AL", 12)
+    token, signature = cursor.rsplit(".", 1)
+    forged = pagination.encode_cursor("key", "v1", "AL", 0).rsplit(".", 1)[0]
+    assert forged != token
+    with pytest.raises(InvalidCursor):
+        pagination.decode_cursor(f"{forged}.{signature}")
+
+
+def test_tampered_signature_is_rejected():
+    cursor = pagination.encode_cursor("key", "v1", "AL", 12)
+    flipped = cursor[:-1] + ("0" if cursor[-1] != "0" else "1")
+    with pytest.raises(InvalidCursor):
+        pagination.decode_cursor(flipped)
+
+
+@pytest.mark.parametrize("cursor", ["", "no-signature", "!!!.abc", "e30.0123456789abcdef"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        pagination.decode_cursor(cursor)
+
+
+def test_cursor_from_older_catalog_is_stale():
+    cache = cached("v1")
+    cursor = pagination.encode_cursor("key", "v1", "AL", 12)
+    with pytest.raises(StaleCursor):
+        pagination.resolve_cursor(cache, cursor, "v2")
+
+
+def test_expired_ranking_is_stale(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(pagination.time, "monotonic", clock)
+    cache = cached()
+    cursor = pagination.encode_cursor("key", "v1", "AL", 12)
+    assert pagination.resolve_cursor(cache, cursor, "v1")[0] is RANKED
+
+    clock.now += 61
+    with pytest.raises(StaleCursor):
+        pagination.resolve_cursor(cache, cursor, "v1")
+
+
+def test_evicted_ranking_is_stale():
+    cache = cached(key="oldest")
+    for i in range(4):
+        cache.put(f"key-{i}", "v1", RANKED)
+    with pytest.raises(StaleCursor):
+        pagination.resolve_cursor(cache, pagination.encode_cursor("oldest", "v1", "AL", 12), "v1")
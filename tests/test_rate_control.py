@@ -0,0 +1,52 @@
+import asyncio
+
+from downloader import rate_control
+from downloader.rate_control import PENALTY_STEP, HostRateController
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def throttled_burst(controller, clock, n):
+    """``n`` requests in flight at once, all answered with a 503."""
+    async def burst():
+        for _ in range(n):
+            clock.now += controller.delay  # past the start spacing
+            await controller.acquire()
+        for _ in range(n):
+            controller.record(503, 0.05)
+            controller.release()
+
+    asyncio.run(burst())
+
+
+def test_concurrent_throttles_raise_penalty_once(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_control.time, "monotonic", clock)
+    controller = HostRateController("example.com", concurrency=8, delay=0.0, adaptive=True)
+
+    throttled_burst(controller, clock, 8)
+
+    assert controller.stats["throttled"] == 8
+    assert controller.stats["decreases"] == 1
+    assert controller.limit == 4
+    assert controller.penalty == PENALTY_STEP
+
+
+def test_throttle_after_round_trip_doubles_penalty(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_control.time, "monotonic", clock)
+    controller = HostRateController("example.com", concurrency=8, delay=0.0, adaptive=True)
+
+    throttled_burst(controller, clock, 4)
+    clock.now += 10
+    throttled_burst(controller, clock, 4)
+
+    assert controller.stats["decreases"] == 2
+    assert controller.limit == 2
+    assert controller.penalty == 2 * PENALTY_STEP
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from api import metrics
+from api.singleflight import SingleFlight, request_key
+
+
+def run_concurrently(flight, key, fn, n):
+    """Start ``n`` callers of ``flight.do(key, fn)``; returns (threads, results, errors)."""
+    results = [None] * n
+    errors = [None] * n
+
+    def call(i):
+        try:
+            results[i] = flight.do(key, fn)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_followers(name, n):
+    """Block until ``n`` callers are waiting on the leader (SingleFlight counts them)."""
+    for _ in range(500):
+        if metrics.snapshot()["counters"].get(f"{name}.shared", 0) >= n:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"only {metrics.snapshot()['counters'].get(f'{name}.shared', 0)} followers")
+
+
+def test_concurrent_identical_requests_run_once():
+    flight = SingleFlight("test.collapse")
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {"recommendations": [{"course_name": "BSc IT"}]}
+
+    threads, results, errors = run_concurrently(flight, "key", work, 8)
+    wait_for_followers("test.collapse", 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert errors == [None] * 8
+    assert all(result == {"recommendations": [{"course_name": "BSc IT"}]} for result in results)
+    # Waiters get copies, so one endpoint mutating its response cannot affect another
+    assert len({id(result) for result in results}) == 8
+
+
+def test_waiters_see_the_leaders_error():
+    flight = SingleFlight("test.error")
+    release = threading.Event()
+
+    def work():
+        release.wait(5)
+        raise RuntimeError("ranking failed")
+
+    threads, results, errors = run_concurrently(flight, "key", work, 4)
+    wait_for_followers("test.error", 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert all(isinstance(error, RuntimeError) for error in errors)
+
+
+def test_finished_key_runs_again():
+    flight = SingleFlight("test")
+    calls = []
+    flight.do("key", lambda: calls.append(1))
+    flight.do("key", lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_different_keys_do_not_share():
+    flight = SingleFlight("test")
+    assert flight.do("a", lambda: "a") == "a"
+    assert flight.do("b", lambda: "b") == "b"
+
+
+def test_request_key_ignores_dict_order():
+    assert request_key({"a": 1, "b": 2}, "full") == request_key({"b": 2, "a": 1}, "full")
+    assert request_key({"a": 1}, "full") != request_key({"a": 1}, "non_semantic")
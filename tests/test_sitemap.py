@@ -0,0 +1,168 @@
+import asyncio
+import contextlib
+import gzip
+from datetime import datetime
+
+import pytest
+
+from crawler import sitemap
+from crawler.sitemap import SitemapEntry, SitemapParser, parse_lastmod, stream_sitemap
+
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(*locs, lastmod=None):
+    entries = "".join(
+        f"<url><loc>{loc}</loc>" + (f"<lastmod>{lastmod}</lastmod>" if lastmod else "") + "</url>"
+        for loc in locs
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{entries}</urlset>'.encode()
+
+
+def sitemapindex(*locs):
+    entries = "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {NS}>{entries}</sitemapindex>'.encode()
+
+
+def parse(body, chunk_size=7):
+    parser = SitemapParser()
+    entries = []
+    for start in range(0, len(body), chunk_size):
+        entries.extend(parser.feed(body[start:start + chunk_size]))
+    entries.extend(parser.close())
+    return entries
+
+
+class FakeDownloader:
+    """Serves sitemap bodies from a dict through the ``stream`` interface, in small chunks."""
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.requested = []
+
+    @contextlib.asynccontextmanager
+    async def stream(self, url):
+        self.requested.append(url)
+        if url not in self.bodies:
+            raise OSError(f"404 {url}")
+        body = self.bodies[url]
+
+        class Content:
+            async def iter_chunked(self, n):
+                for start in range(0, len(body), 5):
+                    yield body[start:start + 5]
+
+        class Response:
+            content = Content()
+
+        yield Response()
+
+
+def collect(downloader, root):
+    async def run():
+        return [entry async for entry in stream_sitemap(downloader, root)]
+
+    return asyncio.run(run())
+
+
+def test_urlset_in_small_chunks():
+    body = urlset("https://a.lk/p/1/", "https://a.lk/p/2/", lastmod="2024-03-01T10:00:00+05:30")
+    assert parse(body) == [
+        ("url", "https://a.lk/p/1/", datetime(2024, 3, 1, 4, 30)),
+        ("url", "https://a.lk/p/2/", datetime(2024, 3, 1, 4, 30)),
+    ]
+
+
+def test_gzip_sitemap_is_decompressed():
+    body = gzip.compress(urlset("https://a.lk/p/1/", "https://a.lk/p/2/"))
+    assert [loc for _, loc, _ in parse(body)] == ["https://a.lk/p/1/", "https://a.lk/p/2/"]
+
+
+def test_index_children_are_reported():
+    body = sitemapindex("https://a.lk/courses.xml", "https://a.lk/pages.xml.gz")
+    assert [(kind, loc) for kind, loc, _ in parse(body)] == [
+        ("sitemap", "https://a.lk/courses.xml"),
+        ("sitemap", "https://a.lk/pages.xml.gz"),
+    ]
+
+
+def test_nested_indexes_are_followed():
+    downloader = FakeDownloader({
+        "https://a.lk/sitemap.xml": sitemapindex("https://a.lk/courses.xml", "https://a.lk/more.xml"),
+        "https://a.lk/more.xml": sitemapindex("https://a.lk/pages.xml.gz", "https://a.lk/sitemap.xml"),
+        "https://a.lk/courses.xml": urlset("https://a.lk/p/1/", "https://a.lk/p/2/"),
+        "https://a.lk/pages.xml.gz": gzip.compress(urlset("https://a.lk/p/3/", lastmod="2024-03-01")),
+    })
+    entries = collect(downloader, "https://a.lk/sitemap.xml")
+
+    assert sorted(entries) == [
+        SitemapEntry("https://a.lk/p/1/", None),
+        SitemapEntry("https://a.lk/p/2/", None),
+        SitemapEntry("https://a.lk/p/3/", datetime(2024, 3, 2)),
+    ]
+    # The index that links back to the root is not fetched twice
+    assert sorted(downloader.requested) == sorted(set(downloader.requested))
+
+
+def test_failing_child_is_skipped():
+    downloader = FakeDownloader({
+        "https://a.lk/sitemap.xml": sitemapindex("https://a.lk/missing.xml", "https://a.lk/courses.xml"),
+        "https://a.lk/courses.xml": urlset("https://a.lk/p/1/"),
+    })
+    assert collect(downloader, "https://a.lk/sitemap.xml") == [SitemapEntry("https://a.lk/p/1/", None)]
+
+
+def test_lastmod_formats():
+    assert parse_lastmod("2024-03-01") == datetime(2024, 3, 2)
+    assert parse_lastmod("2024-03-01T10:00:00Z") == datetime(2024, 3, 1, 10)
+    assert parse_lastmod("yesterday") is None
+    assert parse_lastmod(None) is None
+
+
+LOCS = ["https://a.lk/p/1/", "https://a.lk/p/2/", "https://a.lk/p/3/"]
+
+
+def body_with(middle=b"", before=b""):
+    entries = b"".join(f"<url><loc>{loc}</loc></url>".encode() for loc in LOCS[:2])
+    last = f"<url><loc>{LOCS[2]}</loc></url>".encode()
+    return before + f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>'.encode() + entries + middle + last + b"</urlset>"
+
+
+@pytest.mark.parametrize("before", [
+    b"\n\n   ",
+    b"\xef\xbb\xbf",
+    b"<br />\n<b>Warning</b>: Undefined variable $post in sitemap.php on line 12<br />\n",
+])
+def test_leading_junk_is_skipped(before):
+    assert [loc for _, loc, _ in parse(body_with(before=before))] == LOCS
+
+
+def test_leading_junk_before_gzip_payload():
+    body = gzip.compress(b"\n  " + urlset(*LOCS))
+    assert [loc for _, loc, _ in parse(body)] == LOCS
+
+
+@pytest.mark.skipif(sitemap.etree is None, reason="needs lxml")
+@pytest.mark.parametrize("middle", [
+    b"<url><loc>https://a.lk/p/nbsp&nbsp;</loc></url>",  # undeclared entity
+    b"<url><loc>https://a.lk/p/broken</loc><foo></url>",  # unclosed element
+    b"</urlset>junk<<",  # trailing garbage
+])
+def test_malformed_sitemap_is_recovered(middle):
+    locs = [loc for _, loc, _ in parse(body_with(middle=middle))]
+    assert locs[:2] == LOCS[:2]
+
+
+def test_strict_parser_keeps_urls_before_an_error(monkeypatch):
+    monkeypatch.setattr(sitemap, "etree", None)
+    parser = SitemapParser()
+    body = body_with(middle=b"<url><loc>https://a.lk/p/nbsp&nbsp;</loc></url>")
+    entries = parser.feed(body) + parser.close()
+    assert [loc for _, loc, _ in entries] == LOCS[:2]
+    assert parser.error is not None
+
+
+def test_truncated_sitemap_keeps_complete_entries():
+    body = urlset(*LOCS)[:-30]
+    assert [loc for _, loc, _ in parse(body)][:2] == LOCS[:2]